@@ -55,6 +55,10 @@ else:
 from backend.config.config import Config
 from backend.routes.routes import api_bp, db_routes
 from backend.core.utils import LoggingUtils
+from backend.services.connection_pool import pool_registry
+from backend.services.result_cursors import result_cursors
+from backend.services.history_writer import history_writer
+from backend.services.query_journal import query_journal
 
 
 def create_app() -> Flask:
@@ -86,6 +90,12 @@ def create_app() -> Flask:
     # Register blueprints
     app.register_blueprint(api_bp)
     
+    # Close pooled database connections on shutdown
+    atexit.register(pool_registry.close_all)
+    atexit.register(result_cursors.close_all)  # runs first: cursors hold pooled connections
+    atexit.register(history_writer.close)  # before both: the last history batch needs a connection
+    atexit.register(query_journal.close)
+    
     
     # Register main route
     @app.route("/")
@@ -36,12 +36,81 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY: Optional[str] = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL: str = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+    OPENAI_BASE_URL: Optional[str] = os.getenv('OPENAI_BASE_URL') or None
+    
+    # AI Provider: openai, local (OpenAI-compatible server on this machine) or offline (templates only)
+    AI_PROVIDER: str = os.getenv('AI_PROVIDER', 'openai').lower()
+    LOCAL_AI_BASE_URL: str = os.getenv('LOCAL_AI_BASE_URL', 'http://localhost:11434/v1')
+    LOCAL_AI_MODEL: str = os.getenv('LOCAL_AI_MODEL', 'qwen2.5-coder:7b')
+    
+    # Minimum word overlap for answering from a similar saved question when no model is reachable
+    AI_TEMPLATE_MIN_SCORE: float = float(os.getenv('AI_TEMPLATE_MIN_SCORE', '0.6'))
+    
+    # AI Call Configuration (deadline per call in seconds, retries on transient errors)
+    AI_REQUEST_TIMEOUT: float = float(os.getenv('AI_REQUEST_TIMEOUT', '30'))
+    AI_MAX_RETRIES: int = int(os.getenv('AI_MAX_RETRIES', '2'))
+    AI_RETRY_BASE_DELAY: float = float(os.getenv('AI_RETRY_BASE_DELAY', '0.5'))
+    AI_MAX_CONCURRENCY: int = int(os.getenv('AI_MAX_CONCURRENCY', '4'))
+    
+    # Number of tables suggested (and auto-selected) for a question
+    TABLE_SUGGEST_TOP_K: int = int(os.getenv('TABLE_SUGGEST_TOP_K', '3'))
+    
+    # Token budget for the schema section of SQL generation prompts
+    PROMPT_SCHEMA_TOKEN_BUDGET: int = int(os.getenv('PROMPT_SCHEMA_TOKEN_BUDGET', '1500'))
+    
+    # AI Circuit Breaker Configuration
+    AI_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv('AI_BREAKER_FAILURE_THRESHOLD', '3'))
+    AI_BREAKER_RESET_TIMEOUT: float = float(os.getenv('AI_BREAKER_RESET_TIMEOUT', '30'))
     
     # Database Configuration
     DB_CONNECTION_TIMEOUT: int = int(os.getenv('DB_CONNECTION_TIMEOUT', '5'))
     DEFAULT_ODBC_DRIVER: str = os.getenv('DEFAULT_ODBC_DRIVER', 'ODBC Driver 17 for SQL Server')
     KEYRING_SERVICE: str = os.getenv('KEYRING_SERVICE', 'sql-agent-cursor')
+
+    # Connection Pool Configuration (seconds unless noted)
+    DB_POOL_MAX_SIZE: int = int(os.getenv('DB_POOL_MAX_SIZE', '8'))
+    DB_POOL_CHECKOUT_TIMEOUT: float = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', '15'))
+    DB_POOL_MAX_IDLE: float = float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+    DB_POOL_MAX_AGE: float = float(os.getenv('DB_POOL_MAX_AGE', '1800'))
+    DB_POOL_VALIDATE_AFTER: float = float(os.getenv('DB_POOL_VALIDATE_AFTER', '30'))
+
+    # Schema Cache Configuration (seconds between change-fingerprint checks)
+    SCHEMA_CACHE_CHECK_INTERVAL: float = float(os.getenv('SCHEMA_CACHE_CHECK_INTERVAL', '60'))
+    
+    # Query Result Configuration
+    QUERY_MAX_ROWS: int = int(os.getenv('QUERY_MAX_ROWS', '10000'))
+    QUERY_PAGE_SIZE: int = int(os.getenv('QUERY_PAGE_SIZE', '500'))
+    QUERY_FETCH_BATCH_SIZE: int = int(os.getenv('QUERY_FETCH_BATCH_SIZE', '500'))
+    QUERY_CURSOR_TTL: float = float(os.getenv('QUERY_CURSOR_TTL', '300'))
+    QUERY_MAX_OPEN_CURSORS: int = int(os.getenv('QUERY_MAX_OPEN_CURSORS', '4'))
+    # Execution deadline (seconds, 0 = none) and fetched-data budget (bytes, 0 = none) per user query
+    QUERY_TIMEOUT: float = float(os.getenv('QUERY_TIMEOUT', '60'))
+    QUERY_MAX_BYTES: int = int(os.getenv('QUERY_MAX_BYTES', str(64 * 1024 * 1024)))
+    
+    # Generated SQL Cache Configuration
+    SQL_CACHE_MAX_ENTRIES: int = int(os.getenv('SQL_CACHE_MAX_ENTRIES', '1000'))
+    SQL_CACHE_TTL: float = float(os.getenv('SQL_CACHE_TTL', '86400'))
+    
+    # Summary Cache Configuration (summaries keyed by SQL and result fingerprint)
+    SUMMARY_CACHE_MAX_ENTRIES: int = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '500'))
     
+    # Result summaries: rows sampled and categories listed per column in the prompt
+    SUMMARY_SAMPLE_ROWS: int = int(os.getenv('SUMMARY_SAMPLE_ROWS', '8'))
+    SUMMARY_TOP_CATEGORIES: int = int(os.getenv('SUMMARY_TOP_CATEGORIES', '5'))
+    
+    # Query History Writer (records queued per flush, seconds between flushes, spill file for unsaved records)
+    HISTORY_BATCH_SIZE: int = int(os.getenv('HISTORY_BATCH_SIZE', '50'))
+    HISTORY_FLUSH_INTERVAL: float = float(os.getenv('HISTORY_FLUSH_INTERVAL', '2'))
+    HISTORY_QUEUE_SIZE: int = int(os.getenv('HISTORY_QUEUE_SIZE', '1000'))
+    HISTORY_SPILL_FILE: str = os.getenv('HISTORY_SPILL_FILE', 'query_history_spill.jsonl')
+
+    # Query Journal (JSON lines; rotated and gzip-compressed past JOURNAL_MAX_BYTES)
+    JOURNAL_FILE: str = os.getenv('JOURNAL_FILE', 'sorgularim.jsonl')
+    JOURNAL_MAX_BYTES: int = int(os.getenv('JOURNAL_MAX_BYTES', str(10 * 1024 * 1024)))
+    JOURNAL_BACKUP_COUNT: int = int(os.getenv('JOURNAL_BACKUP_COUNT', '5'))
+    JOURNAL_FSYNC_INTERVAL: float = float(os.getenv('JOURNAL_FSYNC_INTERVAL', '1'))
+    JOURNAL_QUEUE_SIZE: int = int(os.getenv('JOURNAL_QUEUE_SIZE', '10000'))
+
     # Application Configuration
     MAX_TABLES_PER_QUERY: int = int(os.getenv('MAX_TABLES_PER_QUERY', '10'))
     MAX_QUERY_LENGTH: int = int(os.getenv('MAX_QUERY_LENGTH', '1000'))
@@ -49,12 +118,15 @@ class Config:
     @classmethod
     def validate_config(cls) -> None:
         """Validate required configuration values."""
-        if not cls.OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY environment variable is required")
+        if cls.AI_PROVIDER not in ('openai', 'local', 'offline'):
+            raise ValueError("AI_PROVIDER must be one of: openai, local, offline")
+        if cls.AI_PROVIDER == 'openai' and not cls.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY environment variable is required (or set AI_PROVIDER=local/offline)")
     
     @classmethod
     def get_openai_config(cls) -> dict:
         """Get OpenAI configuration as dictionary."""
         return {
-            'api_key': cls.OPENAI_API_KEY
+            'api_key': cls.OPENAI_API_KEY,
+            'base_url': cls.OPENAI_BASE_URL
         }
@@ -0,0 +1,145 @@
+"""
+SQL tokenizer for T-SQL.
+Splits a query into tokens in one pass, keeping comments, string literals and quoted identifiers intact.
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Tuple
+
+WORD = "word"            # keyword or bare identifier ($action, $IDENTITY included)
+QUOTED = "quoted"        # [identifier] or "identifier"
+STRING = "string"        # 'text' or N'text'
+NUMBER = "number"        # including money literals ($12.50)
+VARIABLE = "variable"    # @name, @@name
+COMMENT = "comment"      # -- line or /* block */ (nested blocks allowed)
+OPERATOR = "operator"
+PUNCT = "punct"          # ( ) , ; . :
+FENCE = "fence"          # markdown code fence (```sql) around AI output
+ERROR = "error"          # unterminated string/identifier/comment, or a stray character
+
+# Leading whitespace is folded into each match, so it never becomes a token.
+# Alternatives are ordered by how common they are; N'...' is kept out of words.
+_TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<word>(?![Nn]')(?:\#{0,2}|\$)[^\W\d][\w@#$]*)
+    | (?P<number>0[xX][0-9A-Fa-f]*|\$?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<punct>[(),;.:])
+    | (?P<line_comment>--[^\r\n]*)
+    | (?P<block_comment>/\*(?:[^/*]|/(?!\*)|\*(?!/))*\*/)
+    | (?P<nested_comment>/\*)
+    | (?P<operator><>|!=|!<|!>|<=|>=|::|[-+*/%&|^~]=?|[=<>!])
+    | (?P<string>[Nn]?'(?:[^']|'')*')
+    | (?P<bracket>\[(?:[^\]]|\]\])*\])
+    | (?P<dquote>"(?:[^"]|"")*")
+    | (?P<unterminated>[Nn]?'|[\["])
+    | (?P<variable>@@?[\w@#$]+)
+    | (?P<fence>```[A-Za-z]*)
+    | (?P<other>\S)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+_KINDS = {
+    "line_comment": COMMENT,
+    "block_comment": COMMENT,
+    "fence": FENCE,
+    "string": STRING,
+    "bracket": QUOTED,
+    "dquote": QUOTED,
+    "number": NUMBER,
+    "variable": VARIABLE,
+    "word": WORD,
+    "operator": OPERATOR,
+    "punct": PUNCT,
+    "other": ERROR,
+}
+
+_BLOCK_COMMENT_PART = re.compile(r"/\*|\*/")
+
+# Statements a WITH clause can lead into
+_CTE_STATEMENTS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "MERGE"})
+
+
+class Token(NamedTuple):
+    """One lexical token; upper is the upper-cased value of words, else the value itself."""
+    kind: str
+    value: str
+    upper: str
+    start: int
+    end: int
+
+
+@lru_cache(maxsize=256)
+def tokenize(sql: str) -> Tuple[Token, ...]:
+    """Split SQL into tokens (whitespace dropped) in a single left-to-right pass.
+
+    Results are cached, so the validator, query type detection and response
+    cleaning share the tokens of the same query text.
+    """
+    tokens: List[Token] = []
+    append = tokens.append
+    # Hot loop: build the tuples directly instead of through Token(...)
+    make = tuple.__new__
+    kinds = _KINDS
+    pos = 0
+    length = len(sql)
+    while pos < length:
+        for match in _TOKEN.finditer(sql, pos):
+            group = match.lastgroup
+            kind = kinds.get(group)
+            if kind is None:
+                # Rare: a block comment containing another one (or never closed), or an unclosed quote
+                start = match.start(group)
+                end = _block_comment_end(sql, start) if group == "nested_comment" else -1
+                kind = COMMENT if end > 0 else ERROR
+                end = end if end > 0 else length
+                value = sql[start:end]
+                append(make(Token, (kind, value, value, start, end)))
+                pos = end
+                break
+            value = match[group]
+            end = match.end()
+            append(make(Token, (kind, value, value.upper() if kind is WORD else value, end - len(value), end)))
+        else:
+            break
+    return tuple(tokens)
+
+
+def _block_comment_end(sql: str, start: int) -> int:
+    """End offset of the (possibly nested) block comment at start, or -1 if unterminated."""
+    depth = 0
+    for match in _BLOCK_COMMENT_PART.finditer(sql, start):
+        depth += 1 if match.group() == "/*" else -1
+        if depth == 0:
+            return match.end()
+    return -1
+
+
+def significant(tokens: Iterable[Token]) -> List[Token]:
+    """Tokens without comments and code fences."""
+    return [token for token in tokens if token.kind not in (COMMENT, FENCE)]
+
+
+def statement_type(tokens: Iterable[Token]) -> str:
+    """Upper-cased leading keyword of the (first) statement, e.g. "SELECT".
+
+    Comments and leading semicolons are skipped; for WITH, the statement
+    the common table expressions lead into is returned. "" if there is none.
+    """
+    depth = 0
+    in_cte = False
+    for token in significant(tokens):
+        if not in_cte:
+            if token.kind == PUNCT and token.value == ";":
+                continue
+            if token.kind != WORD:
+                return ""
+            if token.upper != "WITH":
+                return token.upper
+            in_cte = True
+        elif token.kind == PUNCT and token.value == "(":
+            depth += 1
+        elif token.kind == PUNCT and token.value == ")":
+            depth -= 1
+        elif depth == 0 and token.kind == WORD and token.upper in _CTE_STATEMENTS:
+            return token.upper
+    return ""
@@ -3,9 +3,15 @@ Utility functions for SQL Agent application.
 Common helper functions and validators.
 """
 import re
+import json
+from datetime import datetime, date, time
+from decimal import Decimal
 from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
 import logging
 
+from backend.core.sql_lexer import tokenize, WORD, QUOTED, PUNCT, COMMENT, FENCE, ERROR
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,13 +21,22 @@ class ValidationError(Exception):
 
 
 class SQLValidator:
-    """Utility class for SQL validation and sanitization."""
+    """Utility class for SQL validation and sanitization.
+    
+    Works on sql_lexer tokens, so keywords inside identifiers (CreatedDate),
+    string literals and comments are not mistaken for commands.
+    """
     
     # Potentially dangerous SQL keywords
-    DANGEROUS_KEYWORDS = [
+    DANGEROUS_KEYWORDS = frozenset([
         'DROP', 'TRUNCATE', 'ALTER', 'CREATE', 'EXEC', 'EXECUTE',
-        'SP_', 'XP_', 'SHUTDOWN', 'BACKUP', 'RESTORE'
-    ]
+        'SHUTDOWN', 'BACKUP', 'RESTORE'
+    ])
+    
+    # System procedure prefixes; procedures can be called without EXEC at the start of a statement
+    DANGEROUS_PREFIXES = ('SP_', 'XP_')
+    
+    VALID_STARTERS = frozenset(['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'])
     
     @classmethod
     def validate_sql_query(cls, sql_query: str) -> bool:
@@ -37,33 +52,56 @@ class SQLValidator:
         if not sql_query or not sql_query.strip():
             return False
         
-        sql_upper = sql_query.upper().strip()
-        
-        # Check for dangerous keywords
-        for keyword in cls.DANGEROUS_KEYWORDS:
-            if keyword in sql_upper:
-                logger.warning(f"Dangerous keyword detected: {keyword}")
-                return False
-        
-        # Basic syntax validation
-        if not cls._has_valid_sql_structure(sql_upper):
-            return False
-        
-        return True
+        valid, reason = cls._verdict(sql_query)
+        if reason:
+            logger.warning(reason)
+        return valid
     
     @classmethod
-    def _has_valid_sql_structure(cls, sql_upper: str) -> bool:
-        """Check if SQL has valid basic structure."""
-        # Must start with a valid SQL keyword
-        valid_starters = ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH']
-        if not any(sql_upper.startswith(starter) for starter in valid_starters):
-            return False
-        
-        # Basic bracket matching
-        if sql_upper.count('(') != sql_upper.count(')'):
-            return False
+    @lru_cache(maxsize=1024)
+    def _verdict(cls, sql_query: str) -> Tuple[bool, str]:
+        """(valid, reason to log) for a query, from one pass over its tokens; cached per query text."""
+        depth = 0
+        statement_start = True
+        first = True
+        for token in tokenize(sql_query):
+            kind = token.kind
+            if kind == COMMENT:
+                continue
+            
+            # Basic syntax validation: must start with a valid SQL keyword
+            if first:
+                if kind != WORD or token.upper not in cls.VALID_STARTERS:
+                    return False, ""
+                first = False
+            
+            if kind == WORD:
+                # Check for dangerous keywords
+                if token.upper in cls.DANGEROUS_KEYWORDS:
+                    return False, f"Dangerous keyword detected: {token.upper}"
+            elif kind == PUNCT:
+                # Basic bracket matching
+                if token.value == '(':
+                    depth += 1
+                elif token.value == ')':
+                    depth -= 1
+                    if depth < 0:
+                        return False, ""
+                elif token.value == ';':
+                    statement_start = True
+                    continue
+            elif kind == ERROR or kind == FENCE:
+                return False, f"Malformed SQL near: {token.value[:20]}"
+            
+            # System procedures called by name as a statement
+            if statement_start and kind in (WORD, QUOTED):
+                if token.value.strip('[]"').upper().startswith(cls.DANGEROUS_PREFIXES):
+                    return False, f"System procedure call detected: {token.value}"
+            statement_start = False
         
-        return True
+        if first:
+            return False, ""
+        return depth == 0, ""
 
 
 class StringUtils:
@@ -139,8 +177,10 @@ class ResponseFormatter:
                 return {
                     "success": True,
                     "sql": query_response.sql_query,
-                    "results": query_response.results,
-                    "row_count": len(query_response.results) if query_response.results else 0
+                    "results": query_response.results.to_wire() if query_response.results is not None else None,
+                    "row_count": len(query_response.results) if query_response.results else 0,
+                    "next_page_token": query_response.next_page_token,
+                    "truncated": query_response.truncated
                 }
             else:
                 return {
@@ -157,6 +197,26 @@ class ResponseFormatter:
             }
 
 
+class JSONUtils:
+    """Helpers for serializing database values to JSON."""
+    
+    @staticmethod
+    def default(obj: Any) -> Any:
+        """JSON serializer for objects not serializable by default json code."""
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, (bytes, bytearray)):
+            return obj.hex()
+        raise TypeError(f"Type {type(obj)} not serializable")
+    
+    @staticmethod
+    def dumps(data: Any) -> str:
+        """Serialize to compact JSON, keeping non-ASCII text readable."""
+        return json.dumps(data, ensure_ascii=False, default=JSONUtils.default, separators=(",", ":"))
+
+
 class LoggingUtils:
     """Utility functions for logging."""
     
@@ -2,7 +2,7 @@
 Data models for SQL Agent application.
 Defines data structures and validation.
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from enum import Enum
 from datetime import datetime
@@ -29,11 +29,32 @@ class DatabaseConnection:
             raise ValueError("Connection string cannot be empty")
 
 
+@dataclass
+class ColumnInfo:
+    """Information about a table column."""
+    name: str
+    data_type: Optional[str] = None
+    is_nullable: bool = True
+    is_primary_key: bool = False
+
+
+@dataclass
+class ForeignKeyInfo:
+    """A column that references a column in another table."""
+    column: str
+    referenced_table: str
+    referenced_column: str
+
+
 @dataclass
 class TableInfo:
     """Information about a database table."""
     name: str
     columns: List[str]
+    schema: str = "dbo"
+    column_details: List[ColumnInfo] = field(default_factory=list)
+    primary_keys: List[str] = field(default_factory=list)
+    foreign_keys: List[ForeignKeyInfo] = field(default_factory=list)
     
     def __post_init__(self):
         """Validate table information."""
@@ -59,15 +80,59 @@ class QueryRequest:
             raise ValueError("Too many tables specified")
 
 
+@dataclass
+class ResultSet:
+    """Compact tabular result: column names once, then one tuple per row.
+    
+    Serializes to the {columns, rows} wire format instead of repeating every
+    column name in every row.
+    """
+    columns: List[str]
+    rows: List[tuple] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        """Number of rows."""
+        return len(self.rows)
+    
+    def to_records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Convert (the first limit) rows to a list of dicts."""
+        rows = self.rows if limit is None else self.rows[:limit]
+        return [dict(zip(self.columns, row)) for row in rows]
+    
+    def to_wire(self) -> Dict[str, Any]:
+        """Convert to the {columns, rows} JSON wire format."""
+        return {
+            'columns': self.columns,
+            'rows': [list(row) for row in self.rows]
+        }
+    
+    @classmethod
+    def from_wire(cls, data: Any) -> Optional['ResultSet']:
+        """Create from wire format; also accepts the legacy list-of-dicts shape."""
+        if data is None:
+            return None
+        if isinstance(data, dict):
+            return cls(columns=list(data.get('columns', [])),
+                       rows=[tuple(row) for row in data.get('rows', [])])
+        if isinstance(data, list):
+            columns = list(data[0].keys()) if data else []
+            return cls(columns=columns, rows=[tuple(record.get(c) for c in columns) for record in data])
+        raise ValueError("Unsupported result format")
+
+
 @dataclass
 class QueryResponse:
     """Response from SQL query execution."""
     sql_query: str
     query_type: QueryType
-    results: Optional[List[Dict[str, Any]]] = None
+    results: Optional[ResultSet] = None
     message: Optional[str] = None
     error: Optional[str] = None
     row_count: Optional[int] = None
+    next_page_token: Optional[str] = None
+    truncated: bool = False
+    # "cancelled" or "timeout" when execution was stopped before it finished
+    status: Optional[str] = None
     
     @property
     def is_successful(self) -> bool:
@@ -106,16 +171,29 @@ class SavedQuery:
     created_at: Optional[datetime] = None
     is_successful: bool = True
     error_message: Optional[str] = None
-    query_results: Optional[List[Dict[str, Any]]] = None
+    query_results: Optional[ResultSet] = None
     result_message: Optional[str] = None
     is_scheduled: bool = False
+    row_count: Optional[int] = None
+    has_results: bool = False
+    result_hash: Optional[str] = None
+    # success, error, cancelled or timeout (derived from is_successful for older rows)
+    status: Optional[str] = None
+    # row_count is a lower bound: the result was cut at a row/byte limit or only its first page was read
+    is_partial: bool = False
     
     def __post_init__(self):
         """Initialize default values."""
         if self.tables_used is None:
             self.tables_used = []
+        if self.status is None:
+            self.status = "success" if self.is_successful else "error"
         if self.created_at is None:
             self.created_at = datetime.now()
+        if self.query_results is not None:
+            self.has_results = True
+            if self.row_count is None:
+                self.row_count = len(self.query_results)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
@@ -127,9 +205,27 @@ class SavedQuery:
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'is_successful': self.is_successful,
             'error_message': self.error_message,
-            'query_results': self.query_results,
+            'query_results': self.query_results.to_wire() if self.query_results is not None else None,
             'result_message': self.result_message,
-            'is_scheduled': self.is_scheduled
+            'is_scheduled': self.is_scheduled,
+            'row_count': self.row_count,
+            'has_results': self.has_results,
+            'status': self.status,
+            'is_partial': self.is_partial
+        }
+    
+    def to_summary_dict(self) -> Dict[str, Any]:
+        """Convert to the lightweight dictionary used by history listings."""
+        return {
+            'id': self.id,
+            'question': self.question,
+            'tables_used': self.tables_used,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'is_successful': self.is_successful,
+            'row_count': self.row_count,
+            'has_results': self.has_results,
+            'status': self.status,
+            'is_partial': self.is_partial
         }
     
     @classmethod
@@ -147,9 +243,13 @@ class SavedQuery:
             created_at=created_at,
             is_successful=data.get('is_successful', True),
             error_message=data.get('error_message'),
-            query_results=data.get('query_results'),
+            query_results=ResultSet.from_wire(data.get('query_results')),
             result_message=data.get('result_message'),
-            is_scheduled=data.get('is_scheduled', False)
+            is_scheduled=data.get('is_scheduled', False),
+            row_count=data.get('row_count'),
+            has_results=data.get('has_results', False),
+            status=data.get('status'),
+            is_partial=data.get('is_partial', False)
         )
 
 
@@ -2,16 +2,33 @@
 Route handlers for SQL Agent application.
 Separated route logic from main application.
 """
-from flask import Blueprint, request, jsonify, session
-from typing import Dict, Any
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context, g
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
 import logging
+import threading
+import time
 
-from backend.models.models import DatabaseConnection, QueryRequest, SavedQuery
+from backend.models.models import (
+    DatabaseConnection, QueryRequest, QueryResponse, QueryType, SavedQuery, ResultSet
+)
 from backend.services.database import DatabaseManager
 from backend.services.ai_service import AIService
+from backend.services.schema_cache import schema_cache
+from backend.services.result_cursors import result_cursors
+from backend.services.sql_cache import sql_cache
+from backend.services.sql_templates import sql_templates
+from backend.services.summary_cache import summary_cache, sql_hash
+from backend.services.result_store import ResultStore
+from backend.services.history_writer import history_writer
+from backend.services.query_journal import query_journal, JournalExporter
+from backend.services.ai_health import ai_health
+from backend.services.table_index import table_suggester
+from backend.services.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from backend.services.query_control import query_registry, QueryCancelledError
 from backend.core.utils import (
     ValidationError, SQLValidator, StringUtils,
-    ResponseFormatter, LoggingUtils, ODBCUtils
+    ResponseFormatter, LoggingUtils, ODBCUtils, JSONUtils
 )
 from backend.config.config import Config
 import keyring
@@ -22,12 +39,32 @@ logger = logging.getLogger(__name__)
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 
+@api_bp.before_request
+def _start_request_timing():
+    """Collect stage spans for the Server-Timing header."""
+    g.request_started = time.perf_counter()
+    metrics.begin_request()
+
+
+@api_bp.after_request
+def _add_server_timing(response: Response) -> Response:
+    """Report the stages timed during the request (streamed bodies are timed separately)."""
+    spans = metrics.end_request()
+    started = g.pop("request_started", None)
+    if started is not None:
+        spans.append(("total", time.perf_counter() - started))
+    if spans:
+        response.headers["Server-Timing"] = metrics.server_timing(spans)
+    return response
+
+
 class DatabaseRoutes:
     """Handles database-related routes."""
     
     def __init__(self):
         self.db_manager: DatabaseManager = None
         self.ai_service = AIService()
+        self.schema_cache = schema_cache
     
     def set_database_connection(self, connection_string: str, keyring_account: str | None = None) -> None:
         """Set database connection for the session.
@@ -40,12 +77,35 @@ class DatabaseRoutes:
                 raise ValidationError("Connection string cannot be empty")
             
             # Create database manager
+            previous = self.db_manager
             self.db_manager = DatabaseManager(connection_string, keyring_account=keyring_account)
             
+            # Release the previous database's pool; reconnecting to the same DSN keeps it
+            if previous and not previous.shares_pool_with(self.db_manager):
+                previous.close()
+            
             # Test connection
             if not self.db_manager.test_connection():
                 raise ValidationError("Database connection test failed")
             
+            # Create or upgrade the history tables once, instead of on every save
+            if not self.db_manager.ensure_schema():
+                logger.warning("History tables could not be prepared; saved queries will be spilled to disk")
+            
+            # Queue history records that could not be saved last time
+            history_writer.replay(self.db_manager)
+            
+            # Warm the schema cache so the first question does not wait for it
+            self.schema_cache.refresh_async(self.db_manager)
+            
+            # Seed the generated SQL cache from history in the background
+            threading.Thread(
+                target=self._seed_sql_cache,
+                args=(self.db_manager,),
+                name="sql-cache-seed",
+                daemon=True
+            ).start()
+            
             # Store in session
             session["DB_CONN_STR"] = connection_string  # sanitized (no PWD)
             if keyring_account:
@@ -56,6 +116,32 @@ class DatabaseRoutes:
             logger.error(f"Failed to set database connection: {e}")
             raise
     
+    def _seed_sql_cache(self, db_manager: DatabaseManager) -> None:
+        """Load successful question/SQL pairs saved since the last schema change."""
+        try:
+            # Anything saved before the newest schema change may be stale
+            _, last_schema_change = db_manager.get_schema_fingerprint()
+            pairs = db_manager.get_successful_query_pairs(since=last_schema_change)
+            if not pairs:
+                return
+            
+            table_names = sorted({name for _, _, tables in pairs for name in tables})
+            schema = self.schema_cache.get_tables(db_manager, table_names)
+            
+            entries = [
+                (question, AIService.get_schema_hash(tables, schema), sql_query)
+                for question, sql_query, tables in pairs
+                if tables and all(name in schema.tables for name in tables)
+            ]
+            added = sql_cache.seed(entries)
+            templates = sql_templates.seed(entries)
+            logger.info(
+                f"Seeded SQL cache with {added} entries and {templates} templates "
+                f"from {len(pairs)} saved queries"
+            )
+        except Exception as e:
+            logger.error(f"Failed to seed SQL cache: {e}")
+    
     def get_database_manager(self) -> DatabaseManager:
         """Get database manager instance."""
         if not self.db_manager:
@@ -64,6 +150,7 @@ class DatabaseRoutes:
                 raise ValidationError("No database connection found. Please set database connection first.")
             keyring_account = session.get("DB_KR_ACCOUNT")
             self.db_manager = DatabaseManager(connection_string, keyring_account=keyring_account)
+            self.db_manager.ensure_schema()
         return self.db_manager
 
     def clear_connection(self) -> None:
@@ -76,6 +163,10 @@ class DatabaseRoutes:
                     keyring.delete_password(Config.KEYRING_SERVICE, keyring_account)
                 except keyring.errors.PasswordDeleteError:
                     pass
+            if self.db_manager:
+                self.schema_cache.invalidate(self.db_manager)
+                table_suggester.invalidate(self.db_manager)
+                self.db_manager.close()
             self.db_manager = None
             logger.info("Database connection info cleared from keyring/session")
         except Exception as e:
@@ -177,7 +268,7 @@ def get_tables():
     """Get list of all tables in the database."""
     try:
         db_manager = db_routes.get_database_manager()
-        tables = db_manager.get_tables()
+        tables = db_routes.schema_cache.get_schema(db_manager).get_table_names()
         
         return jsonify(ResponseFormatter.format_success_response(tables))
         
@@ -188,6 +279,44 @@ def get_tables():
         return jsonify(ResponseFormatter.format_error_response("Failed to retrieve tables")), 500
 
 
+@api_bp.route("/tables/suggest", methods=["POST"])
+def suggest_tables():
+    """Suggest the tables a question is about (local index, no AI call)."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify(ResponseFormatter.format_error_response("No data provided")), 400
+        
+        question = StringUtils.sanitize_input(data.get("question", "").strip(), Config.MAX_QUERY_LENGTH)
+        if not question:
+            return jsonify(ResponseFormatter.format_error_response("Question is required")), 400
+        k = _suggest_count(data.get("k"))
+        
+        db_manager = db_routes.get_database_manager()
+        suggestions = table_suggester.suggest(db_manager, question, k)
+        
+        return jsonify(ResponseFormatter.format_success_response([
+            {"table": name, "score": score} for name, score in suggestions
+        ]))
+        
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error suggesting tables: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to suggest tables")), 500
+
+
+def _resolve_tables(db_manager: DatabaseManager, question: str, tables: List[str]) -> List[str]:
+    """Use the selected tables, or pick them from the table index when none were selected."""
+    if tables:
+        return tables
+    suggested = [name for name, _ in table_suggester.suggest(db_manager, question)]
+    if not suggested:
+        raise ValidationError("Soru için uygun tablo bulunamadı. Lütfen tablo seçin.")
+    logger.info(f"Auto-selected tables: {suggested}")
+    return suggested
+
+
 @api_bp.route("/columns", methods=["POST"])
 def get_columns():
     """Get columns for specified tables."""
@@ -210,7 +339,11 @@ def get_columns():
         tables = [StringUtils.sanitize_input(table) for table in tables]
         
         db_manager = db_routes.get_database_manager()
-        columns_dict = db_manager.get_multiple_table_columns(tables)
+        schema = db_routes.schema_cache.get_tables(db_manager, tables)
+        columns_dict = {
+            table: schema.get_table_columns(table) if table in schema.tables else []
+            for table in tables
+        }
         
         return jsonify(ResponseFormatter.format_success_response(columns_dict))
         
@@ -221,9 +354,169 @@ def get_columns():
         return jsonify(ResponseFormatter.format_error_response("Failed to retrieve columns")), 500
 
 
+def _record_query(db_manager: DatabaseManager, question: str, tables: List[str],
+                  sql_query: str, query_response: QueryResponse) -> str:
+    """Save an executed query to history (database and journal).
+    
+    The database write is queued on the history writer; returns its ticket,
+    which history_writer.resolve() turns into the query ID. Large SELECTs
+    keep only their first page (a preview), with the full row count.
+    """
+    results = query_response.results if query_response.is_select_query else None
+    # Queue the query (with results) for the background history writer
+    saved_query = SavedQuery(
+        question=question,
+        sql_query=sql_query,
+        tables_used=tables,
+        is_successful=query_response.is_successful,
+        error_message=query_response.error,
+        query_results=results,
+        result_message=query_response.message,
+        row_count=query_response.row_count if results is not None else None,
+        status=query_response.status,
+        is_partial=results is not None and (
+            query_response.truncated or query_response.next_page_token is not None
+        )
+    )
+    with metrics.span("history"):
+        history_ticket = history_writer.submit(db_manager, saved_query)
+    
+    # SQL that ran is reused for the question and successful SELECTs become
+    # templates for offline answers; SQL that failed is never served again
+    try:
+        schema = db_routes.schema_cache.get_tables(db_manager, tables)
+        digest = AIService.get_schema_hash(tables, schema)
+        if query_response.is_successful:
+            sql_cache.put(question, digest, sql_query)
+            if query_response.is_select_query:
+                sql_templates.add(question, digest, sql_query)
+        else:
+            sql_cache.discard(question, digest)
+    except Exception as e:
+        logger.warning(f"Could not update SQL cache: {e}")
+    
+    # Append to the query journal (written by its own thread)
+    with metrics.span("journal"):
+        query_journal.record(question, tables, sql_query, query_response, history_ticket)
+    
+    return history_ticket
+
+
+def _stream_query_results(db_manager: DatabaseManager, question: str, tables: List[str], sql_query: str,
+                          explanation: Optional[Dict[str, str]] = None,
+                          execution_id: Optional[str] = None, timeout: float = Config.QUERY_TIMEOUT):
+    """Generate NDJSON lines for a SELECT as rows come off the cursor.
+    
+    Emits a "meta" line (sql, columns, tables, explanation, execution_id), one "rows" line per
+    fetch batch and a final "end" line (row_count, truncated, history_ticket), or an "error"
+    line (with status "cancelled" or "timeout" if the query was stopped).
+    Only the first page of rows is kept in memory, for the query history.
+    """
+    preview: Optional[ResultSet] = None
+    summary = {"row_count": 0, "truncated": False}
+    error = None
+    status = None
+    started = time.perf_counter()
+    
+    try:
+        for kind, payload in db_manager.stream_query(sql_query, execution_id=execution_id, timeout=timeout):
+            if kind == "columns":
+                preview = ResultSet(columns=payload)
+                meta = {
+                    "type": "meta", "sql": sql_query, "columns": payload, "tables": tables,
+                    "execution_id": execution_id
+                }
+                if explanation:
+                    meta["explanation"] = explanation
+                yield JSONUtils.dumps(meta) + "\n"
+            elif kind == "rows":
+                rows = [tuple(row) for row in payload]
+                if len(preview) < Config.QUERY_PAGE_SIZE:
+                    preview.rows.extend(rows[:Config.QUERY_PAGE_SIZE - len(preview)])
+                yield JSONUtils.dumps({"type": "rows", "rows": rows}) + "\n"
+            else:
+                summary = payload
+    except QueryCancelledError as e:
+        error, status = str(e), e.reason
+        yield JSONUtils.dumps({"type": "error", "error": error, "sql": sql_query, "status": status}) + "\n"
+    except Exception as e:
+        logger.error(f"Error streaming query results: {e}")
+        error = str(e)
+        yield JSONUtils.dumps({"type": "error", "error": error, "sql": sql_query}) + "\n"
+    # Includes the time the client takes to read the rows
+    metrics.record("execute_stream", time.perf_counter() - started)
+    
+    query_response = QueryResponse(
+        sql_query=sql_query,
+        query_type=QueryType.SELECT,
+        results=None if error else preview,
+        error=error,
+        row_count=summary["row_count"],
+        truncated=summary["truncated"],
+        status=status
+    )
+    history_ticket = _record_query(db_manager, question, tables, sql_query, query_response)
+    
+    if error is None:
+        yield JSONUtils.dumps({
+            "type": "end",
+            "row_count": summary["row_count"],
+            "truncated": summary["truncated"],
+            "history_ticket": history_ticket
+        }) + "\n"
+
+
+def _execution_options(data: Dict[str, Any]) -> Tuple[str, float]:
+    """Execution ID and deadline (seconds) for a query request."""
+    try:
+        execution_id = query_registry.new_execution_id(data.get("execution_id"))
+    except ValueError as e:
+        raise ValidationError(str(e))
+    
+    timeout = Config.QUERY_TIMEOUT
+    requested = data.get("timeout")
+    if requested is not None:
+        try:
+            requested = float(requested)
+        except (TypeError, ValueError):
+            raise ValidationError("timeout must be a number of seconds")
+        if requested > 0:
+            timeout = min(requested, timeout) if timeout > 0 else requested
+    return execution_id, timeout
+
+
+def _page_size(value: Any) -> int:
+    """First-page size for a query request, clamped to 1..Config.QUERY_MAX_ROWS."""
+    if not value:
+        return min(Config.QUERY_PAGE_SIZE, Config.QUERY_MAX_ROWS)
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError("page_size must be an integer")
+    return max(1, min(page_size, Config.QUERY_MAX_ROWS))
+
+
+def _suggest_count(value: Any) -> int:
+    """Number of tables to suggest, clamped to 1..Config.MAX_TABLES_PER_QUERY."""
+    if not value:
+        return min(Config.TABLE_SUGGEST_TOP_K, Config.MAX_TABLES_PER_QUERY)
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValidationError("k must be an integer")
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError("k must be an integer")
+    return max(1, min(k, Config.MAX_TABLES_PER_QUERY))
+
+
 @api_bp.route("/query", methods=["POST"])
 def execute_query():
-    """Execute natural language query and return results."""
+    """Execute natural language query and return results.
+    With { stream: true }, SELECT results are returned as NDJSON (see _stream_query_results).
+    With { explain: true }, the SQL and its explanation come from one AI call.
+    { execution_id } names the run for /query/<execution_id>/cancel (one is generated if omitted);
+    { timeout } shortens the execution deadline (seconds, at most Config.QUERY_TIMEOUT).
+    """
     try:
         data = request.get_json()
         if not data:
@@ -236,94 +529,70 @@ def execute_query():
         if not question:
             return jsonify(ResponseFormatter.format_error_response("Question is required")), 400
         
-        if not tables:
-            return jsonify(ResponseFormatter.format_error_response("At least one table must be specified")), 400
-        
         # Sanitize inputs
         question = StringUtils.sanitize_input(question, Config.MAX_QUERY_LENGTH)
         tables = [StringUtils.sanitize_input(table) for table in tables]
+        execution_id, timeout = _execution_options(data)
+        page_size = _page_size(data.get("page_size"))
+        
+        # No tables selected: pick them from the local table index
+        db_manager = db_routes.get_database_manager()
+        with metrics.span("table_suggest"):
+            tables = _resolve_tables(db_manager, question, tables)
         
         # Create query request
         query_request = QueryRequest(question=question, tables=tables)
         
-        # Get database manager and schema
-        db_manager = db_routes.get_database_manager()
-        schema = db_manager.get_database_schema()
+        # Get (cached) schema for the selected tables only
+        with metrics.span("schema"):
+            schema = db_routes.schema_cache.get_tables(db_manager, query_request.tables)
         
-        # Convert natural language to SQL
-        sql_query = db_routes.ai_service.convert_natural_to_sql(query_request, schema)
+        # Convert natural language to SQL (optionally with its explanation, in the same call)
+        explanation = None
+        with metrics.span("ai"):
+            if data.get("explain"):
+                generated = db_routes.ai_service.generate_sql_with_explanation(query_request, schema)
+                sql_query = generated["sql_query"]
+                explanation = {"summary": generated["summary"], "analysis": generated["analysis"]}
+            else:
+                sql_query = db_routes.ai_service.convert_natural_to_sql(query_request, schema)
         
         # Validate generated SQL
-        if not SQLValidator.validate_sql_query(sql_query):
+        with metrics.span("validate"):
+            is_valid = SQLValidator.validate_sql_query(sql_query)
+        if not is_valid:
+            sql_cache.discard(question, AIService.get_schema_hash(query_request.tables, schema))
             return jsonify(ResponseFormatter.format_error_response(
                 "Generated SQL query is not valid or contains dangerous operations"
             )), 400
         
-        # Execute query
-        query_response = db_manager.execute_query(sql_query)
-        
-        # Save query to database with results
-        saved_query = SavedQuery(
-            question=question,
-            sql_query=sql_query,
-            tables_used=tables,
-            is_successful=query_response.is_successful,
-            error_message=query_response.error,
-            query_results=query_response.results if query_response.is_select_query else None,
-            result_message=query_response.message
-        )
-        query_id = db_manager.save_query(saved_query)
+        # Opt-in NDJSON streaming: rows are encoded as they come off the cursor
+        if data.get("stream") and db_manager.is_select_query(sql_query):
+            return Response(
+                stream_with_context(_stream_query_results(
+                    db_manager, question, tables, sql_query, explanation, execution_id, timeout
+                )),
+                mimetype="application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
-        # Save to text file for backup
-        try:
-            from datetime import datetime
-            import os
-            import pytz
-            
-            # Turkey timezone
-            tz = pytz.timezone('Europe/Istanbul')
-            
-            backup_file = "sorgularim.txt"
-            file_exists = os.path.exists(backup_file)
-            
-            with open(backup_file, 'a', encoding='utf-8') as f:
-                if not file_exists:
-                    f.write("=" * 80 + "\n")
-                    f.write("SQL AGENT - SORGU GEÇMİŞİ\n")
-                    f.write("=" * 80 + "\n\n")
-                
-                f.write("\n" + "=" * 80 + "\n")
-                f.write(f"SORGU #{query_id if query_id else 'N/A'}\n")
-                f.write(f"TARİH: {datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S %Z')}\n")
-                f.write(f"DURUM: {'✅ BAŞARILI' if query_response.is_successful else '❌ HATA'}\n")
-                f.write("=" * 80 + "\n\n")
-                
-                f.write(f"📝 SORU:\n{question}\n\n")
-                
-                f.write(f"📋 TABLOLAR:\n{', '.join(tables)}\n\n")
-                
-                f.write(f"🔍 SQL SORGUSU:\n{sql_query}\n\n")
-                
-                if query_response.is_successful:
-                    if query_response.results:
-                        f.write(f"📊 SONUÇLAR: {len(query_response.results)} satır\n")
-                        if len(query_response.results) <= 5:
-                            f.write(f"Veri: {query_response.results}\n")
-                    elif query_response.message:
-                        f.write(f"✅ MESAJ: {query_response.message}\n")
-                else:
-                    f.write(f"❌ HATA: {query_response.error}\n")
-                
-                f.write("\n")
-            
-            logger.info(f"Query backed up to {backup_file}")
-        except Exception as e:
-            logger.error(f"Error backing up query to file: {e}")
+        # Execute query (first page only; the rest is fetched via /query/page)
+        with metrics.span("execute"):
+            query_response = db_manager.execute_query(
+                sql_query, page_size=page_size, execution_id=execution_id, timeout=timeout
+            )
+        
+        history_ticket = _record_query(db_manager, question, tables, sql_query, query_response)
         
-        # Add query ID to response
+        # The query ID is not known yet: the history ticket resolves to it (see /summary/stream)
         formatted_response = ResponseFormatter.format_query_response(query_response)
-        if query_id:
-            formatted_response['query_id'] = query_id
+        formatted_response['tables'] = tables
+        if explanation:
+            formatted_response['explanation'] = explanation
+        formatted_response['history_ticket'] = history_ticket
+        formatted_response['execution_id'] = execution_id
+        if query_response.status:
+            formatted_response['status'] = query_response.status
         
         LoggingUtils.log_response_info("/query", query_response.is_successful, formatted_response)
         
@@ -339,6 +608,221 @@ def execute_query():
         return jsonify(ResponseFormatter.format_error_response("Query execution failed")), 500
 
 
+def _sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {JSONUtils.dumps(data)}\n\n"
+
+
+def _sse_response(events) -> Response:
+    """Wrap an SSE generator in a streaming response."""
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _stream_sql_events(query_request: QueryRequest, schema):
+    """Generate SSE events for streamed SQL generation.
+    
+    Emits "sql" events ({delta}) as tokens arrive, then "done" ({sql_query,
+    cached, valid, tables, ...}) or "error". Valid SQL is cached, so a following
+    /query for the same question does not call the AI again; invalid SQL is
+    dropped from the cache.
+    """
+    ai_service = db_routes.ai_service
+    try:
+        for kind, payload in ai_service.client.iterate(ai_service.stream_sql_async(query_request, schema)):
+            if kind == "sql":
+                yield _sse_event("sql", {"delta": payload})
+            else:
+                payload["valid"] = SQLValidator.validate_sql_query(payload["sql_query"])
+                digest = AIService.get_schema_hash(query_request.tables, schema)
+                if payload["valid"]:
+                    sql_cache.put(query_request.question, digest, payload["sql_query"])
+                else:
+                    sql_cache.discard(query_request.question, digest)
+                payload["tables"] = query_request.tables
+                yield _sse_event("done", payload)
+    except Exception as e:
+        logger.error(f"Error streaming SQL generation: {e}")
+        yield _sse_event("error", {"error": str(e)})
+
+
+def _stream_summary_events(question: str, sql_query: str, results: Optional[ResultSet],
+                           result_fingerprint: Optional[str] = None, on_summary=None,
+                           row_count: Optional[int] = None, partial: bool = False):
+    """Generate SSE events for a streamed summary: "summary"/"analysis" deltas, then "done".
+    
+    on_summary, if given, is called with a newly generated (not cached, not fallback) summary.
+    row_count and partial describe the full result when results is only its preview.
+    """
+    ai_service = db_routes.ai_service
+    try:
+        for kind, payload in ai_service.client.iterate(
+            ai_service.stream_summary_async(question, sql_query, results, result_fingerprint, row_count, partial)
+        ):
+            if kind == "done":
+                if on_summary and not payload["fallback"] and not payload["cached"]:
+                    on_summary(payload)
+                yield _sse_event("done", payload)
+            else:
+                yield _sse_event(kind, {"delta": payload})
+    except Exception as e:
+        logger.error(f"Error streaming summary: {e}")
+        yield _sse_event("error", {"error": str(e)})
+
+
+@api_bp.route("/query/sql/stream", methods=["POST"])
+def stream_sql_generation():
+    """Generate SQL for a question, streaming tokens as server-sent events."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify(ResponseFormatter.format_error_response("No data provided")), 400
+        
+        question = data.get("question", "").strip()
+        tables = data.get("tables", [])
+        
+        if not question:
+            return jsonify(ResponseFormatter.format_error_response("Question is required")), 400
+        
+        question = StringUtils.sanitize_input(question, Config.MAX_QUERY_LENGTH)
+        tables = [StringUtils.sanitize_input(table) for table in tables]
+        
+        db_manager = db_routes.get_database_manager()
+        tables = _resolve_tables(db_manager, question, tables)
+        query_request = QueryRequest(question=question, tables=tables)
+        
+        schema = db_routes.schema_cache.get_tables(db_manager, query_request.tables)
+        
+        return _sse_response(_stream_sql_events(query_request, schema))
+        
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error starting SQL stream: {e}")
+        return jsonify(ResponseFormatter.format_error_response("SQL generation failed")), 500
+
+
+@api_bp.route("/summary/stream", methods=["POST"])
+def stream_summary():
+    """Stream a Turkish summary and analysis as server-sent events.
+    
+    Accepts { query_id } (or the { history_ticket } of a just-run query) to
+    summarize a saved query's results, or { question, sql_query } to
+    summarize the SQL alone. Saved query summaries
+    are stored by (SQL hash, result hash), so reopening one never calls the AI again.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify(ResponseFormatter.format_error_response("No data provided")), 400
+        
+        query_id = data.get("query_id")
+        if query_id is None and data.get("history_ticket"):
+            query_id = history_writer.resolve(str(data["history_ticket"]))
+            if query_id is None:
+                return jsonify(ResponseFormatter.format_error_response("Sorgu henüz kaydedilmedi.")), 404
+        fingerprint = None
+        on_summary = None
+        row_count, partial = None, False
+        if query_id is not None:
+            db_manager = db_routes.get_database_manager()
+            saved_query = db_manager.get_saved_query_by_id(int(query_id))
+            if not saved_query:
+                return jsonify(ResponseFormatter.format_error_response(f"Sorgu #{query_id} bulunamadı.")), 404
+            question, sql_query, results = saved_query.question, saved_query.sql_query, saved_query.query_results
+            row_count, partial = saved_query.row_count, saved_query.is_partial
+            
+            # Older rows keep results inline, without a stored hash
+            if results is not None:
+                fingerprint = saved_query.result_hash or ResultStore.content_hash(results)
+            key = (sql_hash(sql_query), fingerprint or "")
+            stored = db_manager.get_query_summary(*key)
+            if stored:
+                summary_cache.put(sql_query, fingerprint, stored)
+            else:
+                on_summary = lambda summary: db_manager.save_query_summary(*key, summary)
+        else:
+            question = data.get("question", "").strip()
+            sql_query = data.get("sql_query", "").strip()
+            results = None
+            if not question or not sql_query:
+                raise ValidationError("question and sql_query are required")
+        
+        return _sse_response(_stream_summary_events(
+            question, sql_query, results, fingerprint, on_summary, row_count, partial
+        ))
+        
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error starting summary stream: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Summary generation failed")), 500
+
+
+@api_bp.route("/query/<execution_id>/cancel", methods=["POST"])
+def cancel_query(execution_id):
+    """Cancel a running query by the execution_id it was started with."""
+    try:
+        if query_registry.cancel(execution_id):
+            return jsonify(ResponseFormatter.format_success_response(
+                {"execution_id": execution_id}, "Sorgu iptal ediliyor."
+            ))
+        return jsonify(ResponseFormatter.format_error_response(
+            "Çalışan sorgu bulunamadı (tamamlanmış veya hiç başlamamış olabilir)."
+        )), 404
+    except Exception as e:
+        logger.error(f"Error cancelling query: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to cancel query")), 500
+
+
+@api_bp.route("/query/page/<page_token>", methods=["GET"])
+def get_query_page(page_token):
+    """Get the next page of a paged query result."""
+    try:
+        db_manager = db_routes.get_database_manager()
+        page_size = request.args.get('page_size', Config.QUERY_PAGE_SIZE, type=int)
+        
+        page = db_manager.fetch_result_page(page_token, page_size)
+        if page is None:
+            return jsonify(ResponseFormatter.format_error_response(
+                "Sonuç sayfası bulunamadı veya süresi doldu.", "PAGE_EXPIRED"
+            )), 404
+        
+        page["success"] = True
+        return jsonify(page)
+        
+    except QueryCancelledError as e:
+        error_response = ResponseFormatter.format_error_response(str(e))
+        error_response["status"] = e.reason
+        return jsonify(error_response), 400
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error fetching query page: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to fetch query page")), 500
+
+
+@api_bp.route("/query/page/<page_token>", methods=["DELETE"])
+def close_query_page(page_token):
+    """Release a paged query result that the client no longer needs."""
+    closed = result_cursors.close(page_token)
+    return jsonify(ResponseFormatter.format_success_response({"closed": closed}))
+
+
+def _parse_history_cursor(value: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Parse a history cursor of the form '<created_at iso>|<id>'."""
+    if not value:
+        return None
+    try:
+        created_at, query_id = value.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(query_id)
+    except ValueError:
+        raise ValidationError("Invalid history cursor")
+
+
 @api_bp.route("/queries", methods=["GET"])
 def get_saved_queries():
     """Get saved queries."""
@@ -355,6 +839,16 @@ def get_saved_queries():
         if offset < 0:
             offset = 0
         
+        if request.args.get('view') == 'summary':
+            # Lightweight listing, paged by a (created_at, id) cursor
+            before = _parse_history_cursor(request.args.get('cursor'))
+            queries, next_key = db_manager.get_saved_query_summaries(limit=limit, before=before)
+            response = ResponseFormatter.format_success_response(
+                [query.to_summary_dict() for query in queries]
+            )
+            response['next_cursor'] = f"{next_key[0].isoformat()}|{next_key[1]}" if next_key else None
+            return jsonify(response)
+        
         queries = db_manager.get_saved_queries(limit=limit, offset=offset)
         
         # Convert to dictionaries
@@ -369,6 +863,76 @@ def get_saved_queries():
         return jsonify(ResponseFormatter.format_error_response("Failed to retrieve saved queries")), 500
 
 
+@api_bp.route("/queries", methods=["DELETE"])
+def delete_saved_queries():
+    """Bulk delete saved queries by ids, date range or all."""
+    try:
+        db_manager = db_routes.get_database_manager()
+        data = request.get_json(silent=True) or {}
+        
+        ids = data.get('ids')
+        delete_all = bool(data.get('all'))
+        try:
+            created_from = datetime.fromisoformat(data['from']) if data.get('from') else None
+            created_to = datetime.fromisoformat(data['to']) if data.get('to') else None
+            if ids is not None:
+                ids = [int(query_id) for query_id in ids]
+        except (TypeError, ValueError):
+            raise ValidationError("Geçersiz silme kriteri")
+        
+        if ids is None and created_from is None and created_to is None and not delete_all:
+            raise ValidationError("Silinecek sorgular için ids, from/to veya all belirtilmeli")
+        if ids is not None and not ids:
+            return jsonify(ResponseFormatter.format_success_response({'deleted': 0}, "Silinecek sorgu yok."))
+        
+        deleted = db_manager.delete_saved_queries(
+            ids=ids,
+            created_from=created_from,
+            created_to=created_to,
+            delete_all=delete_all
+        )
+        
+        return jsonify(ResponseFormatter.format_success_response(
+            {'deleted': deleted},
+            f"{deleted} sorgu silindi."
+        ))
+        
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error bulk deleting queries: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to delete queries")), 500
+
+
+@api_bp.route("/queries/journal", methods=["GET"])
+def export_query_journal():
+    """Export the query journal.
+    
+    Returns the readable Turkish text (sorgularim.txt) by default, or the
+    raw records with ?format=json. ?limit=N keeps the last N queries.
+    """
+    try:
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit <= 0:
+            raise ValidationError("limit must be positive")
+        records = query_journal.read(limit)
+        
+        if request.args.get('format') == 'json':
+            return jsonify(ResponseFormatter.format_success_response({"records": records}))
+        
+        return Response(
+            JournalExporter().export(records),
+            mimetype="text/plain",
+            headers={"Content-Disposition": "attachment; filename=sorgularim.txt"}
+        )
+        
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error exporting query journal: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to export query journal")), 500
+
+
 @api_bp.route("/queries/<int:query_id>", methods=["DELETE"])
 def delete_saved_query(query_id):
     """Delete a saved query."""
@@ -416,15 +980,74 @@ def get_saved_query(query_id):
         return jsonify(ResponseFormatter.format_error_response("Failed to retrieve query")), 500
 
 
+@api_bp.route("/schema/invalidate", methods=["POST"])
+def invalidate_schema_cache():
+    """Drop the cached schema for the current connection.
+    Pass { reload: true } to reload it immediately instead of on next use.
+    """
+    try:
+        db_manager = db_routes.get_database_manager()
+        data = request.get_json(silent=True) or {}
+        
+        db_routes.schema_cache.invalidate(db_manager)
+        if data.get("reload"):
+            db_routes.schema_cache.refresh(db_manager, force=True)
+        
+        return jsonify(ResponseFormatter.format_success_response(
+            db_routes.schema_cache.get_status(db_manager),
+            "Şema önbelleği temizlendi."
+        ))
+        
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error invalidating schema cache: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to invalidate schema cache")), 500
+
+
+@api_bp.route("/pool", methods=["GET"])
+def get_pool_metrics():
+    """Get connection pool metrics for the current database connection."""
+    try:
+        db_manager = db_routes.get_database_manager()
+        return jsonify(ResponseFormatter.format_success_response(db_manager.get_pool_metrics()))
+        
+    except ValidationError as e:
+        return jsonify(ResponseFormatter.format_error_response(str(e))), 400
+    except Exception as e:
+        logger.error(f"Error getting pool metrics: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to retrieve pool metrics")), 500
+
+
+@api_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Stage duration histograms in the Prometheus text format."""
+    try:
+        return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        return jsonify(ResponseFormatter.format_error_response("Failed to render metrics")), 500
+
+
 @api_bp.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint."""
     try:
-        # Simple health check - just return that the service is running
+        # AI availability comes from the outcome of real calls (circuit breaker)
         health_data = {
             "status": "healthy",
             "database_connected": False,  # Will be true when user connects
-            "ai_service_available": True,
+            "ai_service_available": db_routes.ai_service.is_available(),
+            "ai_provider": db_routes.ai_service.provider,
+            "ai_health": ai_health.get_status(),
+            "sql_cache": sql_cache.get_stats(),
+            "summary_cache": summary_cache.get_stats(),
+            "sql_templates": sql_templates.get_stats(),
+            "history_writer": history_writer.get_stats(),
+            "query_journal": query_journal.get_stats(),
+            "running_queries": query_registry.get_stats(),
+            # Each open paged result holds a pooled connection until it is read or expires
+            "open_result_cursors": result_cursors.open_count(),
             "message": "SQL Agent is running"
         }
         
@@ -0,0 +1,259 @@
+"""
+Asynchronous AI client layer.
+Runs AsyncOpenAI calls on a background event loop with deadlines, retries and a concurrency limit.
+"""
+import asyncio
+import queue
+import random
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional
+
+import logging
+
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Failures worth another attempt; anything else (bad request, auth, ...) fails at once
+RETRYABLE_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+    asyncio.TimeoutError,
+)
+
+
+class AIDeadlineExceeded(Exception):
+    """Raised when a call (including queueing and retries) runs past its deadline."""
+    pass
+
+
+class AsyncAIClient:
+    """Chat completion client backed by AsyncOpenAI on a dedicated event loop thread.
+
+    Synchronous callers (Flask workers) use run() or submit(); coroutines can
+    also await complete() directly from code already running on the loop.
+    Every call gets an overall deadline covering waiting for a concurrency
+    slot, each attempt and the jittered backoff between retries.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: str = Config.OPENAI_MODEL,
+        timeout: float = Config.AI_REQUEST_TIMEOUT,
+        max_retries: int = Config.AI_MAX_RETRIES,
+        retry_base_delay: float = Config.AI_RETRY_BASE_DELAY,
+        max_concurrency: int = Config.AI_MAX_CONCURRENCY
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.max_concurrency = max(1, max_concurrency)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the event loop thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run, name="ai-client-loop", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        """Schedule a coroutine on the client loop; returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """Run a coroutine on the client loop and wait for its result."""
+        return self.submit(coro).result()
+
+    def _get_client(self) -> AsyncOpenAI:
+        """Create the AsyncOpenAI client on the loop thread on first use."""
+        if self._client is None:
+            # Retries are handled here, so the SDK's own retry loop is disabled
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def complete(
+        self,
+        messages: List[dict],
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float] = None,
+        response_format: Optional[dict] = None
+    ) -> str:
+        """Run one chat completion within the deadline, retrying transient failures.
+
+        response_format (e.g. {"type": "json_object"}) is passed through when given.
+        """
+        remaining = self._deadline(timeout)
+        await self._acquire_slot(remaining)
+        try:
+            extra = {"response_format": response_format} if response_format else {}
+            response = await self._create(
+                remaining,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **extra
+            )
+            return (response.choices[0].message.content or "").strip()
+        finally:
+            self._semaphore.release()
+
+    async def stream(
+        self,
+        messages: List[dict],
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion as text deltas.
+
+        Transient failures are retried only until the stream has been opened;
+        the deadline covers the whole stream.
+        """
+        remaining = self._deadline(timeout)
+        await self._acquire_slot(remaining)
+        try:
+            response = await self._create(
+                remaining,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            try:
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise AIDeadlineExceeded("AI stream deadline exceeded")
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await response.close()
+        finally:
+            self._semaphore.release()
+
+    def iterate(self, agen: AsyncIterator[Any]) -> Iterator[Any]:
+        """Consume an async generator on the client loop from synchronous code.
+
+        Stopping the returned iterator early (e.g. the HTTP client went away)
+        cancels the async generator and the completion behind it.
+        """
+        items: queue.Queue = queue.Queue()
+
+        async def _pump():
+            try:
+                async for item in agen:
+                    items.put((True, item))
+                items.put((False, None))
+            except BaseException as e:
+                items.put((False, e))
+                raise
+            finally:
+                await agen.aclose()
+
+        future = self.submit(_pump())
+        try:
+            while True:
+                has_item, value = items.get()
+                if has_item:
+                    yield value
+                elif value is None:
+                    return
+                else:
+                    raise value
+        finally:
+            future.cancel()
+
+    def _deadline(self, timeout: Optional[float]) -> Callable[[], float]:
+        """Return a function giving the seconds left before the deadline (raises once it passed)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+
+        def _remaining() -> float:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise AIDeadlineExceeded("AI call deadline exceeded")
+            return remaining
+        return _remaining
+
+    async def _acquire_slot(self, remaining: Callable[[], float]) -> None:
+        """Backpressure: wait for a concurrency slot, but never past the deadline."""
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), remaining())
+        except asyncio.TimeoutError:
+            raise AIDeadlineExceeded("Timed out waiting for an AI call slot")
+
+    async def _create(self, remaining: Callable[[], float], **kwargs) -> Any:
+        """Create a chat completion, retrying transient failures with jittered backoff."""
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(
+                    self._get_client().chat.completions.create(model=self.model, **kwargs),
+                    remaining()
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                # Exponential backoff with full jitter, bounded by the deadline
+                delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                if delay >= remaining():
+                    raise AIDeadlineExceeded(f"AI call deadline exceeded after {attempt + 1} attempts: {e}")
+                attempt += 1
+                logger.warning(f"AI call failed ({e}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def close(self) -> None:
+        """Close the client and stop the loop thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.close(), loop).result(timeout=5)
+            except Exception as e:
+                logger.warning(f"Error closing AI client: {e}")
+        loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,135 @@
+"""
+Health tracking for the AI service.
+A circuit breaker fed by the outcome of real completion calls.
+"""
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import logging
+
+from backend.config.config import Config
+from backend.services.ai_client import RETRYABLE_ERRORS, AIDeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Failures that say the service is unreachable or overloaded (transport, timeout, 429, 5xx)
+OUTAGE_ERRORS = RETRYABLE_ERRORS + (AIDeadlineExceeded,)
+
+
+class AIHealthTracker:
+    """Circuit breaker over AI calls.
+
+    closed: calls go through. After failure_threshold consecutive failures the
+    breaker opens and calls are skipped for reset_timeout seconds. It then goes
+    half-open: the next real call is let through as the probe, and its outcome
+    closes or re-opens the breaker. No separate test calls are ever made.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = Config.AI_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = Config.AI_BREAKER_RESET_TIMEOUT
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+        self._last_success_at: Optional[float] = None
+        self._last_failure_at: Optional[float] = None
+        self._total_successes = 0
+        self._total_failures = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Whether a call may be made now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        """Record a successful call; closes the breaker."""
+        with self._lock:
+            self._close()
+            self._last_success_at = time.time()
+            self._total_successes += 1
+
+    def record_failure(self, error: Exception) -> None:
+        """Record a failed call; opens the breaker at the threshold or on a failed probe.
+
+        Only outages (OUTAGE_ERRORS) count. A request the service rejected
+        (bad request, auth, context too long) shows it is up, so it closes
+        the breaker like a success does.
+        """
+        with self._lock:
+            if not isinstance(error, OUTAGE_ERRORS):
+                self._close()
+                return
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            self._last_error = str(error)
+            self._last_failure_at = time.time()
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"AI circuit breaker opened after {self._consecutive_failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def record_abandoned(self) -> None:
+        """Record a call cancelled before it finished; frees the probe slot without a verdict."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _close(self) -> None:
+        """Close the breaker and reset the failure streak (caller holds the lock)."""
+        if self._state != self.CLOSED:
+            logger.info("AI circuit breaker closed")
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being skipped."""
+        with self._lock:
+            return self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def get_status(self) -> Dict[str, Any]:
+        """Describe the breaker state for health reporting."""
+        with self._lock:
+            state = self._state
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+                if retry_in == 0.0:
+                    state = self.HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "total_successes": self._total_successes,
+                "total_failures": self._total_failures,
+                "last_error": self._last_error,
+                "last_success_at": self._last_success_at,
+                "last_failure_at": self._last_failure_at,
+                "retry_in_seconds": round(retry_in, 1) if retry_in else None
+            }
+
+
+# Global tracker shared by all AI calls
+ai_health = AIHealthTracker()
@@ -0,0 +1,83 @@
+"""
+AI provider backends.
+Selects the completion backend AIService talks to: OpenAI, a local OpenAI-compatible server, or none.
+"""
+from typing import Dict, Optional, Type
+
+import logging
+
+from backend.config.config import Config
+from backend.services.ai_client import AsyncAIClient
+
+logger = logging.getLogger(__name__)
+
+
+class AIProvider(AsyncAIClient):
+    """Base class of completion backends.
+
+    A provider is an AsyncAIClient (complete, stream, run, iterate, close)
+    with a name and a configured flag. Unconfigured providers still run
+    the event loop, so cached and template answers work without a model.
+    """
+
+    name = "base"
+
+    @property
+    def configured(self) -> bool:
+        """Whether completion calls can be made at all."""
+        return False
+
+
+class OpenAIProvider(AIProvider):
+    """OpenAI (or the endpoint in OPENAI_BASE_URL)."""
+
+    name = "openai"
+
+    def __init__(self, **kwargs):
+        options = {"model": Config.OPENAI_MODEL, **Config.get_openai_config()}
+        options.update(kwargs)
+        super().__init__(**options)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+
+class LocalModelProvider(AIProvider):
+    """A locally hosted model behind an OpenAI-compatible API (Ollama, llama.cpp, vLLM, ...)."""
+
+    name = "local"
+
+    def __init__(self, **kwargs):
+        options = {
+            # Local servers ignore the key, but the client requires one
+            "api_key": Config.OPENAI_API_KEY or "local",
+            "base_url": Config.LOCAL_AI_BASE_URL,
+            "model": Config.LOCAL_AI_MODEL,
+        }
+        options.update(kwargs)
+        super().__init__(**options)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+
+class OfflineProvider(AIProvider):
+    """No model: SQL comes only from the SQL cache and saved-query templates."""
+
+    name = "offline"
+
+
+PROVIDERS: Dict[str, Type[AIProvider]] = {
+    provider.name: provider for provider in (OpenAIProvider, LocalModelProvider, OfflineProvider)
+}
+
+
+def create_provider(name: Optional[str] = None) -> AIProvider:
+    """Create the provider named in AI_PROVIDER (or the given name)."""
+    name = (name or Config.AI_PROVIDER).lower()
+    provider = PROVIDERS.get(name)
+    if provider is None:
+        raise ValueError(f"Unknown AI provider '{name}' (expected one of: {', '.join(PROVIDERS)})")
+    return provider()
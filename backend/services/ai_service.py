@@ -2,36 +2,189 @@
 AI service for natural language to SQL conversion.
 Handles OpenAI API interactions and prompt engineering.
 """
-from typing import List, Dict
-from openai import OpenAI
-from backend.models.models import DatabaseSchema, QueryRequest
-from backend.config.config import Config
+import json
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
+from backend.models.models import DatabaseSchema, QueryRequest, ResultSet
+from backend.core.sql_lexer import tokenize, statement_type, FENCE
+from backend.services.sql_cache import sql_cache, schema_hash
+from backend.services.summary_cache import summary_cache
+from backend.services.result_store import ResultStore
+from backend.services.result_profiler import result_profiler
+from backend.services.ai_health import ai_health
+from backend.services.ai_providers import create_provider
+from backend.services.sql_templates import sql_templates
+from backend.services.prompt_builder import PromptBuilder, BuiltPrompt
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class AIUnavailableError(Exception):
+    """Raised when an AI call is skipped because the service is down."""
+    pass
+
+
+class _SQLStreamCleaner:
+    """Incremental version of AIService._clean_sql_response's markdown stripping.
+
+    feed() returns the newly visible SQL text. A trailing partial code fence is
+    held back until the next delta shows whether it is a fence.
+    """
+    
+    FENCES = ("```sql", "```")
+    
+    def __init__(self):
+        self.raw = ""
+        self._emitted = 0
+    
+    def feed(self, delta: str) -> str:
+        self.raw += delta
+        stable = self.raw
+        for length in range(len(self.FENCES[0]) - 1, 0, -1):
+            if stable.endswith(self.FENCES[0][:length]):
+                stable = stable[:-length]
+                break
+        for fence in self.FENCES:
+            stable = stable.replace(fence, "")
+        stable = stable.lstrip()
+        text, self._emitted = stable[self._emitted:], len(stable)
+        return text
+
+
+class _SummaryStreamParser:
+    """Incremental Özet/Analiz parser for summary answers.
+
+    Section headers ("- Özet:", "Analysis:", ...) switch the current section;
+    text after a header on the same line belongs to that section. A line is
+    buffered only until it can no longer be a header, then streamed as it comes.
+    """
+    
+    HEADERS = (
+        ("- özet", "summary"), ("- ozet", "summary"), ("özet:", "summary"), ("ozet:", "summary"),
+        ("- summary", "summary"), ("summary:", "summary"),
+        ("- analiz", "analysis"), ("analiz:", "analysis"),
+        ("- analysis", "analysis"), ("analysis:", "analysis"),
+    )
+    
+    def __init__(self):
+        self.section = "summary"
+        self._lines: Dict[str, List[str]] = {"summary": [], "analysis": []}
+        self._line = ""
+        self._decided = False
+        self._skip = ""
+        self._in_text = False
+    
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        """Consume a delta; returns (section, text) events for newly known text."""
+        events: List[Tuple[str, str]] = []
+        for ch in delta:
+            if ch == "\n":
+                if not self._decided:
+                    self._decide(events, final=True)
+                self._end_line()
+            elif self._decided:
+                self._emit(ch, events)
+            else:
+                self._line += ch
+                self._decide(events, final=False)
+        return self._coalesce(events)
+    
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush a trailing line without a newline."""
+        events: List[Tuple[str, str]] = []
+        if not self._decided:
+            self._decide(events, final=True)
+        self._end_line()
+        return self._coalesce(events)
+    
+    def result(self) -> Dict[str, str]:
+        """Summary and analysis collected so far."""
+        return {section: " ".join(lines) for section, lines in self._lines.items()}
+    
+    def _decide(self, events: List[Tuple[str, str]], final: bool) -> None:
+        """Classify the buffered line as a header or text once that is certain."""
+        low = self._line.lstrip().lower()
+        if not low:
+            return
+        for header, section in self.HEADERS:
+            if low.startswith(header):
+                self.section = section
+                self._decided = True
+                self._skip = ": *"
+                rest = self._line.lstrip()[len(header):]
+                for ch in rest:
+                    self._emit(ch, events)
+                return
+        if not final and any(header.startswith(low) for header, _ in self.HEADERS):
+            return
+        self._decided = True
+        self._skip = "- "
+        for ch in self._line.lstrip():
+            self._emit(ch, events)
+    
+    def _emit(self, ch: str, events: List[Tuple[str, str]]) -> None:
+        if self._skip:
+            if ch in self._skip:
+                return
+            self._skip = ""
+        if not self._in_text:
+            # First text of a line; lines of a section are joined with a space
+            self._in_text = True
+            if self._lines[self.section]:
+                events.append((self.section, " "))
+            self._lines[self.section].append("")
+        self._lines[self.section][-1] += ch
+        events.append((self.section, ch))
+    
+    def _end_line(self) -> None:
+        if self._in_text:
+            self._lines[self.section][-1] = self._lines[self.section][-1].strip()
+        self._line = ""
+        self._decided = False
+        self._skip = ""
+        self._in_text = False
+    
+    @staticmethod
+    def _coalesce(events: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Merge consecutive events of the same section."""
+        merged: List[Tuple[str, str]] = []
+        for section, text in events:
+            if merged and merged[-1][0] == section:
+                merged[-1] = (section, merged[-1][1] + text)
+            else:
+                merged.append((section, text))
+        return merged
+
+
 class AIService:
     """Service for AI-powered natural language to SQL conversion."""
     
-    def __init__(self):
-        """Initialize AI service with OpenAI client."""
+    def __init__(self, provider: Optional[str] = None):
+        """Initialize AI service with the provider named in AI_PROVIDER."""
+        self.client = create_provider(provider)
+        self.provider = self.client.name
+        self.model = self.client.model
+        self.prompt_builder = PromptBuilder()
+        if self.provider == "offline":
+            logger.info("AI service running offline: SQL comes from the cache and saved query templates")
+            self.ai_available = False
+            return
         try:
-            # Check if API key exists
-            if not Config.OPENAI_API_KEY:
-                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            # Check if the provider can make calls (e.g. the OpenAI API key exists)
+            if not self.client.configured:
+                raise ValueError(f"AI provider '{self.provider}' is not configured")
             
-            self.client = OpenAI(**Config.get_openai_config())
-            self.model = Config.OPENAI_MODEL
             self.ai_available = True
-            logger.info(f"AI service initialized successfully with model: {self.model}")
+            logger.info(f"AI service initialized successfully with {self.provider} model: {self.model}")
         except Exception as e:
-            logger.error(f"AI service initialization failed: {e}")
-            self.client = None
-            self.model = None
+            logger.error(f"AI service initialization failed: {e}; answering from saved query templates only")
             self.ai_available = False
     
-    def convert_natural_to_sql(
+    def convert_natural_to_sql(self, request: QueryRequest, schema: DatabaseSchema) -> str:
+        """Blocking wrapper around convert_natural_to_sql_async."""
+        return self.client.run(self.convert_natural_to_sql_async(request, schema))
+    
+    async def convert_natural_to_sql_async(
         self, 
         request: QueryRequest, 
         schema: DatabaseSchema
@@ -58,14 +211,23 @@ class AIService:
             if not request.tables:
                 raise ValueError("At least one table must be specified")
             
-            # Get relevant schema information
-            relevant_schema = self._get_relevant_schema(request.tables, schema)
+            # Reuse SQL generated earlier for the same question and schema
+            digest = self.get_schema_hash(request.tables, schema)
+            cached_sql = sql_cache.get(request.question, digest)
+            if cached_sql:
+                logger.info("Generated SQL served from cache")
+                return cached_sql
+            
+            # Same question with other numbers/quoted values, or no model to ask
+            templated_sql = self._generate_from_template(request, digest)
+            if templated_sql:
+                return templated_sql
             
-            # Generate prompt
-            prompt = self._generate_prompt(request.question, relevant_schema)
+            # Generate prompt (schema pruned to the token budget)
+            prompt = self._generate_prompt(request, schema)
             
             # Call OpenAI API
-            response = self._call_openai_api(prompt)
+            response = await self._call_openai_api(prompt.text)
             
             # Clean and validate SQL
             sql_query = self._clean_sql_response(response)
@@ -77,107 +239,428 @@ class AIService:
             logger.error(f"Error converting natural language to SQL: {e}")
             raise
     
-    def _get_relevant_schema(
-        self, 
-        table_names: List[str], 
+    def generate_sql_with_explanation(self, request: QueryRequest, schema: DatabaseSchema) -> Dict[str, Any]:
+        """Blocking wrapper around generate_sql_with_explanation_async."""
+        return self.client.run(self.generate_sql_with_explanation_async(request, schema))
+    
+    async def generate_sql_with_explanation_async(
+        self,
+        request: QueryRequest,
         schema: DatabaseSchema
-    ) -> Dict[str, List[str]]:
-        """Get schema information for relevant tables only."""
-        relevant_schema = {}
+    ) -> Dict[str, Any]:
+        """Generate SQL and its Turkish explanation in one structured (JSON) call.
         
-        for table_name in table_names:
-            if table_name in schema.tables:
-                relevant_schema[table_name] = schema.get_table_columns(table_name)
-            else:
-                logger.warning(f"Table '{table_name}' not found in schema")
+        Returns {sql_query, summary, analysis, cached}. The explanation is cached
+        as the SQL's summary, so a later summarize_sql for it makes no AI call.
+        """
+        if not request.question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        if not request.tables:
+            raise ValueError("At least one table must be specified")
+        
+        digest = self.get_schema_hash(request.tables, schema)
+        cached_sql = sql_cache.get(request.question, digest)
+        if cached_sql:
+            logger.info("Generated SQL served from cache")
+            explanation = await self.summarize_sql_async(request.question, cached_sql)
+            return {"sql_query": cached_sql, **explanation, "cached": True}
+        
+        templated_sql = self._generate_from_template(request, digest)
+        if templated_sql:
+            explanation = await self.summarize_sql_async(request.question, templated_sql)
+            return {"sql_query": templated_sql, **explanation, "cached": False}
+        
+        prompt = self._generate_prompt(request, schema, explain=True)
+        try:
+            content = await self._complete(
+                prompt.text,
+                max_tokens=800,
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            logger.error(f"OpenAI API call failed: {e}")
+            raise Exception(f"AI service error: {str(e)}")
         
-        return relevant_schema
+        sql_query, explanation = self._parse_combined_response(content)
+        if explanation:
+            summary_cache.put(sql_query, None, explanation)
+        else:
+            explanation = self._summary_fallback(request.question)
+        
+        logger.info(f"Generated SQL query with explanation: {sql_query}")
+        return {"sql_query": sql_query, **explanation, "cached": False}
     
-    def _generate_prompt(self, question: str, schema: Dict[str, List[str]]) -> str:
-        """Generate prompt for OpenAI API."""
-        schema_str = self._format_schema_for_prompt(schema)
+    async def stream_sql_async(
+        self,
+        request: QueryRequest,
+        schema: DatabaseSchema
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream SQL generation as ("sql", text) deltas, then ("done", {sql_query, cached, prompt_tokens, ...}).
         
-        prompt = f"""
-You are an expert SQL developer specializing in SQL Server. 
-Your task is to convert natural language questions into accurate SQL Server queries.
-
-Database Schema:
-{schema_str}
-
-Instructions:
-1. Use ONLY the tables and columns provided in the schema above
-2. Write valid SQL Server syntax
-3. Use proper JOINs when multiple tables are involved
-4. Include appropriate WHERE clauses for filtering
-5. Use meaningful column aliases when needed
-6. Return ONLY the SQL query, no explanations or markdown formatting
-
-Question: {question}
-
-SQL Query:
-"""
-        return prompt.strip()
+        Markdown fences are stripped as the text arrives; the final SQL is
+        validated like convert_natural_to_sql. Nothing is cached here: the
+        route caches the SQL once the SQL validator accepts it.
+        """
+        if not request.question.strip():
+            raise ValueError("Question cannot be empty")
+        
+        if not request.tables:
+            raise ValueError("At least one table must be specified")
+        
+        digest = self.get_schema_hash(request.tables, schema)
+        cached_sql = sql_cache.get(request.question, digest)
+        if cached_sql:
+            logger.info("Generated SQL served from cache")
+            yield ("sql", cached_sql)
+            yield ("done", {"sql_query": cached_sql, "cached": True, "source": "cache",
+                            "prompt_tokens": 0, "columns_dropped": 0})
+            return
+        
+        templated_sql = self._generate_from_template(request, digest)
+        if templated_sql:
+            yield ("sql", templated_sql)
+            yield ("done", {"sql_query": templated_sql, "cached": False, "source": "template",
+                            "prompt_tokens": 0, "columns_dropped": 0})
+            return
+        
+        prompt = self._generate_prompt(request, schema)
+        
+        cleaner = _SQLStreamCleaner()
+        async for delta in self._stream_complete(prompt.text, max_tokens=500, temperature=0.1):
+            text = cleaner.feed(delta)
+            if text:
+                yield ("sql", text)
+        
+        sql_query = self._clean_sql_response(cleaner.raw)
+        logger.info(f"Generated SQL query (streamed): {sql_query}")
+        yield ("done", {
+            "sql_query": sql_query,
+            "cached": False,
+            "source": self.provider,
+            "prompt_tokens": prompt.tokens,
+            "columns_dropped": prompt.columns_dropped
+        })
+    
+    def _generate_from_template(self, request: QueryRequest, digest: str) -> Optional[str]:
+        """SQL from a saved-query template, if one fits.
+        
+        Exact structure matches are used even when a model is available; the
+        closest similar question is used only when no model can be called.
+        """
+        sql_query = sql_templates.generate(request.question, digest, exact_only=self.is_available())
+        if sql_query:
+            sql_query = self._clean_sql_response(sql_query)
+            logger.info(f"Generated SQL query from saved query template: {sql_query}")
+        return sql_query
     
-    def _format_schema_for_prompt(self, schema: Dict[str, List[str]]) -> str:
-        """Format schema information for the prompt."""
-        schema_lines = []
-        for table_name, columns in schema.items():
-            columns_str = ", ".join(columns)
-            schema_lines.append(f"{table_name}: {columns_str}")
-        
-        return "\n".join(schema_lines)
+    @staticmethod
+    def get_schema_hash(table_names: List[str], schema: DatabaseSchema) -> str:
+        """Hash of the schema of the given tables, used to scope cached SQL."""
+        return schema_hash({
+            name: schema.tables[name] for name in table_names if name in schema.tables
+        })
     
-    def _call_openai_api(self, prompt: str) -> str:
+    def _generate_prompt(self, request: QueryRequest, schema: DatabaseSchema, explain: bool = False) -> BuiltPrompt:
+        """Build the token-budgeted prompt for a request and log its size."""
+        prompt = self.prompt_builder.build(request.question, request.tables, schema, explain=explain)
+        logger.info(
+            f"Prompt: {prompt.tokens} tokens (schema {prompt.schema_tokens}/{prompt.budget}, "
+            f"{prompt.columns_included} columns, {prompt.columns_dropped} dropped"
+            f"{'' if prompt.exact_count else ', estimated'})"
+        )
+        return prompt
+    
+    async def _call_openai_api(self, prompt: str) -> str:
         """Call OpenAI API with the generated prompt."""
         try:
-            # For OpenAI v2.3.0+ (Python 3.10+ compatible)
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.1
-            )
-            
-            return response.choices[0].message.content.strip()
-            
+            return await self._complete(prompt, max_tokens=500, temperature=0.1)
         except Exception as e:
             logger.error(f"OpenAI API call failed: {e}")
             raise Exception(f"AI service error: {str(e)}")
     
+    async def _complete(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[dict] = None
+    ) -> str:
+        """Run one chat completion, feeding its outcome to the AI health tracker.
+        
+        Raises AIUnavailableError without calling the API while the breaker is open.
+        """
+        self._check_available()
+        
+        try:
+            content = await self.client.complete(
+                [{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                response_format=response_format
+            )
+        except Exception as e:
+            ai_health.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled (e.g. the client disconnected): no verdict on AI health
+            ai_health.record_abandoned()
+            raise
+        
+        ai_health.record_success()
+        return content
+    
+    async def _stream_complete(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """Streaming variant of _complete; yields text deltas as they arrive."""
+        self._check_available()
+        
+        try:
+            async for delta in self.client.stream(
+                [{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature
+            ):
+                yield delta
+        except Exception as e:
+            ai_health.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled (e.g. the client disconnected): no verdict on AI health
+            ai_health.record_abandoned()
+            raise
+        
+        ai_health.record_success()
+    
+    def _check_available(self) -> None:
+        """Raise AIUnavailableError if calls should not be made right now."""
+        if not self.ai_available:
+            raise AIUnavailableError("AI service is not configured")
+        if not ai_health.allow_request():
+            raise AIUnavailableError("AI service is temporarily unavailable")
+    
+    def is_available(self) -> bool:
+        """Whether AI calls are currently expected to go through."""
+        return self.ai_available and not ai_health.is_open
+    
     def _clean_sql_response(self, response: str) -> str:
         """Clean and validate SQL response from AI."""
-        # Remove markdown code blocks if present
-        sql_query = response.replace("```sql", "").replace("```", "").strip()
+        # Remove markdown code blocks if present (fences inside string literals are kept)
+        tokens = tokenize(response)
+        fences = [token for token in tokens if token.kind == FENCE]
+        sql_query = response
+        for token in reversed(fences):
+            sql_query = sql_query[:token.start] + sql_query[token.end:]
+        sql_query = sql_query.strip()
         
         # Basic validation
         if not sql_query:
             raise ValueError("Empty SQL query generated")
         
-        # Ensure it starts with a valid SQL keyword
-        sql_upper = sql_query.upper().strip()
-        valid_keywords = ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH']
+        # Ensure it starts with a valid SQL keyword (comments before it are allowed)
+        keyword = statement_type(tokenize(sql_query)) if fences else statement_type(tokens)
+        valid_keywords = ['SELECT', 'INSERT', 'UPDATE', 'DELETE']
         
-        if not any(sql_upper.startswith(keyword) for keyword in valid_keywords):
+        if keyword not in valid_keywords:
             raise ValueError(f"Invalid SQL query: {sql_query}")
         
         return sql_query
+    
+    def _parse_combined_response(self, response: str) -> Tuple[str, Optional[Dict[str, str]]]:
+        """Split a combined-mode answer into (SQL, {summary, analysis} or None).
+        
+        An answer that is not the expected JSON is treated as bare SQL.
+        """
+        text = response.strip()
+        if text.startswith("```"):
+            text = text.strip("`").strip()
+            if text.lower().startswith("json"):
+                text = text[4:]
+        try:
+            data = json.loads(text)
+        except ValueError:
+            logger.warning("Combined generation did not return JSON, using the answer as SQL")
+            return self._clean_sql_response(response), None
+        
+        if not isinstance(data, dict) or not isinstance(data.get("sql"), str):
+            raise ValueError("Combined generation returned no SQL")
+        sql_query = self._clean_sql_response(data["sql"])
+        summary = data.get("summary")
+        analysis = data.get("analysis")
+        if not isinstance(summary, str) or not summary.strip():
+            return sql_query, None
+        return sql_query, {
+            "summary": summary.strip(),
+            "analysis": analysis.strip() if isinstance(analysis, str) else ""
+        }
 
     def summarize_sql(self, question: str, sql_query: str) -> Dict[str, str]:
+        """Blocking wrapper around summarize_sql_async."""
+        return self.client.run(self.summarize_sql_async(question, sql_query))
+
+    async def summarize_sql_async(self, question: str, sql_query: str) -> Dict[str, str]:
         """Generate a brief natural-language summary and conversational analysis for a SQL query.
 
         Returns a dict with keys: summary (str) and analysis (str).
         """
-        if not self.ai_available:
+        cached = summary_cache.get(sql_query)
+        if cached:
+            return cached
+        
+        if not self.is_available():
             logger.warning("AI service not available, returning fallback SQL summary")
-            return {
-                "summary": f"Bu sorgu '{question}' sorusuna yanıt veriyor. SQL sorgusu başarıyla oluşturuldu.",
-                "analysis": f"Sorgu sonuçlarına göre verilerinizde önemli bilgiler bulunuyor. Analiz için sonuçları inceleyebilirsiniz."
-            }
+            return self._summary_fallback(question, unavailable=True)
         
         try:
-            prompt = f"""
+            prompt = self._sql_summary_prompt(question, sql_query)
+            content = await self._complete(prompt, max_tokens=400, temperature=0.3)
+            summary = self._parse_summary(content)
+            summary_cache.put(sql_query, None, summary)
+            return summary
+        except Exception as e:
+            logger.error(f"OpenAI summary generation failed: {e}")
+            return self._summary_fallback(question)
+
+    def summarize_results(
+        self,
+        question: str,
+        sql_query: str,
+        results: ResultSet,
+        result_fingerprint: Optional[str] = None,
+        row_count: Optional[int] = None,
+        partial: bool = False
+    ) -> Dict[str, str]:
+        """Blocking wrapper around summarize_results_async."""
+        return self.client.run(self.summarize_results_async(
+            question, sql_query, results, result_fingerprint, row_count, partial
+        ))
+
+    async def summarize_results_async(
+        self,
+        question: str,
+        sql_query: str,
+        results: ResultSet,
+        result_fingerprint: Optional[str] = None,
+        row_count: Optional[int] = None,
+        partial: bool = False
+    ) -> Dict[str, str]:
+        """Generate a brief Turkish business summary and conversational analysis over actual query results.
+
+        Summaries are cached by (SQL, result fingerprint); pass the saved result
+        hash as result_fingerprint when known, otherwise it is computed. When
+        results is a preview, row_count (a lower bound if partial) is the
+        size of the full result.
+        Returns dict with keys: summary (str) and analysis (str).
+        """
+        fingerprint = self._result_fingerprint(results, result_fingerprint)
+        cached = summary_cache.get(sql_query, fingerprint)
+        if cached:
+            return cached
+        
+        if not self.is_available():
+            logger.warning("AI service not available, returning fallback summary")
+            return self._summary_fallback(question, results, unavailable=True, row_count=row_count)
+        
+        try:
+            prompt = self._results_summary_prompt(question, sql_query, results, row_count, partial)
+            content = await self._complete(prompt, max_tokens=400, temperature=0.3)
+            summary = self._parse_summary(content)
+            summary_cache.put(sql_query, fingerprint, summary)
+            return summary
+        except Exception as e:
+            logger.error(f"OpenAI results summary failed: {e}")
+            return self._summary_fallback(question, results, row_count=row_count)
+
+    async def stream_summary_async(
+        self,
+        question: str,
+        sql_query: str,
+        results: Optional[ResultSet] = None,
+        result_fingerprint: Optional[str] = None,
+        row_count: Optional[int] = None,
+        partial: bool = False
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream a summary as ("summary" | "analysis", text) deltas, then ("done", dict).
+
+        Summarizes the results when given (a preview of row_count rows, see
+        summarize_results_async), otherwise only the SQL. The done
+        payload has the final summary and analysis; fallback is True when
+        the AI could not be used and the text is a template, cached is True
+        when the summary was generated before (no deltas are sent then).
+        """
+        fingerprint = self._result_fingerprint(results, result_fingerprint)
+        cached = summary_cache.get(sql_query, fingerprint)
+        if cached:
+            yield ("done", {**cached, "fallback": False, "cached": True})
+            return
+        
+        if not self.is_available():
+            logger.warning("AI service not available, returning fallback summary")
+            fallback = self._summary_fallback(question, results, unavailable=True, row_count=row_count)
+            yield ("done", {**fallback, "fallback": True, "cached": False})
+            return
+        
+        if results is None:
+            prompt = self._sql_summary_prompt(question, sql_query)
+        else:
+            prompt = self._results_summary_prompt(question, sql_query, results, row_count, partial)
+        
+        parser = _SummaryStreamParser()
+        try:
+            async for delta in self._stream_complete(prompt, max_tokens=400, temperature=0.3):
+                for event in parser.feed(delta):
+                    yield event
+            for event in parser.finish():
+                yield event
+        except Exception as e:
+            logger.error(f"OpenAI summary stream failed: {e}")
+            yield ("done", {**self._summary_fallback(question, results, row_count=row_count), "fallback": True, "cached": False})
+            return
+        
+        summary = parser.result()
+        summary_cache.put(sql_query, fingerprint, summary)
+        yield ("done", {**summary, "fallback": False, "cached": False})
+
+    @staticmethod
+    def _result_fingerprint(results: Optional[ResultSet], known: Optional[str] = None) -> Optional[str]:
+        """Summary cache fingerprint of a result set (None when summarizing SQL alone)."""
+        if results is None:
+            return None
+        return known or ResultStore.content_hash(results)
+
+    @staticmethod
+    def _summary_fallback(
+        question: str,
+        results: Optional[ResultSet] = None,
+        unavailable: bool = False,
+        row_count: Optional[int] = None
+    ) -> Dict[str, str]:
+        """Template summary used when the AI is unavailable or the call failed."""
+        if results is None:
+            if unavailable:
+                return {
+                    "summary": f"Bu sorgu '{question}' sorusuna yanıt veriyor. SQL sorgusu başarıyla oluşturuldu.",
+                    "analysis": f"Sorgu sonuçlarına göre verilerinizde önemli bilgiler bulunuyor. Analiz için sonuçları inceleyebilirsiniz."
+                }
+            return {
+                "summary": "Sorgu, girilen soruya göre ilgili tabloları kullanarak verileri getirir.",
+                "analysis": "Bu rapora göre verilerinizde genel eğilimler ve önemli noktalar görülüyor. Tarih bazında artış ve azalış dönemleri, en yüksek ve en düşük performans gösteren kategoriler ile dikkat çekici segmentler bulunuyor. Detaylı analiz için sonuçları inceleyebilirsiniz."
+            }
+        if unavailable:
+            found = row_count if row_count is not None else len(results)
+            return {
+                "summary": f"Bu sorgu '{question}' sorusuna yanıt veriyor. {found} kayıt bulundu.",
+                "analysis": f"Sorgu sonuçlarına göre {len(results)} kayıt analiz edildi. Verilerinizde önemli trendler ve karşılaştırmalar bulunuyor."
+            }
+        return {
+            "summary": "Sonuçlar genel olarak beklenen eğilimleri gösteriyor; metrikleri dönem bazında karşılaştırın.",
+            "analysis": "Bu rapora göre verilerinizde önemli trendler ve karşılaştırmalar görülüyor. Dönemsel artış ve azalış dönemleri, en yüksek performans gösteren kategoriler ve dikkat çekici segmentler bulunuyor. Detaylı analiz için sonuçları inceleyebilirsiniz."
+        }
+
+    @staticmethod
+    def _sql_summary_prompt(question: str, sql_query: str) -> str:
+        """Prompt for summarizing a SQL query without its results."""
+        return f"""
 Sen bir iş analisti ve rapor uzmanısın. Kullanıcının sorusu ve SQL sorgusu verilmiş. 
 Türkçe olarak şunları üret:
 
@@ -201,93 +684,17 @@ Format:
 - Analysis: <4-5 cümle, doğal konuşma tarzı>
 """
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=400,
-                temperature=0.3
-            )
-            content = response.choices[0].message.content.strip()
-
-            # Simple parsing: split summary and analysis
-            lines = [l.strip() for l in content.splitlines() if l.strip()]
-            summary_lines = []
-            analysis_lines: List[str] = []
-            mode = "summary"
-            for line in lines:
-                low = line.lower()
-                if low.startswith("- summary") or low.startswith("summary:"):
-                    mode = "summary"
-                    continue
-                if low.startswith("- analysis") or low.startswith("analysis:") or low.startswith("- analiz") or low.startswith("analiz:"):
-                    mode = "analysis"
-                    continue
-                if mode == "summary":
-                    summary_lines.append(line.lstrip("- "))
-                elif mode == "analysis":
-                    analysis_lines.append(line.lstrip("- "))
-
-            summary = " ".join(summary_lines)
-            analysis = " ".join(analysis_lines)
-            return {"summary": summary, "analysis": analysis}
-        except Exception as e:
-            logger.error(f"OpenAI summary generation failed: {e}")
-            # Fallback: very basic template
-            return {
-                "summary": "Sorgu, girilen soruya göre ilgili tabloları kullanarak verileri getirir.",
-                "analysis": "Bu rapora göre verilerinizde genel eğilimler ve önemli noktalar görülüyor. Tarih bazında artış ve azalış dönemleri, en yüksek ve en düşük performans gösteren kategoriler ile dikkat çekici segmentler bulunuyor. Detaylı analiz için sonuçları inceleyebilirsiniz."
-            }
-
-    def summarize_results(self, question: str, sql_query: str, results: List[Dict]) -> Dict[str, str]:
-        """Generate a brief Turkish business summary and conversational analysis over actual query results.
-
-        Returns dict with keys: summary (str) and analysis (str).
-        """
-        if not self.ai_available:
-            logger.warning("AI service not available, returning fallback summary")
-            return {
-                "summary": f"Bu sorgu '{question}' sorusuna yanıt veriyor. {len(results)} kayıt bulundu.",
-                "analysis": f"Sorgu sonuçlarına göre {len(results)} kayıt analiz edildi. Verilerinizde önemli trendler ve karşılaştırmalar bulunuyor."
-            }
+    @staticmethod
+    def _results_summary_prompt(question: str, sql_query: str, results: ResultSet,
+                                row_count: Optional[int] = None, partial: bool = False) -> str:
+        """Prompt for summarizing actual query results.
         
-        # Test AI connection
-        try:
-            test_response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": "Test"}],
-                max_tokens=10
-            )
-            logger.info("AI connection test successful")
-        except Exception as e:
-            logger.error(f"AI connection test failed: {e}")
-            return {
-                "summary": f"Bu sorgu '{question}' sorusuna yanıt veriyor. {len(results)} kayıt bulundu.",
-                "analysis": f"Sorgu sonuçlarına göre {len(results)} kayıt analiz edildi. Verilerinizde önemli trendler ve karşılaştırmalar bulunuyor."
-            }
+        The results go in as a per-column profile of all rows plus a stratified sample table;
+        a preview of a larger result is labelled as such.
+        """
+        results_text = "TABLO SONUÇLARI:\n" + result_profiler.format(results, row_count, partial)
         
-        try:
-            # Limit payload size for the LLM
-            sample = results[:50]
-            sample_preview = sample[:10]
-            
-            # Format results as structured text for better AI understanding
-            import json
-            
-            # Create a more readable format for AI
-            results_text = "TABLO SONUÇLARI:\n"
-            if sample_preview:
-                headers = list(sample_preview[0].keys())
-                results_text += "Sütunlar: " + ", ".join(headers) + "\n\n"
-                
-                for i, row in enumerate(sample_preview, 1):
-                    results_text += f"Satır {i}:\n"
-                    for key, value in row.items():
-                        results_text += f"  {key}: {value}\n"
-                    results_text += "\n"
-            else:
-                results_text += "Sonuç bulunamadı.\n"
-            
-            prompt = f"""
+        return f"""
 Sen bir iş analisti ve rapor uzmanısın. Kullanıcının sorusu, SQL sorgusu ve gerçek sonuçlar verilmiş.
 Türkçe olarak şunları üret:
 
@@ -298,7 +705,8 @@ Türkçe olarak şunları üret:
    düşüş yaşanmış. Müşteri segmentlerinde kurumsal müşteriler %60 payla öne çıkıyor ve 
    İstanbul bölgesinde potansiyel görüyorum."
    
-   Gerçek sayıları, tarihleri, kategorileri kullan. Trendleri, karşılaştırmaları, 
+   Gerçek sayıları, tarihleri, kategorileri kullan. Toplamlar ve aralıklar için sütun
+   profilini, ayrıntılar için örnek satırları kullan. Trendleri, karşılaştırmaları, 
    önemli noktaları vurgula. Sanki kullanıcıya rapor sunuyormuş gibi yaz. 
    4-5 cümle, samimi ve profesyonel ton.
 
@@ -314,38 +722,11 @@ Format:
 - Özet: <2-3 cümle>
 - Analiz: <4-5 cümle, doğal konuşma tarzı, gerçek verilerle>
 """
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=400,
-                temperature=0.3
-            )
-            content = response.choices[0].message.content.strip()
-
-            # Simple parse similar to summarize_sql
-            lines = [l.strip() for l in content.splitlines() if l.strip()]
-            summary_lines: List[str] = []
-            analysis_lines: List[str] = []
-            mode = "summary"
-            for line in lines:
-                low = line.lower()
-                if low.startswith("- özet") or low.startswith("- ozet") or low.startswith("özet:") or low.startswith("ozet:") or low.startswith("- summary") or low.startswith("summary:"):
-                    mode = "summary"
-                    continue
-                if low.startswith("- analiz") or low.startswith("analiz:") or low.startswith("- analysis") or low.startswith("analysis:"):
-                    mode = "analysis"
-                    continue
-                if mode == "summary":
-                    summary_lines.append(line.lstrip("- "))
-                elif mode == "analysis":
-                    analysis_lines.append(line.lstrip("- "))
-
-            summary = " ".join(summary_lines)
-            analysis = " ".join(analysis_lines)
-            return {"summary": summary, "analysis": analysis}
-        except Exception as e:
-            logger.error(f"OpenAI results summary failed: {e}")
-            return {
-                "summary": "Sonuçlar genel olarak beklenen eğilimleri gösteriyor; metrikleri dönem bazında karşılaştırın.",
-                "analysis": "Bu rapora göre verilerinizde önemli trendler ve karşılaştırmalar görülüyor. Dönemsel artış ve azalış dönemleri, en yüksek performans gösteren kategoriler ve dikkat çekici segmentler bulunuyor. Detaylı analiz için sonuçları inceleyebilirsiniz."
-            }
\ No newline at end of file
+
+    @staticmethod
+    def _parse_summary(content: str) -> Dict[str, str]:
+        """Split a complete model answer into summary and analysis."""
+        parser = _SummaryStreamParser()
+        parser.feed(content)
+        parser.finish()
+        return parser.result()
@@ -0,0 +1,300 @@
+"""
+Connection pooling for database access.
+Keeps a bounded set of reusable ODBC connections per DSN.
+"""
+import threading
+import time
+from typing import Dict, Any, Optional, List, Callable
+
+import pyodbc
+import logging
+
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no pooled connection becomes available in time."""
+    pass
+
+
+# SQLSTATEs meaning the connection itself failed: 08xxx connection exceptions, HYT01 connection timeout
+_CONNECTION_SQLSTATES = ("08", "HYT01")
+
+
+def is_connection_error(error: Exception) -> bool:
+    """True if a driver error means the connection is broken rather than the statement failed.
+
+    Ordinary statement errors (bad column, syntax error, constraint
+    violation) leave the connection usable and it can go back to the pool.
+    """
+    if isinstance(error, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+        return True
+    if not isinstance(error, pyodbc.Error):
+        return False
+    sqlstate = error.args[0] if error.args and isinstance(error.args[0], str) else ""
+    return sqlstate.startswith(_CONNECTION_SQLSTATES)
+
+
+class _PooledConnection:
+    """A raw connection plus the bookkeeping the pool needs."""
+
+    __slots__ = ("conn", "created_at", "last_used_at")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used_at = now
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of ODBC connections for a single DSN."""
+
+    def __init__(
+        self,
+        dsn: str,
+        max_size: int = Config.DB_POOL_MAX_SIZE,
+        timeout: int = Config.DB_CONNECTION_TIMEOUT,
+        checkout_timeout: float = Config.DB_POOL_CHECKOUT_TIMEOUT,
+        max_idle: float = Config.DB_POOL_MAX_IDLE,
+        max_age: float = Config.DB_POOL_MAX_AGE,
+        validate_after: float = Config.DB_POOL_VALIDATE_AFTER,
+        connect: Optional[Callable[..., Any]] = None
+    ):
+        """Create an empty pool; connections are opened lazily on checkout."""
+        self._dsn = dsn
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.checkout_timeout = checkout_timeout
+        self.max_idle = max_idle
+        self.max_age = max_age
+        self.validate_after = validate_after
+        self._connect = connect or pyodbc.connect
+
+        self._idle: List[_PooledConnection] = []
+        self._in_use: Dict[int, _PooledConnection] = {}
+        # Slots claimed by threads that are currently opening a new connection
+        self._reserved = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "recycled": 0,
+            "validation_failures": 0,
+            "discarded": 0,
+            "wait_count": 0,
+            "wait_time_total": 0.0,
+            "timeouts": 0,
+        }
+
+    def acquire(self):
+        """Check out a connection, opening a new one if the pool has room."""
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = False
+        wait_start = 0.0
+
+        while True:
+            stale: List[_PooledConnection] = []
+            entry = None
+            may_create = False
+
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._is_expired(candidate):
+                        stale.append(candidate)
+                        self._stats["recycled"] += 1
+                        continue
+                    entry = candidate
+                    break
+
+                if entry is None:
+                    if len(self._in_use) + self._reserved < self.max_size:
+                        may_create = True
+                        self._reserved += 1
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise PoolExhaustedError(
+                                f"No database connection available within {self.checkout_timeout}s "
+                                f"(pool size {self.max_size})"
+                            )
+                        if not waited:
+                            waited = True
+                            wait_start = time.monotonic()
+                            self._stats["wait_count"] += 1
+                        self._cond.wait(remaining)
+                else:
+                    self._in_use[id(entry.conn)] = entry
+
+            self._close_all(stale)
+
+            if entry is not None:
+                if not self._validate(entry):
+                    with self._cond:
+                        self._in_use.pop(id(entry.conn), None)
+                        self._stats["validation_failures"] += 1
+                        self._cond.notify()
+                    self._close_all([entry])
+                    continue
+                entry.last_used_at = time.monotonic()
+                with self._cond:
+                    self._stats["reused"] += 1
+                    self._record_wait(waited, wait_start)
+                return entry.conn
+
+            if may_create:
+                try:
+                    conn = self._connect(self._dsn, timeout=self.timeout)
+                except Exception:
+                    with self._cond:
+                        self._reserved -= 1
+                        self._cond.notify()
+                    raise
+                entry = _PooledConnection(conn)
+                with self._cond:
+                    self._reserved -= 1
+                    self._in_use[id(conn)] = entry
+                    self._stats["created"] += 1
+                    self._record_wait(waited, wait_start)
+                return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it if it is no longer usable."""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+            self._cond.notify()
+
+        if entry is None:
+            # Not ours (or already released); just make sure it does not leak
+            self._close_all([_PooledConnection(conn)])
+            return
+
+        if not discard:
+            try:
+                # Leave no open transaction behind for the next borrower
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard or self._closed or self._is_expired(entry):
+            with self._cond:
+                self._stats["discarded" if discard else "recycled"] += 1
+            self._close_all([entry])
+            return
+
+        entry.last_used_at = time.monotonic()
+        with self._cond:
+            if not self._closed:
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._close_all([entry])
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage counters."""
+        with self._cond:
+            metrics = dict(self._stats)
+            metrics.update({
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "size": len(self._in_use) + len(self._idle),
+                "closed": self._closed,
+            })
+        wait_count = metrics["wait_count"]
+        metrics["wait_time_avg"] = (metrics["wait_time_total"] / wait_count) if wait_count else 0.0
+        return metrics
+
+    def _is_expired(self, entry: _PooledConnection) -> bool:
+        """Check idle and max-age limits for a pooled connection."""
+        now = time.monotonic()
+        if self.max_age and now - entry.created_at > self.max_age:
+            return True
+        if self.max_idle and now - entry.last_used_at > self.max_idle:
+            return True
+        return False
+
+    def _validate(self, entry: _PooledConnection) -> bool:
+        """Ping the server if the connection has been idle long enough to be suspect."""
+        if time.monotonic() - entry.last_used_at < self.validate_after:
+            return True
+        try:
+            cursor = entry.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding pooled connection that failed validation: {e}")
+            return False
+
+    def _record_wait(self, waited: bool, wait_start: float) -> None:
+        """Accumulate time spent blocked on a full pool (caller holds the lock)."""
+        if waited:
+            self._stats["wait_time_total"] += time.monotonic() - wait_start
+
+    @staticmethod
+    def _close_all(entries: List[_PooledConnection]) -> None:
+        """Close raw connections, ignoring errors from already-dead sockets."""
+        for entry in entries:
+            try:
+                entry.conn.close()
+            except Exception:
+                pass
+
+
+class PoolRegistry:
+    """Process-wide registry that hands out one pool per DSN."""
+
+    def __init__(self):
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get_pool(self, dsn: str) -> ConnectionPool:
+        """Return the pool for a DSN, creating it on first use."""
+        with self._lock:
+            pool = self._pools.get(dsn)
+            if pool is None:
+                pool = ConnectionPool(dsn)
+                self._pools[dsn] = pool
+            return pool
+
+    def release_pool(self, dsn: str) -> None:
+        """Forget the pool for a DSN and close it once its borrowers are done.
+
+        Idle connections close now; connections still checked out keep
+        working and are closed when they are returned. Later get_pool()
+        calls for the DSN start a new pool.
+        """
+        with self._lock:
+            pool = self._pools.pop(dsn, None)
+        if pool:
+            pool.close()
+
+    def close_all(self) -> None:
+        """Close every pool (used at shutdown)."""
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+# Global pool registry shared by all DatabaseManager instances
+pool_registry = PoolRegistry()
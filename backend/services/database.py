@@ -2,21 +2,97 @@
 Database operations and connection management.
 Handles all database-related functionality.
 """
+import json
+import math
 import pyodbc
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
 from contextlib import contextmanager
-from backend.models.models import DatabaseConnection, TableInfo, DatabaseSchema, QueryResponse, QueryType, SavedQuery
+from backend.models.models import (
+    DatabaseConnection, TableInfo, ColumnInfo, ForeignKeyInfo, DatabaseSchema,
+    QueryResponse, QueryType, SavedQuery, ResultSet
+)
 from backend.config.config import Config
 import logging
 from backend.core.utils import ODBCUtils
+from backend.core.sql_lexer import tokenize, statement_type
+from backend.services.connection_pool import ConnectionPool, pool_registry, is_connection_error
+from backend.services.result_cursors import result_cursors, fetch_rows
+from backend.services.result_store import ResultStore
+from backend.services.schema_migrations import schema_migrator
+from backend.services.metrics import metrics
+from backend.services.query_control import query_registry, QueryCancelledError
 import keyring
 
 logger = logging.getLogger(__name__)
 
+# Tables, columns, types, nullability, primary keys and foreign keys in one pass.
+# One row per column (plus one per extra foreign key on the same column).
+SCHEMA_INTROSPECTION_QUERY = """
+    SELECT
+        s.name AS schema_name,
+        t.name AS table_name,
+        c.name AS column_name,
+        ty.name AS data_type,
+        c.max_length,
+        c.precision,
+        c.scale,
+        c.is_nullable,
+        CASE WHEN pk.column_id IS NULL THEN 0 ELSE 1 END AS is_primary_key,
+        rt.name AS referenced_table,
+        rc.name AS referenced_column
+    FROM sys.tables t
+    JOIN sys.schemas s ON s.schema_id = t.schema_id
+    JOIN sys.columns c ON c.object_id = t.object_id
+    JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+    LEFT JOIN (
+        SELECT ic.object_id, ic.column_id
+        FROM sys.indexes i
+        JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+        WHERE i.is_primary_key = 1
+    ) pk ON pk.object_id = c.object_id AND pk.column_id = c.column_id
+    LEFT JOIN sys.foreign_key_columns fkc
+        ON fkc.parent_object_id = c.object_id AND fkc.parent_column_id = c.column_id
+    LEFT JOIN sys.tables rt ON rt.object_id = fkc.referenced_object_id
+    LEFT JOIN sys.columns rc
+        ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+    {where}
+    ORDER BY CASE WHEN s.name = 'dbo' THEN 0 ELSE 1 END, s.name, t.name, c.column_id
+"""
+
+# Table, column and foreign key names only, for the table index; no types or primary keys.
+# Same columns as SCHEMA_INTROSPECTION_QUERY, so the rows go through the same builder.
+TABLE_CATALOG_QUERY = """
+    SELECT
+        s.name AS schema_name,
+        t.name AS table_name,
+        c.name AS column_name,
+        NULL AS data_type,
+        NULL AS max_length,
+        NULL AS precision,
+        NULL AS scale,
+        c.is_nullable,
+        0 AS is_primary_key,
+        rt.name AS referenced_table,
+        rc.name AS referenced_column
+    FROM sys.tables t
+    JOIN sys.schemas s ON s.schema_id = t.schema_id
+    JOIN sys.columns c ON c.object_id = t.object_id
+    LEFT JOIN sys.foreign_key_columns fkc
+        ON fkc.parent_object_id = c.object_id AND fkc.parent_column_id = c.column_id
+    LEFT JOIN sys.tables rt ON rt.object_id = fkc.referenced_object_id
+    LEFT JOIN sys.columns rc
+        ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+    ORDER BY CASE WHEN s.name = 'dbo' THEN 0 ELSE 1 END, s.name, t.name, c.column_id
+"""
+
 
 class DatabaseManager:
     """Manages database connections and operations."""
     
+    # Leading statement keyword -> query type
+    _QUERY_TYPES = {query_type.value: query_type for query_type in QueryType if query_type != QueryType.OTHER}
+    
     def __init__(self, connection_string: str, keyring_account: Optional[str] = None):
         """Initialize database manager with sanitized connection string (no PWD).
         keyring_account identifies where the password is stored in OS keyring.
@@ -24,39 +100,77 @@ class DatabaseManager:
         self.connection_string = connection_string
         self.keyring_account = keyring_account
         self.timeout = Config.DB_CONNECTION_TIMEOUT
-    
+        self._dsn: Optional[str] = None
+
+    def _resolve_dsn(self) -> str:
+        """Build the full DSN once (keyring lookup + parsing) and reuse it."""
+        if self._dsn is not None:
+            return self._dsn
+
+        # If keyring_account is set, fetch password and build full DSN
+        dsn = self.connection_string
+        if self.keyring_account:
+            pwd = keyring.get_password(Config.KEYRING_SERVICE, self.keyring_account)
+            if not pwd:
+                raise RuntimeError("Stored database password not found in keyring")
+            parsed = ODBCUtils.parse_dsn(self.connection_string)
+            driver_val = parsed.get("DRIVER") or f"{{{Config.DEFAULT_ODBC_DRIVER}}}"
+            server_val = parsed.get("SERVER")
+            db_val = parsed.get("DATABASE")
+            uid_val = parsed.get("UID")
+            if not (server_val and db_val and uid_val):
+                raise RuntimeError("Invalid stored DSN (missing SERVER/DATABASE/UID)")
+            dsn = ODBCUtils.build_dsn(driver_val.strip("{}"), server_val, db_val, uid_val, pwd)
+
+        self._dsn = dsn
+        return dsn
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Connection pool shared by every manager using the same DSN."""
+        return pool_registry.get_pool(self._resolve_dsn())
+
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections."""
+        """Context manager for pooled database connections."""
         conn = None
+        discard = False
+        # Resolve the pool once: the connection goes back to the pool it came from
+        pool = self.pool
         try:
-            # If keyring_account is set, fetch password and build full DSN
-            dsn = self.connection_string
-            if self.keyring_account:
-                pwd = keyring.get_password(Config.KEYRING_SERVICE, self.keyring_account)
-                if not pwd:
-                    raise RuntimeError("Stored database password not found in keyring")
-                parsed = ODBCUtils.parse_dsn(self.connection_string)
-                driver_val = parsed.get("DRIVER") or f"{{{Config.DEFAULT_ODBC_DRIVER}}}"
-                server_val = parsed.get("SERVER")
-                db_val = parsed.get("DATABASE")
-                uid_val = parsed.get("UID")
-                if not (server_val and db_val and uid_val):
-                    raise RuntimeError("Invalid stored DSN (missing SERVER/DATABASE/UID)")
-                dsn = ODBCUtils.build_dsn(driver_val.strip("{}"), server_val, db_val, uid_val, pwd)
-
-            conn = pyodbc.connect(
-                dsn,
-                timeout=self.timeout
-            )
+            with metrics.span("db_connection"):
+                conn = pool.acquire()
             yield conn
+        except QueryCancelledError:
+            # Interrupted mid-statement; do not hand the connection to the next caller
+            discard = True
+            raise
         except pyodbc.Error as e:
-            logger.error(f"Database connection error: {e}")
+            # A broken connection must not reach the next caller; a failed statement leaves it usable
+            discard = is_connection_error(e)
+            logger.error(f"Database error: {e}")
             raise
         finally:
             if conn:
-                conn.close()
-    
+                pool.release(conn, discard=discard)
+
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """Get connection pool usage metrics."""
+        return self.pool.get_metrics()
+
+    def close(self) -> None:
+        """Release the connection pool for this DSN (borrowed connections close when returned)."""
+        if self._dsn is not None:
+            pool_registry.release_pool(self._dsn)
+            self._dsn = None
+
+    def shares_pool_with(self, other: "DatabaseManager") -> bool:
+        """True if both managers connect with the same DSN and so use the same pool."""
+        try:
+            return self._resolve_dsn() == other._resolve_dsn()
+        except Exception:
+            return False
+
     def test_connection(self) -> bool:
         """Test database connection."""
         try:
@@ -104,192 +218,391 @@ class DatabaseManager:
     
     def get_multiple_table_columns(self, table_names: List[str]) -> Dict[str, List[str]]:
         """Get columns for multiple tables."""
-        columns_dict = {}
-        for table_name in table_names:
-            try:
-                columns_dict[table_name] = self.get_table_columns(table_name)
-            except Exception as e:
-                logger.error(f"Failed to get columns for table '{table_name}': {e}")
-                raise
-        return columns_dict
+        schema = self.get_tables_schema(table_names)
+        return {
+            table_name: schema.tables[table_name].columns if table_name in schema.tables else []
+            for table_name in table_names
+        }
     
     def get_database_schema(self) -> DatabaseSchema:
-        """Get complete database schema."""
-        tables = self.get_tables()
-        tables_info = {}
+        """Get complete database schema with a single catalog query."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(SCHEMA_INTROSPECTION_QUERY.format(where=""))
+                tables_info = self._build_tables_from_rows(cursor.fetchall())
+                logger.info(f"Retrieved schema for {len(tables_info)} tables")
+                return DatabaseSchema(tables=tables_info)
+        except Exception as e:
+            logger.error(f"Error retrieving database schema: {e}")
+            raise
+    
+    def get_tables_schema(self, table_names: List[str]) -> DatabaseSchema:
+        """Get schema for the given tables only, with one parameterized query.
+        Names may be plain ("Orders") or schema-qualified ("sales.Orders").
+        """
+        requested = list(dict.fromkeys(name for name in table_names if name))
+        if not requested:
+            return DatabaseSchema(tables={})
+        
+        # Match on the bare table name; qualified keys are resolved below
+        bare_names = list(dict.fromkeys(name.split(".")[-1] for name in requested))
+        placeholders = ", ".join("?" for _ in bare_names)
         
-        for table_name in tables:
-            columns = self.get_table_columns(table_name)
-            tables_info[table_name] = TableInfo(name=table_name, columns=columns)
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    SCHEMA_INTROSPECTION_QUERY.format(where=f"WHERE t.name IN ({placeholders})"),
+                    bare_names
+                )
+                tables_info = self._build_tables_from_rows(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Error retrieving schema for tables {requested}: {e}")
+            raise
         
+        tables_info = {name: info for name, info in tables_info.items() if name in requested}
+        logger.info(f"Retrieved schema for {len(tables_info)} of {len(requested)} requested tables")
         return DatabaseSchema(tables=tables_info)
     
-    def execute_query(self, sql_query: str) -> QueryResponse:
-        """Execute SQL query and return results."""
+    def get_table_catalog(self) -> Dict[str, TableInfo]:
+        """Get every table with its column and foreign key names, without data types or primary keys.
+        Cheaper than get_database_schema; used to build the table index before the full schema is cached.
+        """
         try:
-            query_type = self._determine_query_type(sql_query)
-            
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(sql_query)
-                
-                if query_type == QueryType.SELECT:
-                    columns = [col[0] for col in cursor.description]
-                    rows = cursor.fetchall()
-                    results = [dict(zip(columns, row)) for row in rows]
-                    
-                    return QueryResponse(
-                        sql_query=sql_query,
-                        query_type=query_type,
-                        results=results
-                    )
-                else:
-                    conn.commit()
-                    row_count = cursor.rowcount
-                    
-                    return QueryResponse(
-                        sql_query=sql_query,
-                        query_type=query_type,
-                        message=f"{row_count} satır etkilendi.",
-                        row_count=row_count
-                    )
+                cursor.execute(TABLE_CATALOG_QUERY)
+                tables_info = self._build_tables_from_rows(cursor.fetchall())
+                logger.info(f"Retrieved table catalog for {len(tables_info)} tables")
+                return tables_info
+        except Exception as e:
+            logger.error(f"Error retrieving table catalog: {e}")
+            raise
+    
+    def get_schema_fingerprint(self) -> tuple:
+        """Get a cheap fingerprint that changes whenever tables or keys change."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT COUNT(*), MAX(modify_date) FROM sys.objects "
+                "WHERE type IN ('U', 'PK', 'F')"
+            )
+            row = cursor.fetchone()
+            return (row[0], row[1])
+    
+    @staticmethod
+    def _build_tables_from_rows(rows) -> Dict[str, TableInfo]:
+        """Group introspection rows into TableInfo objects keyed by table name.
+        Tables whose name already exists in another schema are keyed as schema.table.
+        """
+        tables_info: Dict[str, TableInfo] = {}
+        keys_by_table: Dict[tuple, str] = {}
+        seen_columns = set()
+        
+        for row in rows:
+            (schema_name, table_name, column_name, data_type, max_length,
+             precision, scale, is_nullable, is_primary_key,
+             referenced_table, referenced_column) = row
+            
+            table_key = keys_by_table.get((schema_name, table_name))
+            if table_key is None:
+                table_key = table_name if table_name not in tables_info else f"{schema_name}.{table_name}"
+                keys_by_table[(schema_name, table_name)] = table_key
+                tables_info[table_key] = TableInfo(
+                    name=table_key, columns=[column_name], schema=schema_name
+                )
+            table = tables_info[table_key]
+            
+            # A column referenced by several foreign keys comes back once per key
+            if (table_key, column_name) not in seen_columns:
+                seen_columns.add((table_key, column_name))
+                if table.columns[-1] != column_name:
+                    table.columns.append(column_name)
+                table.column_details.append(ColumnInfo(
+                    name=column_name,
+                    data_type=DatabaseManager._format_data_type(data_type, max_length, precision, scale),
+                    is_nullable=bool(is_nullable),
+                    is_primary_key=bool(is_primary_key)
+                ))
+                if is_primary_key:
+                    table.primary_keys.append(column_name)
+            
+            if referenced_table and referenced_column:
+                table.foreign_keys.append(ForeignKeyInfo(
+                    column=column_name,
+                    referenced_table=referenced_table,
+                    referenced_column=referenced_column
+                ))
+        
+        return tables_info
+    
+    @staticmethod
+    def _format_data_type(data_type: str, max_length: int, precision: int, scale: int) -> str:
+        """Render a sys.types name with its length/precision, e.g. nvarchar(50)."""
+        if data_type in ("varchar", "char", "varbinary", "binary"):
+            return f"{data_type}({'MAX' if max_length == -1 else max_length})"
+        if data_type in ("nvarchar", "nchar"):
+            return f"{data_type}({'MAX' if max_length == -1 else max_length // 2})"
+        if data_type in ("decimal", "numeric"):
+            return f"{data_type}({precision},{scale})"
+        return data_type
+    
+    @staticmethod
+    def _timed_cursor(conn, timeout: float):
+        """Create a cursor with the driver's query timeout set for it only.
+        
+        pyodbc copies Connection.timeout into each cursor when it is created,
+        so the timeout is set first and reset to 0 for later cursors on the
+        pooled connection.
+        """
+        conn.timeout = int(math.ceil(timeout)) if timeout > 0 else 0
+        try:
+            return conn.cursor()
+        finally:
+            conn.timeout = 0
+    
+    def execute_query(self, sql_query: str, page_size: Optional[int] = None,
+                      execution_id: Optional[str] = None,
+                      timeout: float = Config.QUERY_TIMEOUT) -> QueryResponse:
+        """Execute SQL query and return results.
+        
+        SELECT rows are fetched in fetchmany batches and never beyond
+        Config.QUERY_MAX_ROWS or Config.QUERY_MAX_BYTES. With page_size, only
+        the first page is returned and, if more rows exist, the cursor stays
+        open behind next_page_token. The statement runs under execution_id
+        (see query_registry) and is cancelled after timeout seconds; a
+        cancelled run returns an error response with status set. Each later
+        page fetch runs under the same execution_id and timeout.
+        """
+        conn = None
+        pool = None
+        keep_open = False
+        discard = False
+        try:
+            query_type = self._determine_query_type(sql_query)
+            
+            pool = self.pool
+            conn = pool.acquire()
+            cursor = self._timed_cursor(conn, timeout)
+            with query_registry.track(execution_id, cursor, timeout) as running:
+                try:
+                    cursor.execute(sql_query)
                     
+                    if query_type == QueryType.SELECT:
+                        columns = [col[0] for col in cursor.description]
+                        max_rows = Config.QUERY_MAX_ROWS
+                        limit = min(page_size, max_rows) if page_size else max_rows
+                        
+                        # Fetch one extra row to know whether more rows exist
+                        rows = fetch_rows(cursor, limit + 1)
+                        rows, over_budget = running.take(rows)
+                        has_more = len(rows) > limit or over_budget
+                        results = ResultSet(columns=columns, rows=[tuple(row) for row in rows[:limit]])
+                        
+                        response = QueryResponse(
+                            sql_query=sql_query,
+                            query_type=query_type,
+                            results=results
+                        )
+                        if has_more and limit < max_rows and not over_budget:
+                            response.next_page_token = result_cursors.register(
+                                pool, conn, cursor, columns,
+                                delivered=limit, pending=rows[limit:],
+                                bytes_left=running.bytes_left,
+                                execution_id=running.execution_id, timeout=timeout
+                            )
+                            keep_open = True
+                        elif has_more:
+                            response.truncated = True
+                            logger.warning(f"Query result truncated at {len(results)} rows (row or byte budget)")
+                        return response
+                    else:
+                        conn.commit()
+                        row_count = cursor.rowcount
+                        
+                        return QueryResponse(
+                            sql_query=sql_query,
+                            query_type=query_type,
+                            message=f"{row_count} satır etkilendi.",
+                            row_count=row_count
+                        )
+                except pyodbc.Error as e:
+                    raise running.stopped_error(e) from e
+                
+        except QueryCancelledError as e:
+            # The statement was interrupted mid-flight; do not reuse its connection
+            discard = True
+            logger.warning(f"Query stopped: {e.reason}")
+            return QueryResponse(
+                sql_query=sql_query,
+                query_type=QueryType.OTHER,
+                error=str(e),
+                status=e.reason
+            )
         except Exception as e:
+            discard = is_connection_error(e)
             logger.error(f"Error executing query: {e}")
             return QueryResponse(
                 sql_query=sql_query,
                 query_type=QueryType.OTHER,
                 error=str(e)
             )
+        finally:
+            if conn and not keep_open:
+                pool.release(conn, discard=discard)
     
-    def _determine_query_type(self, sql_query: str) -> QueryType:
-        """Determine the type of SQL query."""
-        query_upper = sql_query.strip().upper()
+    def stream_query(self, sql_query: str, batch_size: int = Config.QUERY_FETCH_BATCH_SIZE,
+                     execution_id: Optional[str] = None, timeout: float = Config.QUERY_TIMEOUT):
+        """Execute a SELECT and yield its result incrementally.
         
-        if query_upper.startswith('SELECT'):
-            return QueryType.SELECT
-        elif query_upper.startswith('INSERT'):
-            return QueryType.INSERT
-        elif query_upper.startswith('UPDATE'):
-            return QueryType.UPDATE
-        elif query_upper.startswith('DELETE'):
-            return QueryType.DELETE
-        else:
-            return QueryType.OTHER
-    
-    def create_queries_table(self) -> bool:
-        """Create the saved_queries table if it doesn't exist."""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Check if table exists
-                cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM INFORMATION_SCHEMA.TABLES 
-                    WHERE TABLE_NAME = 'saved_queries'
-                """)
-                
-                if cursor.fetchone()[0] == 0:
-                    # Create table
-                    cursor.execute("""
-                        CREATE TABLE saved_queries (
-                            id INT IDENTITY(1,1) PRIMARY KEY,
-                            question NVARCHAR(MAX) NOT NULL,
-                            sql_query NVARCHAR(MAX) NOT NULL,
-                            tables_used NVARCHAR(MAX),
-                            created_at DATETIME2 DEFAULT GETDATE(),
-                            is_successful BIT DEFAULT 1,
-                            error_message NVARCHAR(MAX),
-                            query_results NVARCHAR(MAX),
-                            result_message NVARCHAR(MAX)
-                        )
-                    """)
-                    conn.commit()
-                    logger.info("Created saved_queries table")
-                    return True
-                else:
-                    # Check if new columns exist, if not add them
-                    cursor.execute("""
-                        SELECT COUNT(*)
-                        FROM INFORMATION_SCHEMA.COLUMNS
-                        WHERE TABLE_NAME = 'saved_queries' AND COLUMN_NAME = 'query_results'
-                    """)
-                    
-                    if cursor.fetchone()[0] == 0:
-                        cursor.execute("ALTER TABLE saved_queries ADD query_results NVARCHAR(MAX)")
-                        cursor.execute("ALTER TABLE saved_queries ADD result_message NVARCHAR(MAX)")
-                        conn.commit()
-                        logger.info("Added query_results and result_message columns to saved_queries table")
-                    
-                    logger.info("saved_queries table already exists")
-                    return True
+        Yields ("columns", [names]) once, then ("rows", [tuples]) per fetchmany
+        batch, and finally ("end", {"row_count": n, "truncated": bool}).
+        Stops at Config.QUERY_MAX_ROWS or Config.QUERY_MAX_BYTES. Rows are never
+        accumulated here. Raises QueryCancelledError if the statement is
+        cancelled (execution_id) or runs past timeout seconds, streaming included.
+        """
+        max_rows = Config.QUERY_MAX_ROWS
+        with self.get_connection() as conn:
+            cursor = self._timed_cursor(conn, timeout)
+            with query_registry.track(execution_id, cursor, timeout) as running:
+                try:
+                    cursor.execute(sql_query)
+                    columns = [col[0] for col in cursor.description] if cursor.description else []
+                    yield "columns", columns
                     
-        except Exception as e:
-            logger.error(f"Error creating queries table: {e}")
-            return False
+                    row_count = 0
+                    truncated = False
+                    while columns:
+                        batch = cursor.fetchmany(min(batch_size, max_rows - row_count))
+                        if not batch:
+                            break
+                        batch, truncated = running.take(batch)
+                        row_count += len(batch)
+                        if batch:
+                            yield "rows", batch
+                        if truncated:
+                            break
+                        if row_count >= max_rows:
+                            truncated = cursor.fetchone() is not None
+                            break
+                    cursor.close()
+                except pyodbc.Error as e:
+                    raise running.stopped_error(e) from e
+            yield "end", {"row_count": row_count, "truncated": truncated}
+    
+    def fetch_result_page(self, page_token: str, page_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Fetch the next page of a paged SELECT result.
+        Returns None when the token is unknown, exhausted or expired; raises
+        QueryCancelledError if the fetch is cancelled or runs past the query's timeout.
+        """
+        page = result_cursors.fetch_page(page_token, page_size or Config.QUERY_PAGE_SIZE)
+        if page is None:
+            return None
+        results = ResultSet(columns=page.pop("columns"), rows=[tuple(row) for row in page.pop("rows")])
+        page["results"] = results.to_wire()
+        page["row_count"] = len(results)
+        return page
+    
+    def is_select_query(self, sql_query: str) -> bool:
+        """Check whether a query returns a result set."""
+        return self._determine_query_type(sql_query) == QueryType.SELECT
+    
+    def _determine_query_type(self, sql_query: str) -> QueryType:
+        """Determine the type of SQL query (a WITH query takes the type of its main statement)."""
+        return self._QUERY_TYPES.get(statement_type(tokenize(sql_query)), QueryType.OTHER)
+    
+    def ensure_schema(self) -> bool:
+        """Create or upgrade the saved_queries tables (once per connection per process)."""
+        return schema_migrator.ensure(self)
     
     def save_query(self, saved_query: SavedQuery) -> Optional[int]:
-        """Save a query to the database."""
+        """Save a query to the database right away; returns its ID.
+        Request handlers queue history through history_writer instead.
+        """
         try:
-            import json
-            from datetime import datetime, date
-            from decimal import Decimal
-            
-            def json_serializer(obj):
-                """JSON serializer for objects not serializable by default json code"""
-                if isinstance(obj, (datetime, date)):
-                    return obj.isoformat()
-                if isinstance(obj, Decimal):
-                    return float(obj)
-                raise TypeError(f"Type {type(obj)} not serializable")
-            
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Ensure table exists
-                self.create_queries_table()
-                
-                # Convert query results to JSON string
-                query_results_json = None
-                if saved_query.query_results is not None:
-                    query_results_json = json.dumps(saved_query.query_results, ensure_ascii=False, default=json_serializer)
-                
-                # Insert query
-                cursor.execute("""
-                    INSERT INTO saved_queries (question, sql_query, tables_used, is_successful, error_message, query_results, result_message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    saved_query.question,
-                    saved_query.sql_query,
-                    ','.join(saved_query.tables_used) if saved_query.tables_used else '',
-                    saved_query.is_successful,
-                    saved_query.error_message,
-                    query_results_json,
-                    saved_query.result_message
-                ))
-                
-                conn.commit()
-                
-                # Get the last inserted ID
-                cursor.execute("SELECT @@IDENTITY")
-                query_id = cursor.fetchone()[0]
-                logger.info(f"Saved query with ID: {query_id}")
-                return int(query_id) if query_id else None
-                
+            return self.save_queries([saved_query])[0]
         except Exception as e:
             logger.error(f"Error saving query: {e}")
             return None
     
+    def save_queries(self, saved_queries: List[SavedQuery]) -> List[int]:
+        """Insert several queries in one transaction; returns their IDs in the same order.
+        Results go to the compressed result store; saved_queries keeps their hash.
+        Raises on failure so the caller can keep the records.
+        """
+        if not saved_queries:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            result_hashes = ResultStore.put_many(cursor, [q.query_results for q in saved_queries])
+            rows = [
+                {
+                    "ord": position,
+                    "question": q.question,
+                    "sql_query": q.sql_query,
+                    "tables_used": ','.join(q.tables_used) if q.tables_used else '',
+                    "created_at": (q.created_at or datetime.now()).isoformat(),
+                    "is_successful": bool(q.is_successful),
+                    "error_message": q.error_message,
+                    "result_message": q.result_message,
+                    "result_hash": result_hash,
+                    "row_count": q.row_count,
+                    "status": q.status,
+                    "is_partial": bool(q.is_partial)
+                }
+                for position, (q, result_hash) in enumerate(zip(saved_queries, result_hashes))
+            ]
+            
+            # One statement for the whole batch; MERGE (unlike INSERT) can OUTPUT the
+            # source row number next to each new ID, so IDs map back to their queries
+            cursor.execute("""
+                MERGE saved_queries AS target
+                USING (
+                    SELECT * FROM OPENJSON(?) WITH (
+                        ord INT,
+                        question NVARCHAR(MAX),
+                        sql_query NVARCHAR(MAX),
+                        tables_used NVARCHAR(MAX),
+                        created_at DATETIME2,
+                        is_successful BIT,
+                        error_message NVARCHAR(MAX),
+                        result_message NVARCHAR(MAX),
+                        result_hash CHAR(64),
+                        row_count INT,
+                        status VARCHAR(16),
+                        is_partial BIT
+                    )
+                ) AS source
+                ON 1 = 0
+                WHEN NOT MATCHED THEN
+                    INSERT (question, sql_query, tables_used, created_at, is_successful, error_message, result_message, result_hash, row_count, status, is_partial)
+                    VALUES (source.question, source.sql_query, source.tables_used, source.created_at, source.is_successful,
+                            source.error_message, source.result_message, source.result_hash, source.row_count, source.status,
+                            source.is_partial)
+                OUTPUT source.ord, INSERTED.id;
+            """, (json.dumps(rows, ensure_ascii=False),))
+            ids = dict(cursor.fetchall())
+            
+            conn.commit()
+            
+            query_ids = [int(ids[position]) for position in range(len(saved_queries))]
+            logger.info(f"Saved queries with IDs: {query_ids}")
+            return query_ids
+    
     def get_saved_queries(self, limit: int = 50, offset: int = 0) -> List[SavedQuery]:
-        """Get saved queries from the database."""
+        """Get saved queries from the database (metadata only, results load by ID)."""
         try:
-            import json
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT id, question, sql_query, tables_used, created_at, is_successful, error_message, query_results, result_message
+                    SELECT id, question, sql_query, tables_used, created_at, is_successful, error_message, result_message,
+                           row_count,
+                           CASE WHEN result_hash IS NOT NULL OR query_results IS NOT NULL THEN 1 ELSE 0 END AS has_results,
+                           status, is_partial
                     FROM saved_queries
                     ORDER BY created_at DESC
                     OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
@@ -299,14 +612,6 @@ class DatabaseManager:
                 for row in cursor.fetchall():
                     tables_used = row[3].split(',') if row[3] else []
                     
-                    # Parse JSON results
-                    query_results = None
-                    if row[7]:
-                        try:
-                            query_results = json.loads(row[7])
-                        except:
-                            query_results = None
-                    
                     queries.append(SavedQuery(
                         id=row[0],
                         question=row[1],
@@ -315,8 +620,11 @@ class DatabaseManager:
                         created_at=row[4],
                         is_successful=bool(row[5]),
                         error_message=row[6],
-                        query_results=query_results,
-                        result_message=row[8]
+                        result_message=row[7],
+                        row_count=row[8],
+                        has_results=bool(row[9]),
+                        status=row[10],
+                        is_partial=bool(row[11])
                     ))
                 
                 logger.info(f"Retrieved {len(queries)} saved queries")
@@ -326,17 +634,108 @@ class DatabaseManager:
             logger.error(f"Error retrieving saved queries: {e}")
             return []
     
+    def get_saved_query_summaries(
+        self,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> Tuple[List[SavedQuery], Optional[Tuple[datetime, int]]]:
+        """Get lightweight saved query summaries, newest first, with keyset pagination.
+        
+        Only id, question, status, timestamp, row count (and whether it is partial) and tables are read.
+        before is the (created_at, id) of the last row of the previous page.
+        Returns the summaries and the key to pass as before for the next page.
+        """
+        try:
+            where = ""
+            params: list = [limit]
+            if before is not None:
+                where = "WHERE created_at < ? OR (created_at = ? AND id < ?)"
+                params += [before[0], before[0], before[1]]
+            
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT TOP (?) id, question, tables_used, created_at, is_successful, row_count,
+                           CASE WHEN result_hash IS NOT NULL OR query_results IS NOT NULL THEN 1 ELSE 0 END AS has_results,
+                           status, is_partial
+                    FROM saved_queries
+                    {where}
+                    ORDER BY created_at DESC, id DESC
+                """, params)
+                
+                queries = [
+                    SavedQuery(
+                        id=row[0],
+                        question=row[1],
+                        tables_used=row[2].split(',') if row[2] else [],
+                        created_at=row[3],
+                        is_successful=bool(row[4]),
+                        row_count=row[5],
+                        has_results=bool(row[6]),
+                        status=row[7],
+                        is_partial=bool(row[8])
+                    )
+                    for row in cursor.fetchall()
+                ]
+                
+                next_key = None
+                if len(queries) == limit:
+                    next_key = (queries[-1].created_at, queries[-1].id)
+                
+                logger.info(f"Retrieved {len(queries)} saved query summaries")
+                return queries, next_key
+                
+        except Exception as e:
+            logger.error(f"Error retrieving saved query summaries: {e}")
+            return [], None
+    
+    def get_successful_query_pairs(
+        self,
+        since: Optional[datetime] = None,
+        limit: int = 500
+    ) -> List[Tuple[str, str, List[str]]]:
+        """Get (question, sql_query, tables_used) of recent successful queries.
+        
+        Only queries saved after since are returned, newest first.
+        """
+        try:
+            where = "WHERE is_successful = 1"
+            params: list = [limit]
+            if since is not None:
+                where += " AND created_at > ?"
+                params.append(since)
+            
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT TOP (?) question, sql_query, tables_used
+                    FROM saved_queries
+                    {where}
+                    ORDER BY created_at DESC, id DESC
+                """, params)
+                return [
+                    (row[0], row[1], row[2].split(',') if row[2] else [])
+                    for row in cursor.fetchall()
+                ]
+                
+        except Exception as e:
+            logger.error(f"Error retrieving successful queries: {e}")
+            return []
+    
     def delete_saved_query(self, query_id: int) -> bool:
         """Delete a saved query by ID."""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("DELETE FROM saved_queries WHERE id = ?", (query_id,))
-                rows_affected = cursor.rowcount
+                cursor.execute("DELETE FROM saved_queries OUTPUT DELETED.result_hash WHERE id = ?", (query_id,))
+                deleted = cursor.fetchall()
+                
+                # Drop the stored result if no other saved query shares it
+                ResultStore.delete_orphans(cursor, [row[0] for row in deleted])
                 conn.commit()
                 
-                if rows_affected > 0:
+                if deleted:
                     logger.info(f"Deleted query with ID: {query_id}")
                     return True
                 else:
@@ -347,30 +746,83 @@ class DatabaseManager:
             logger.error(f"Error deleting query: {e}")
             return False
     
+    def delete_saved_queries(
+        self,
+        ids: Optional[List[int]] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        delete_all: bool = False
+    ) -> int:
+        """Delete many saved queries with one set-based statement.
+        
+        Selects rows by a list of ids, a created_at range (from inclusive,
+        to exclusive), or all rows. Orphaned result blobs are removed in the
+        same transaction. Returns the number of deleted queries.
+        """
+        conditions: List[str] = []
+        params: list = []
+        if ids is not None:
+            conditions.append("id IN (SELECT CAST(value AS INT) FROM OPENJSON(?))")
+            params.append(json.dumps([int(i) for i in ids]))
+        if created_from is not None:
+            conditions.append("created_at >= ?")
+            params.append(created_from)
+        if created_to is not None:
+            conditions.append("created_at < ?")
+            params.append(created_to)
+        if not conditions and not delete_all:
+            raise ValueError("No delete criteria given")
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"DELETE FROM saved_queries OUTPUT DELETED.result_hash {where}", params)
+                deleted_hashes = [row[0] for row in cursor.fetchall()]
+                
+                if conditions:
+                    ResultStore.delete_orphans(cursor, deleted_hashes)
+                else:
+                    ResultStore.delete_orphans(cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        logger.info(f"Bulk deleted {len(deleted_hashes)} saved queries")
+        return len(deleted_hashes)
+    
     def get_saved_query_by_id(self, query_id: int) -> Optional[SavedQuery]:
-        """Get a specific saved query by ID."""
+        """Get a specific saved query by ID, including its results."""
         try:
             import json
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT id, question, sql_query, tables_used, created_at, is_successful, error_message, query_results, result_message
-                    FROM saved_queries
-                    WHERE id = ?
+                    SELECT q.id, q.question, q.sql_query, q.tables_used, q.created_at, q.is_successful, q.error_message,
+                           q.query_results, q.result_message, q.row_count, b.codec, b.payload, q.result_hash, q.status,
+                           q.is_partial
+                    FROM saved_queries q
+                    LEFT JOIN query_result_blobs b ON b.content_hash = q.result_hash
+                    WHERE q.id = ?
                 """, (query_id,))
                 
                 row = cursor.fetchone()
                 if row:
                     tables_used = row[3].split(',') if row[3] else []
                     
-                    # Parse JSON results
+                    # Results come from the result store; older rows still hold inline JSON
                     query_results = None
-                    if row[7]:
-                        try:
-                            query_results = json.loads(row[7])
-                        except:
-                            query_results = None
+                    try:
+                        if row[11] is not None:
+                            query_results = ResultStore.decode(row[11], row[10])
+                        elif row[7]:
+                            query_results = ResultSet.from_wire(json.loads(row[7]))
+                    except Exception as e:
+                        logger.warning(f"Could not load results for query {query_id}: {e}")
+                        query_results = None
                     
                     return SavedQuery(
                         id=row[0],
@@ -381,7 +833,12 @@ class DatabaseManager:
                         is_successful=bool(row[5]),
                         error_message=row[6],
                         query_results=query_results,
-                        result_message=row[8]
+                        result_message=row[8],
+                        row_count=row[9] if row[9] is not None else (len(query_results) if query_results else None),
+                        has_results=query_results is not None,
+                        result_hash=row[12] if row[11] is not None else None,
+                        status=row[13],
+                        is_partial=bool(row[14])
                     )
                 return None
                 
@@ -389,3 +846,36 @@ class DatabaseManager:
             logger.error(f"Error retrieving query by ID: {e}")
             return None
     
+    
+    def get_query_summary(self, sql_hash: str, result_hash: str) -> Optional[Dict[str, str]]:
+        """Get a stored AI summary for a query and result fingerprint."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT summary, analysis FROM query_summaries WHERE sql_hash = ? AND result_hash = ?",
+                    (sql_hash, result_hash)
+                )
+                row = cursor.fetchone()
+                return {"summary": row[0], "analysis": row[1]} if row else None
+                
+        except Exception as e:
+            logger.error(f"Error retrieving query summary: {e}")
+            return None
+    
+    def save_query_summary(self, sql_hash: str, result_hash: str, summary: Dict[str, str]) -> bool:
+        """Store an AI summary for a query and result fingerprint (first one wins)."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    IF NOT EXISTS (SELECT 1 FROM query_summaries WHERE sql_hash = ? AND result_hash = ?)
+                        INSERT INTO query_summaries (sql_hash, result_hash, summary, analysis)
+                        VALUES (?, ?, ?, ?)
+                """, (sql_hash, result_hash, sql_hash, result_hash, summary["summary"], summary["analysis"]))
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error saving query summary: {e}")
+            return False
@@ -0,0 +1,255 @@
+"""
+Background query history writer.
+Takes history saves off the request path: queued queries are inserted in batches by one thread.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import logging
+
+from backend.models.models import SavedQuery
+from backend.services.metrics import metrics
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingQuery:
+    """A queued history record and the ID it gets once written."""
+
+    __slots__ = ("ticket", "connection", "saved_query", "query_id", "done")
+
+    def __init__(self, ticket: str, connection: str, saved_query: SavedQuery):
+        self.ticket = ticket
+        self.connection = connection
+        self.saved_query = saved_query
+        self.query_id: Optional[int] = None
+        self.done = threading.Event()
+
+
+class HistoryWriter:
+    """Bounded queue of history records flushed to the database in batches.
+
+    submit() never touches the database: it queues the record and returns a
+    ticket that resolve() turns into the saved query ID once the record is
+    written. The writer thread flushes when batch_size records are waiting
+    or flush_interval seconds after the first one arrived. Records that
+    cannot be written (queue full, database error, shutdown) are appended to
+    a JSON lines spill file and written again by replay() when the same
+    connection is set up next time.
+    """
+
+    MAX_TICKETS = 1000
+
+    def __init__(
+        self,
+        batch_size: int = Config.HISTORY_BATCH_SIZE,
+        flush_interval: float = Config.HISTORY_FLUSH_INTERVAL,
+        max_queue: int = Config.HISTORY_QUEUE_SIZE,
+        spill_file: str = Config.HISTORY_SPILL_FILE
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.spill_file = spill_file
+        self._queue: "queue.Queue[_PendingQuery]" = queue.Queue(maxsize=max(1, max_queue))
+        self._tickets: "OrderedDict[str, _PendingQuery]" = OrderedDict()
+        # Latest manager per connection
+        self._managers: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._flush_now = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"written": 0, "batches": 0, "spilled": 0, "replayed": 0}
+
+    def submit(self, db_manager, saved_query: SavedQuery) -> str:
+        """Queue a query for saving; returns a ticket for resolve()."""
+        entry = _PendingQuery(uuid.uuid4().hex, db_manager.connection_string, saved_query)
+        with self._lock:
+            self._managers[entry.connection] = db_manager
+            self._tickets[entry.ticket] = entry
+            while len(self._tickets) > self.MAX_TICKETS:
+                self._tickets.popitem(last=False)
+        self._enqueue(entry)
+        return entry.ticket
+
+    def _enqueue(self, entry: _PendingQuery) -> None:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            logger.warning("History queue is full; spilling query to disk")
+            self._spill([entry])
+
+    def resolve(self, ticket: str, timeout: float = Config.HISTORY_FLUSH_INTERVAL) -> Optional[int]:
+        """ID of the query saved under a ticket, waiting up to timeout for it to be written."""
+        with self._lock:
+            entry = self._tickets.get(ticket)
+        if entry is None:
+            return None
+        if not entry.done.is_set():
+            # Someone is waiting for it: do not hold it until the next scheduled flush
+            self._flush_now.set()
+            entry.done.wait(timeout)
+        return entry.query_id
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self) -> List[_PendingQuery]:
+        """Wait for the first record, then gather more until the batch is full or the interval ends."""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stopping.is_set():
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._flush_now.wait(min(remaining, 0.05)):
+                break
+        self._flush_now.clear()
+        return batch
+
+    def _write(self, batch: List[_PendingQuery]) -> None:
+        """Save a batch, one transaction per connection; failed groups are spilled."""
+        groups: Dict[str, List[_PendingQuery]] = {}
+        for entry in batch:
+            groups.setdefault(entry.connection, []).append(entry)
+
+        for connection, entries in groups.items():
+            with self._lock:
+                db_manager = self._managers.get(connection)
+            try:
+                if db_manager is None:
+                    raise RuntimeError("no database manager for this connection")
+                if not db_manager.ensure_schema():
+                    raise RuntimeError("saved_queries table is not available")
+                with metrics.span("history_flush"):
+                    ids = db_manager.save_queries([entry.saved_query for entry in entries])
+                for entry, query_id in zip(entries, ids):
+                    entry.query_id = query_id
+                    entry.done.set()
+                with self._lock:
+                    self._stats["written"] += len(entries)
+                    self._stats["batches"] += 1
+                logger.info(f"Saved {len(entries)} queries to history")
+            except Exception as e:
+                logger.error(f"Error saving query history batch: {e}")
+                self._spill(entries)
+
+    def _spill(self, entries: List[_PendingQuery]) -> None:
+        """Append records to the spill file (flushed to disk) and release their waiters."""
+        lines = [
+            json.dumps({"connection": entry.connection, "query": entry.saved_query.to_dict()},
+                       ensure_ascii=False, default=str)
+            for entry in entries
+        ]
+        try:
+            with self._spill_lock, open(self.spill_file, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                self._stats["spilled"] += len(entries)
+            logger.warning(f"Spilled {len(entries)} history records to {self.spill_file}")
+        except Exception as e:
+            logger.error(f"Could not spill query history ({len(entries)} records lost): {e}")
+        for entry in entries:
+            entry.done.set()
+
+    def replay(self, db_manager) -> int:
+        """Queue the spilled records of db_manager's connection again; returns how many."""
+        connection = db_manager.connection_string
+        with self._spill_lock:
+            if not os.path.exists(self.spill_file):
+                return 0
+            try:
+                with open(self.spill_file, "r", encoding="utf-8") as f:
+                    lines = [line for line in f if line.strip()]
+            except Exception as e:
+                logger.error(f"Could not read history spill file: {e}")
+                return 0
+
+            mine, others = [], []
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping unreadable line in history spill file")
+                    continue
+                (mine if record.get("connection") == connection else others).append(line)
+            if not mine:
+                return 0
+
+            # Rewrite atomically so a crash cannot lose the other connections' records
+            temp_file = self.spill_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.writelines(others)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.spill_file)
+
+        with self._lock:
+            self._managers[connection] = db_manager
+            self._stats["replayed"] += len(mine)
+        for line in mine:
+            saved_query = SavedQuery.from_dict(json.loads(line)["query"])
+            self._enqueue(_PendingQuery(uuid.uuid4().hex, connection, saved_query))
+        logger.info(f"Replaying {len(mine)} spilled history records")
+        return len(mine)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the writer: flush what is queued, spill whatever could not be written."""
+        thread = self._thread
+        self._stopping.set()
+        self._flush_now.set()
+        if thread is not None:
+            thread.join(timeout)
+
+        pending: List[_PendingQuery] = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if pending and (thread is None or not thread.is_alive()):
+            self._write(pending)
+        elif pending:
+            # The writer is stuck on the database; keep the rest on disk
+            self._spill(pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and write counters."""
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                **self._stats,
+            }
+
+
+# Global history writer shared by all requests
+history_writer = HistoryWriter()
@@ -0,0 +1,154 @@
+"""
+Stage timing and metrics.
+Records how long each stage of a request takes, as in-process histograms and per-request spans.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import CollectorRegistry, GCCollector, PlatformCollector, ProcessCollector, generate_latest
+    from prometheus_client.core import HistogramMetricFamily
+except ImportError:  # optional dependency
+    CollectorRegistry = None
+
+METRIC_NAME = "niq_stage_duration_seconds"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from a pool checkout to a slow AI call
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# Spans of the request being handled in this thread (None outside a request)
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+class _Histogram:
+    """Cumulative-ready bucket counts, sum and count of one stage."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class SpanRecorder:
+    """Times named stages with span() and keeps a histogram per stage.
+
+    Durations inside a request (between begin_request() and end_request())
+    are also collected for that request's Server-Timing header. Histograms
+    are exposed in the Prometheus text format by render(), through
+    prometheus_client when it is installed.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[str, _Histogram] = {}
+        self._lock = threading.Lock()
+        self._registry = None
+        if CollectorRegistry is not None:
+            self._registry = CollectorRegistry()
+            self._registry.register(_StageCollector(self))
+            ProcessCollector(registry=self._registry)
+            PlatformCollector(registry=self._registry)
+            GCCollector(registry=self._registry)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one duration to a stage's histogram (and to the current request)."""
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.total += seconds
+            histogram.count += 1
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, seconds))
+
+    def begin_request(self) -> None:
+        """Start collecting spans for the request handled in this context."""
+        _request_spans.set([])
+
+    def end_request(self) -> List[Tuple[str, float]]:
+        """Stop collecting and return this request's spans."""
+        spans = _request_spans.get() or []
+        _request_spans.set(None)
+        return spans
+
+    @staticmethod
+    def server_timing(spans: List[Tuple[str, float]]) -> str:
+        """Format spans as a Server-Timing header value (repeated stages are summed)."""
+        totals: Dict[str, float] = {}
+        for name, seconds in spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+    def snapshot(self) -> Dict[str, Tuple[List[int], float, int]]:
+        """Copy of every stage's (bucket counts, sum, count)."""
+        with self._lock:
+            return {
+                name: (list(h.counts), h.total, h.count)
+                for name, h in self._histograms.items()
+            }
+
+    def render(self) -> bytes:
+        """All histograms in the Prometheus text exposition format."""
+        if self._registry is not None:
+            return generate_latest(self._registry)
+
+        lines = [
+            f"# HELP {METRIC_NAME} Duration of request stages in seconds.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for name, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {total!r}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {count}')
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _StageCollector:
+    """prometheus_client collector reading the recorder's histograms at scrape time."""
+
+    def __init__(self, recorder: SpanRecorder):
+        self.recorder = recorder
+
+    def collect(self):
+        family = HistogramMetricFamily(METRIC_NAME, "Duration of request stages in seconds.", labels=["stage"])
+        bounds = [repr(bound) for bound in self.recorder.buckets] + ["+Inf"]
+        for name, (counts, total, _) in sorted(self.recorder.snapshot().items()):
+            cumulative, buckets = 0, []
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                buckets.append((bound, cumulative))
+            family.add_metric([name], buckets, total)
+        yield family
+
+
+# Global recorder shared by all requests and background workers
+metrics = SpanRecorder()
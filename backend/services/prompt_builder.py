@@ -0,0 +1,238 @@
+"""
+Token-budgeted prompt construction for SQL generation.
+Ranks schema columns by relevance to the question and fits them into a token budget.
+"""
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import logging
+
+from backend.models.models import DatabaseSchema, TableInfo
+from backend.config.config import Config
+from backend.services.sql_cache import normalize_question
+from backend.services.table_index import identifier_terms
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+_ROUGH_TOKENS = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed, otherwise estimates them."""
+
+    def __init__(self, model: str = Config.OPENAI_MODEL):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+
+    @property
+    def exact(self) -> bool:
+        """True when counts come from the model's tokenizer."""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        # Roughly one token per 4 characters of a word, one per punctuation mark
+        return sum(max(1, math.ceil(len(piece) / 4)) for piece in _ROUGH_TOKENS.findall(text))
+
+
+@dataclass
+class BuiltPrompt:
+    """A prompt plus how much of the schema made it in."""
+    text: str
+    tokens: int
+    schema_tokens: int
+    budget: int
+    columns_included: int
+    columns_dropped: int
+    exact_count: bool
+
+
+class PromptBuilder:
+    """Builds the NL→SQL prompt with the schema section held to a token budget.
+
+    Columns are ranked by name similarity to the question; primary and
+    foreign keys are always kept so joins stay possible. When the full
+    schema does not fit, low-ranked columns lose their type and then are
+    dropped, with the number left out noted per table.
+    """
+
+    TEMPLATE = """
+You are an expert SQL developer specializing in SQL Server.
+Your task is to convert natural language questions into accurate SQL Server queries.
+
+Database Schema:
+{schema}
+
+Instructions:
+1. Use ONLY the tables and columns provided in the schema above
+2. Write valid SQL Server syntax
+3. Use proper JOINs when multiple tables are involved
+4. Include appropriate WHERE clauses for filtering
+5. Use meaningful column aliases when needed
+6. Return ONLY the SQL query, no explanations or markdown formatting
+
+Question: {question}
+
+SQL Query:
+"""
+
+    # Combined mode: the SQL and its explanation from one call, as a JSON object
+    EXPLAIN_TEMPLATE = """
+You are an expert SQL developer specializing in SQL Server.
+Your task is to convert natural language questions into accurate SQL Server queries
+and explain them briefly in Turkish.
+
+Database Schema:
+{schema}
+
+Instructions:
+1. Use ONLY the tables and columns provided in the schema above
+2. Write valid SQL Server syntax
+3. Use proper JOINs when multiple tables are involved
+4. Include appropriate WHERE clauses for filtering
+5. Use meaningful column aliases when needed
+6. Answer with a single JSON object and nothing else:
+   {{"sql": "<the SQL query>",
+     "summary": "<2-3 Turkish sentences on what the query does>",
+     "analysis": "<3-4 Turkish sentences on what the user will see in the results>"}}
+
+Question: {question}
+"""
+
+    def __init__(self, budget: int = Config.PROMPT_SCHEMA_TOKEN_BUDGET, counter: Optional[TokenCounter] = None):
+        self.budget = budget
+        self.counter = counter or TokenCounter()
+
+    def build(self, question: str, table_names: List[str], schema: DatabaseSchema,
+              explain: bool = False) -> BuiltPrompt:
+        """Build the prompt for a question over the given tables.
+
+        With explain=True the prompt asks for a JSON object with the SQL and its explanation.
+        """
+        tables = {name: schema.tables[name] for name in table_names if name in schema.tables}
+        for name in table_names:
+            if name not in schema.tables:
+                logger.warning(f"Table '{name}' not found in schema")
+
+        schema_text, included, dropped = self._format_schema(question, tables)
+        template = self.EXPLAIN_TEMPLATE if explain else self.TEMPLATE
+        text = template.format(schema=schema_text, question=question).strip()
+        return BuiltPrompt(
+            text=text,
+            tokens=self.counter.count(text),
+            schema_tokens=self.counter.count(schema_text),
+            budget=self.budget,
+            columns_included=included,
+            columns_dropped=dropped,
+            exact_count=self.counter.exact
+        )
+
+    def _format_schema(self, question: str, tables: Dict[str, TableInfo]) -> Tuple[str, int, int]:
+        """Render the schema section; returns (text, columns included, columns dropped)."""
+        terms = [term for term in normalize_question(question).split() if len(term) >= 3]
+        compact_question = normalize_question(question).replace(" ", "")
+
+        # Per table: (column, full entry, short entry, rank score, relevant, required)
+        entries: Dict[str, List[Tuple[str, str, str, float, bool, bool]]] = {}
+        for name, table in tables.items():
+            table_score = self._similarity(identifier_terms(table.name), terms)
+            foreign_keys = {fk.column: fk for fk in table.foreign_keys}
+            types = {details.name: details.data_type for details in table.column_details}
+            rows = []
+            for position, column in enumerate(table.columns):
+                full = column
+                if types.get(column):
+                    full += f" {types[column]}"
+                if column in foreign_keys:
+                    fk = foreign_keys[column]
+                    full += f" -> {fk.referenced_table}.{fk.referenced_column}"
+                required = column in table.primary_keys or column in foreign_keys
+                score = self._similarity(identifier_terms(column), terms)
+                if len(column) >= 4 and normalize_question(column).replace(" ", "") in compact_question:
+                    score += 3
+                # Mentioned tables pull their columns up a little; earlier columns win ties
+                rank = score + 0.5 * table_score - 0.001 * position
+                rows.append((column, full, column, rank, score > 0, required))
+            entries[name] = rows
+
+        full_text = self._render(tables, {name: [r[1] for r in rows] for name, rows in entries.items()}, {})
+        if self.counter.count(full_text) <= self.budget:
+            total = sum(len(rows) for rows in entries.values())
+            return full_text, total, 0
+
+        # Required columns first, then the rest by score
+        chosen: Dict[str, Dict[str, str]] = {name: {} for name in tables}
+        for name, rows in entries.items():
+            for column, full, _, _, _, required in rows:
+                if required:
+                    chosen[name][column] = full
+        ranked = sorted(
+            ((rank, name, column, full, short, relevant)
+             for name, rows in entries.items()
+             for column, full, short, rank, relevant, required in rows if not required),
+            key=lambda item: -item[0]
+        )
+
+        used = self.counter.count(self._render_chosen(tables, entries, chosen))
+        for _, name, column, full, short, relevant in ranked:
+            # Columns named in the question keep their type; the rest are shortened to the bare name
+            for entry in ((full, short) if relevant else (short,)):
+                cost = self.counter.count(f", {entry}")
+                if used + cost <= self.budget:
+                    chosen[name][column] = entry
+                    used += cost
+                    break
+
+        text = self._render_chosen(tables, entries, chosen)
+        included = sum(len(columns) for columns in chosen.values())
+        total = sum(len(rows) for rows in entries.values())
+        return text, included, total - included
+
+    def _render_chosen(self, tables, entries, chosen) -> str:
+        """Render chosen columns in their original order, noting how many were left out."""
+        columns = {
+            name: [chosen[name][row[0]] for row in rows if row[0] in chosen[name]]
+            for name, rows in entries.items()
+        }
+        omitted = {name: len(rows) - len(chosen[name]) for name, rows in entries.items()}
+        return self._render(tables, columns, omitted)
+
+    @staticmethod
+    def _render(tables: Dict[str, TableInfo], columns: Dict[str, List[str]], omitted: Dict[str, int]) -> str:
+        lines = []
+        for name, table in tables.items():
+            display = name if "." in name or table.schema == "dbo" else f"{table.schema}.{name}"
+            line = f"{display}: {', '.join(columns[name])}"
+            if omitted.get(name):
+                line += f" (+{omitted[name]} more columns)"
+            lines.append(line)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _similarity(parts: List[str], terms: List[str]) -> float:
+        """Score how well identifier words match question words (Turkish suffixes allowed)."""
+        score = 0.0
+        for part in parts:
+            best = 0.0
+            for term in terms:
+                if part == term:
+                    best = 3.0
+                    break
+                if len(part) >= 3 and (term.startswith(part) or (len(term) >= 4 and part.startswith(term))):
+                    best = max(best, 2.0)
+                elif len(part) >= 5 and part[:5] == term[:5]:
+                    best = max(best, 1.0)
+            score += best
+        return score
@@ -0,0 +1,177 @@
+"""
+Execution control for user queries.
+Tracks running statements so they can be cancelled, stopped at a deadline or cut off at a byte budget.
+"""
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import logging
+
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+
+_EXECUTION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class QueryCancelledError(Exception):
+    """A statement was stopped by a cancel request or its deadline."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(
+            "Sorgu kullanıcı tarafından iptal edildi." if reason == CANCELLED
+            else "Sorgu zaman aşımına uğradı ve durduruldu."
+        )
+
+
+def fit_rows(rows: List[Any], budget: Optional[int]) -> Tuple[List[Any], int, bool]:
+    """Leading rows that fit in budget bytes; returns (rows, bytes used, budget exceeded).
+
+    Sizes are rough: text and binary by length, any other value as 8 bytes.
+    A budget of None means no limit.
+    """
+    if budget is None:
+        return rows, 0, False
+    used = 0
+    for index, row in enumerate(rows):
+        size = 0
+        for value in row:
+            size += len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+        if used + size > budget:
+            return rows[:index], used, True
+        used += size
+    return rows, used, False
+
+
+class RunningQuery:
+    """A statement in flight: its cursor, deadline, byte budget and why it was stopped."""
+
+    def __init__(self, execution_id: str, cursor, timeout: float, max_bytes: int):
+        self.execution_id = execution_id
+        self.cursor = cursor
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + timeout if timeout > 0 else None
+        self.bytes_left: Optional[int] = max_bytes if max_bytes > 0 else None
+        self.reason: Optional[str] = None
+
+    def take(self, rows: List[Any]) -> Tuple[List[Any], bool]:
+        """Charge fetched rows to the byte budget; returns the rows that fit and whether it ran out."""
+        rows, used, exceeded = fit_rows(rows, self.bytes_left)
+        if self.bytes_left is not None:
+            self.bytes_left -= used
+        return rows, exceeded
+
+    def stopped_error(self, error: Exception) -> Exception:
+        """The error to report for a failed fetch/execute: why we stopped it, if we did."""
+        if self.reason is None and "HYT00" in str(error):
+            # The driver's own query timeout (SQL_ATTR_QUERY_TIMEOUT) fired first
+            self.reason = TIMEOUT
+        return QueryCancelledError(self.reason) if self.reason else error
+
+
+class QueryRegistry:
+    """Running user statements by execution ID, with a watchdog for deadlines.
+
+    cancel() calls cursor.cancel() from the requesting thread; the thread
+    running the statement then gets a driver error, which stopped_error()
+    turns into a QueryCancelledError. The watchdog does the same when a
+    statement passes its deadline, so a slow fetch is bounded too, not only
+    the execute.
+    """
+
+    def __init__(self, check_interval: float = 0.25):
+        self.check_interval = check_interval
+        self._running: Dict[str, RunningQuery] = {}
+        self._lock = threading.Lock()
+        self._watchdog: Optional[threading.Thread] = None
+        self._stats = {CANCELLED: 0, TIMEOUT: 0}
+
+    @staticmethod
+    def new_execution_id(execution_id: Optional[str] = None) -> str:
+        """Validate a client-supplied execution ID, or create one."""
+        if execution_id is None:
+            return uuid.uuid4().hex
+        execution_id = str(execution_id)
+        if not _EXECUTION_ID.match(execution_id):
+            raise ValueError("Invalid execution id")
+        return execution_id
+
+    @contextmanager
+    def track(
+        self,
+        execution_id: Optional[str],
+        cursor,
+        timeout: float = Config.QUERY_TIMEOUT,
+        max_bytes: int = Config.QUERY_MAX_BYTES
+    ) -> Iterator[RunningQuery]:
+        """Register a cursor for the duration of the block."""
+        running = RunningQuery(self.new_execution_id(execution_id), cursor, timeout, max_bytes)
+        with self._lock:
+            if running.execution_id in self._running:
+                raise ValueError("Execution id is already running")
+            self._running[running.execution_id] = running
+        if running.deadline is not None:
+            self._ensure_watchdog()
+        try:
+            yield running
+        finally:
+            with self._lock:
+                self._running.pop(running.execution_id, None)
+
+    def cancel(self, execution_id: str, reason: str = CANCELLED) -> bool:
+        """Stop a running statement; False if nothing runs under that ID."""
+        with self._lock:
+            running = self._running.get(execution_id)
+            if running is None or running.reason is not None:
+                return False
+            running.reason = reason
+            self._stats[reason] += 1
+        try:
+            running.cursor.cancel()
+        except Exception as e:
+            logger.warning(f"cursor.cancel() failed for {execution_id}: {e}")
+        logger.info(f"Query {execution_id} stopped ({reason})")
+        return True
+
+    def _ensure_watchdog(self) -> None:
+        with self._lock:
+            if self._watchdog is None or not self._watchdog.is_alive():
+                self._watchdog = threading.Thread(target=self._watch, name="query-watchdog", daemon=True)
+                self._watchdog.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.check_interval)
+            now = time.monotonic()
+            with self._lock:
+                expired = [
+                    r.execution_id for r in self._running.values()
+                    if r.deadline is not None and now >= r.deadline and r.reason is None
+                ]
+            for execution_id in expired:
+                self.cancel(execution_id, reason=TIMEOUT)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Running statements and how many were stopped."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "running": [
+                    {"execution_id": r.execution_id, "elapsed": round(now - r.started_at, 1)}
+                    for r in self._running.values()
+                ],
+                "cancelled": self._stats[CANCELLED],
+                "timed_out": self._stats[TIMEOUT],
+            }
+
+
+# Global registry of running user queries
+query_registry = QueryRegistry()
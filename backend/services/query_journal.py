@@ -0,0 +1,262 @@
+"""
+Append-only query journal.
+Records every executed query as one JSON line from a writer thread, with size-based rotation.
+"""
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+
+import logging
+
+from backend.models.models import QueryResponse
+from backend.core.utils import JSONUtils
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryJournal:
+    """Writes journal records as JSON lines from a single thread.
+
+    record() only builds a small dict and queues it, so request threads never
+    touch the file and lines cannot interleave. The writer appends whatever
+    is queued, then flushes and fsyncs once per fsync_interval rather than
+    per line. When the file passes max_bytes it is gzip-compressed to
+    <file>.1.gz (older archives shift up, keeping backup_count of them).
+    """
+
+    # Results are journaled only when they are this small
+    MAX_PREVIEW_ROWS = 5
+
+    def __init__(
+        self,
+        path: str = Config.JOURNAL_FILE,
+        max_bytes: int = Config.JOURNAL_MAX_BYTES,
+        backup_count: int = Config.JOURNAL_BACKUP_COUNT,
+        fsync_interval: float = Config.JOURNAL_FSYNC_INTERVAL,
+        max_queue: int = Config.JOURNAL_QUEUE_SIZE
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = max(0, backup_count)
+        self.fsync_interval = fsync_interval
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._dropped = 0
+        self._written = 0
+
+    def record(self, question: str, tables: List[str], sql_query: str,
+               query_response: QueryResponse, history_ticket: Optional[str] = None) -> None:
+        """Queue a journal record for an executed query."""
+        entry: Dict[str, Any] = {
+            "time": datetime.now().astimezone().isoformat(timespec="seconds"),
+            "ticket": history_ticket,
+            "successful": query_response.is_successful,
+            "question": question,
+            "tables": tables,
+            "sql": sql_query,
+        }
+        if query_response.is_successful:
+            if query_response.results:
+                # Streamed results only keep a preview; row_count holds the total
+                total_rows = query_response.row_count or len(query_response.results)
+                entry["row_count"] = total_rows
+                if total_rows <= self.MAX_PREVIEW_ROWS:
+                    entry["rows"] = query_response.results.to_records()
+            elif query_response.message:
+                entry["message"] = query_response.message
+        else:
+            entry["error"] = query_response.error
+
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            logger.warning("Query journal queue is full; record dropped")
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="query-journal", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            entry = self._queue.get()
+            deadline = time.monotonic() + self.fsync_interval
+            try:
+                # Everything that arrives within the interval shares one fsync
+                while entry is not None:
+                    self._write(entry)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        entry = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                stop = entry is None
+                self._sync()
+            except Exception as e:
+                logger.error(f"Error writing query journal: {e}")
+                self._close_file()
+        self._close_file()
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(JSONUtils.dumps(entry) + "\n")
+        self._written += 1
+        if self.max_bytes > 0 and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _sync(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _rotate(self) -> None:
+        """Compress the current file to .1.gz, shifting older archives up."""
+        self._sync()
+        self._close_file()
+        if self.backup_count == 0:
+            os.remove(self.path)
+            return
+        oldest = f"{self.path}.{self.backup_count}.gz"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}.gz"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}.gz")
+        with open(self.path, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+        logger.info(f"Rotated query journal to {self.path}.1.gz")
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued, fsync and stop the writer."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Query journal queue is full at shutdown; pending records are lost")
+            return
+        thread.join(timeout)
+
+    def files(self) -> List[str]:
+        """Journal files, oldest first (compressed archives, then the current file)."""
+        names = [f"{self.path}.{index}.gz" for index in range(self.backup_count, 0, -1)]
+        names.append(self.path)
+        return [name for name in names if os.path.exists(name)]
+
+    def read(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Journal records, oldest first (the last limit records if given)."""
+        if limit:
+            return list(deque(self._iter_records(), maxlen=limit))
+        return list(self._iter_records())
+
+    def _iter_records(self) -> Iterator[Dict[str, Any]]:
+        # Records reach the files within fsync_interval of being queued
+        for name in self.files():
+            opener = gzip.open if name.endswith(".gz") else open
+            try:
+                with opener(name, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue  # a line cut short by a crash
+            except OSError as e:
+                logger.warning(f"Could not read journal file {name}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and write counters."""
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self._written,
+                "dropped": self._dropped,
+                "files": len(self.files()),
+            }
+
+
+class JournalExporter:
+    """Renders journal records in the readable Turkish "SORGU GEÇMİŞİ" text format."""
+
+    RULE = "=" * 80
+
+    def __init__(self, timezone: str = "Europe/Istanbul"):
+        self.timezone = None
+        try:
+            from zoneinfo import ZoneInfo
+            self.timezone = ZoneInfo(timezone)
+        except Exception:
+            # No tz database (e.g. Windows without tzdata): keep the recorded offset
+            logger.debug(f"Time zone {timezone} not available; exporting journal times as recorded")
+
+    def export(self, records: List[Dict[str, Any]]) -> str:
+        """Render records as one text document."""
+        parts = [f"{self.RULE}\nSQL AGENT - SORGU GEÇMİŞİ\n{self.RULE}\n\n"]
+        parts.extend(self._render(number, record) for number, record in enumerate(records, 1))
+        return "".join(parts)
+
+    def _render(self, number: int, record: Dict[str, Any]) -> str:
+        lines = [
+            "",
+            self.RULE,
+            f"SORGU #{number}",
+            f"TARİH: {self._time(record.get('time'))}",
+            f"DURUM: {'✅ BAŞARILI' if record.get('successful') else '❌ HATA'}",
+            self.RULE,
+            "",
+            f"📝 SORU:\n{record.get('question', '')}\n",
+            f"📋 TABLOLAR:\n{', '.join(record.get('tables') or [])}\n",
+            f"🔍 SQL SORGUSU:\n{record.get('sql', '')}\n",
+        ]
+        if record.get("successful"):
+            if "row_count" in record:
+                lines.append(f"📊 SONUÇLAR: {record['row_count']} satır")
+                if "rows" in record:
+                    lines.append(f"Veri: {record['rows']}")
+            elif record.get("message"):
+                lines.append(f"✅ MESAJ: {record['message']}")
+        else:
+            lines.append(f"❌ HATA: {record.get('error')}")
+        return "\n".join(lines) + "\n\n"
+
+    def _time(self, value: Optional[str]) -> str:
+        if not value:
+            return "-"
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        if self.timezone is not None and moment.tzinfo is not None:
+            moment = moment.astimezone(self.timezone)
+        return moment.strftime("%Y-%m-%d %H:%M:%S %Z").strip()
+
+
+# Global journal shared by all requests
+query_journal = QueryJournal()
@@ -0,0 +1,182 @@
+"""
+Resumable result cursors for paged query results.
+Keeps the server-side cursor of a large SELECT open so later pages can be fetched on demand.
+"""
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+import logging
+
+from backend.config.config import Config
+from backend.services.connection_pool import is_connection_error
+from backend.services.query_control import fit_rows, query_registry, QueryCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_rows(cursor, limit: int, batch_size: int = Config.QUERY_FETCH_BATCH_SIZE) -> List[Any]:
+    """Fetch up to limit rows from a cursor in fetchmany batches."""
+    rows: List[Any] = []
+    while len(rows) < limit:
+        batch = cursor.fetchmany(min(batch_size, limit - len(rows)))
+        if not batch:
+            break
+        rows.extend(batch)
+    return rows
+
+
+class _OpenCursor:
+    """An open cursor, the pooled connection it runs on and its paging state."""
+
+    def __init__(self, pool, conn, cursor, columns: List[str], delivered: int, pending: List[Any],
+                 bytes_left: Optional[int] = None, execution_id: Optional[str] = None,
+                 timeout: float = Config.QUERY_TIMEOUT):
+        self.pool = pool
+        self.conn = conn
+        self.cursor = cursor
+        self.columns = columns
+        self.delivered = delivered
+        self.pending = pending
+        self.bytes_left = bytes_left
+        self.execution_id = execution_id
+        self.timeout = timeout
+        self.last_used_at = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class ResultCursorRegistry:
+    """Bounded registry of open result cursors addressed by page token.
+
+    Each page fetch is tracked by query_registry under the query's execution
+    ID, so it can be cancelled and is stopped at the query's timeout. Between
+    fetches nothing runs; idle cursors are closed after ttl seconds.
+    """
+
+    def __init__(
+        self,
+        ttl: float = Config.QUERY_CURSOR_TTL,
+        max_open: int = Config.QUERY_MAX_OPEN_CURSORS,
+        max_rows: int = Config.QUERY_MAX_ROWS
+    ):
+        self.ttl = ttl
+        self.max_open = max(1, max_open)
+        self.max_rows = max_rows
+        self._cursors: Dict[str, _OpenCursor] = {}
+        self._lock = threading.Lock()
+
+    def register(self, pool, conn, cursor, columns: List[str], delivered: int, pending: List[Any],
+                 bytes_left: Optional[int] = None, execution_id: Optional[str] = None,
+                 timeout: float = Config.QUERY_TIMEOUT) -> str:
+        """Take ownership of an open cursor and its connection; returns a page token.
+        bytes_left is what remains of the query's byte budget (None for no limit);
+        execution_id and timeout apply to each later page fetch.
+        """
+        self._reap_expired()
+
+        evicted: List[_OpenCursor] = []
+        token = uuid.uuid4().hex
+        with self._lock:
+            while len(self._cursors) >= self.max_open:
+                # Drop the least recently used cursor to stay within the bound
+                oldest = min(self._cursors, key=lambda t: self._cursors[t].last_used_at)
+                evicted.append(self._cursors.pop(oldest))
+            self._cursors[token] = _OpenCursor(
+                pool, conn, cursor, columns, delivered, pending, bytes_left, execution_id, timeout
+            )
+
+        for entry in evicted:
+            self._release(entry)
+        return token
+
+    def fetch_page(self, token: str, page_size: int) -> Optional[Dict[str, Any]]:
+        """Fetch the next page for a token, or None if the token is unknown or expired.
+
+        Raises QueryCancelledError if the fetch is cancelled or passes its deadline.
+        """
+        self._reap_expired()
+        with self._lock:
+            entry = self._cursors.get(token)
+        if entry is None:
+            return None
+
+        with entry.lock:
+            limit = max(1, min(page_size, self.max_rows - entry.delivered))
+            try:
+                # The byte budget is charged below, so the tracked run gets none
+                with query_registry.track(entry.execution_id, entry.cursor, entry.timeout, max_bytes=0) as running:
+                    try:
+                        # Fetch one extra row to know whether another page exists
+                        rows = entry.pending + fetch_rows(entry.cursor, limit + 1 - len(entry.pending))
+                    except Exception as e:
+                        raise running.stopped_error(e) from e
+            except Exception as e:
+                # An interrupted fetch leaves the connection in an unknown state
+                self.close(token, discard=isinstance(e, QueryCancelledError) or is_connection_error(e))
+                raise
+            has_more = len(rows) > limit
+            entry.pending = rows[limit:]
+            rows, used, over_budget = fit_rows(rows[:limit], entry.bytes_left)
+            if entry.bytes_left is not None:
+                entry.bytes_left -= used
+            entry.delivered += len(rows)
+            entry.last_used_at = time.monotonic()
+
+            truncated = (has_more and entry.delivered >= self.max_rows) or over_budget
+            next_token = token if has_more and not truncated else None
+
+        if next_token is None:
+            self.close(token)
+
+        return {
+            "columns": entry.columns,
+            "rows": rows,
+            "next_page_token": next_token,
+            "truncated": truncated,
+            "offset": entry.delivered - len(rows)
+        }
+
+    def close(self, token: str, discard: bool = False) -> bool:
+        """Close a cursor and return its connection to the pool."""
+        with self._lock:
+            entry = self._cursors.pop(token, None)
+        if entry is None:
+            return False
+        self._release(entry, discard=discard)
+        return True
+
+    def close_all(self) -> None:
+        """Close every open cursor (used at shutdown)."""
+        with self._lock:
+            entries, self._cursors = list(self._cursors.values()), {}
+        for entry in entries:
+            self._release(entry)
+
+    def open_count(self) -> int:
+        """Number of cursors currently held open."""
+        with self._lock:
+            return len(self._cursors)
+
+    def _reap_expired(self) -> None:
+        """Close cursors that have not been paged within the TTL."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [t for t, e in self._cursors.items() if now - e.last_used_at > self.ttl]
+            entries = [self._cursors.pop(t) for t in expired]
+        for entry in entries:
+            logger.info("Closing expired result cursor")
+            self._release(entry)
+
+    @staticmethod
+    def _release(entry: _OpenCursor, discard: bool = False) -> None:
+        """Close the cursor and hand its connection back to the pool."""
+        try:
+            entry.cursor.close()
+        except Exception:
+            discard = True
+        entry.pool.release(entry.conn, discard=discard)
+
+
+# Global registry of open result cursors
+result_cursors = ResultCursorRegistry()
@@ -0,0 +1,216 @@
+"""
+Result profiling for AI summaries.
+Condenses a result set into per-column statistics plus a small representative sample.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import logging
+
+from backend.models.models import ResultSet
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+NUMERIC = "sayı"
+DATE = "tarih"
+TEXT = "metin"
+
+
+@dataclass
+class ColumnProfile:
+    """Statistics of one result column."""
+    name: str
+    kind: str = TEXT
+    count: int = 0
+    nulls: int = 0
+    minimum: Any = None
+    maximum: Any = None
+    mean: Optional[float] = None
+    distinct: int = 0
+    distinct_capped: bool = False
+    top: List[Tuple[Any, int]] = field(default_factory=list)
+
+
+class ResultProfiler:
+    """Single-pass column profiler and stratified sampler for result sets.
+
+    Each column is scanned once: null count, min/max, mean for numbers, and
+    value frequencies (up to max_distinct distinct values) for the top
+    categories. The sample is stratified on a low-cardinality text column
+    when there is one, otherwise spread evenly over the rows.
+    """
+
+    MAX_CELL_LENGTH = 40
+
+    def __init__(
+        self,
+        sample_rows: int = Config.SUMMARY_SAMPLE_ROWS,
+        top_categories: int = Config.SUMMARY_TOP_CATEGORIES,
+        max_distinct: int = 1000
+    ):
+        self.sample_rows = max(1, sample_rows)
+        self.top_categories = top_categories
+        self.max_distinct = max_distinct
+
+    def profile(self, results: ResultSet) -> List[ColumnProfile]:
+        """Compute statistics for every column."""
+        if not results.columns:
+            return []
+        columns = list(zip(*results.rows)) if results.rows else [()] * len(results.columns)
+        return [self._profile_column(name, values) for name, values in zip(results.columns, columns)]
+
+    def _profile_column(self, name: str, values: tuple) -> ColumnProfile:
+        profile = ColumnProfile(name=name)
+        counts: Counter = Counter()
+        kinds = set()
+        total = 0.0
+        minimum = maximum = None
+
+        for value in values:
+            if value is None:
+                profile.nulls += 1
+                continue
+            profile.count += 1
+            if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                kind = NUMERIC
+                total += float(value)
+            elif isinstance(value, (datetime, date, time)):
+                kind = DATE
+            else:
+                kind = TEXT
+                value = str(value)
+            kinds.add(kind)
+            # Mixed-type columns are profiled as text, without a range
+            if len(kinds) == 1 and kind != TEXT:
+                minimum = value if minimum is None or value < minimum else minimum
+                maximum = value if maximum is None or value > maximum else maximum
+            if value in counts or len(counts) < self.max_distinct:
+                counts[value] += 1
+            else:
+                profile.distinct_capped = True
+
+        if kinds == {NUMERIC}:
+            profile.kind = NUMERIC
+            profile.mean = total / profile.count
+        elif kinds == {DATE}:
+            profile.kind = DATE
+        if profile.kind != TEXT:
+            profile.minimum, profile.maximum = minimum, maximum
+
+        profile.distinct = len(counts)
+        # Top values only say something for categories: text, or numbers with few distinct values
+        if profile.kind == TEXT or (profile.kind == NUMERIC and profile.distinct <= self.top_categories):
+            top = counts.most_common(self.top_categories)
+            if top and top[0][1] > 1:
+                profile.top = top
+        return profile
+
+    def sample(self, results: ResultSet, profiles: Optional[List[ColumnProfile]] = None) -> List[tuple]:
+        """Pick up to sample_rows rows that represent the whole result, in original order."""
+        rows = results.rows
+        if len(rows) <= self.sample_rows:
+            return list(rows)
+
+        profiles = profiles if profiles is not None else self.profile(results)
+        stratum = self._stratum_column(profiles)
+        if stratum is None:
+            # Evenly spaced rows, always including the first and the last
+            step = (len(rows) - 1) / (self.sample_rows - 1) if self.sample_rows > 1 else 0
+            return [rows[round(i * step)] for i in range(self.sample_rows)]
+
+        index = results.columns.index(stratum)
+        groups: Dict[Any, List[int]] = {}
+        for position, row in enumerate(rows):
+            groups.setdefault(row[index], []).append(position)
+
+        # Round-robin over the strata, each one sampled evenly across its rows
+        picked: List[int] = []
+        depth = 0
+        while len(picked) < self.sample_rows:
+            added = False
+            for positions in groups.values():
+                if len(picked) >= self.sample_rows:
+                    break
+                share = -(-self.sample_rows // len(groups))
+                if depth < min(share, len(positions)):
+                    step = len(positions) / min(share, len(positions))
+                    picked.append(positions[int(depth * step)])
+                    added = True
+            if not added:
+                break
+            depth += 1
+        return [rows[position] for position in sorted(picked)]
+
+    def _stratum_column(self, profiles: List[ColumnProfile]) -> Optional[str]:
+        """The text column to stratify on: few distinct values, more than one."""
+        candidates = [
+            p for p in profiles
+            if p.kind == TEXT and not p.distinct_capped and 1 < p.distinct <= self.sample_rows
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda p: p.distinct).name
+
+    def format(self, results: ResultSet, row_count: Optional[int] = None, partial: bool = False) -> str:
+        """Render the profile and sample as compact text for a prompt.
+
+        row_count is the size of the full result when results holds only its
+        first rows (a lower bound if partial); the profile is then labelled
+        as covering a preview.
+        """
+        if not results.rows:
+            return "Sonuç bulunamadı.\n"
+
+        profiles = self.profile(results)
+        if partial or (row_count is not None and row_count > len(results)):
+            total = f"{max(row_count or 0, len(results))}{'+' if partial else ''}"
+            lines = [
+                f"NOT: Sorgu toplam {total} satır döndürdü; aşağıdaki profil ve örnekler yalnızca "
+                f"ilk {len(results)} satırlık önizlemeye dayanır. Toplamları tüm sonuç için genelleme.",
+                f"SÜTUN PROFİLİ (önizleme, ilk {len(results)} satır):",
+            ]
+        else:
+            lines = [f"SÜTUN PROFİLİ ({len(results)} satır):"]
+        for p in profiles:
+            line = f"- {p.name} ({p.kind}): {p.count} dolu"
+            if p.nulls:
+                line += f", {p.nulls} boş"
+            if p.kind == NUMERIC:
+                line += f"; min {self._cell(p.minimum)}, max {self._cell(p.maximum)}, ort {p.mean:.2f}"
+            elif p.kind == DATE:
+                line += f"; {self._cell(p.minimum)} – {self._cell(p.maximum)}"
+            if p.kind == TEXT:
+                distinct = f"{p.distinct}+" if p.distinct_capped else str(p.distinct)
+                line += f"; {distinct} farklı"
+            if p.top:
+                line += "; en sık: " + ", ".join(f"{self._cell(v)} ({n})" for v, n in p.top)
+            lines.append(line)
+
+        sample = self.sample(results, profiles)
+        lines.append("")
+        lines.append(f"ÖRNEK SATIRLAR ({len(sample)}/{len(results)}):")
+        lines.append(" | ".join(results.columns))
+        for row in sample:
+            lines.append(" | ".join(self._cell(value) for value in row))
+        return "\n".join(lines) + "\n"
+
+    def _cell(self, value: Any) -> str:
+        """Format one value for the prompt, shortening long text."""
+        if value is None:
+            return "NULL"
+        if isinstance(value, float):
+            return f"{value:g}"
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+        text = str(value).replace("\n", " ")
+        if len(text) > self.MAX_CELL_LENGTH:
+            text = text[:self.MAX_CELL_LENGTH - 1] + "…"
+        return text
+
+
+# Global profiler used for result summaries
+result_profiler = ResultProfiler()
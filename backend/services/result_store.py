@@ -0,0 +1,106 @@
+"""
+Compressed result storage for saved queries.
+Keeps result sets out of saved_queries in a content-addressed side table.
+"""
+import hashlib
+import json
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import logging
+
+from backend.models.models import ResultSet
+from backend.core.utils import JSONUtils
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """Content-addressed, compressed storage for query result sets.
+
+    Results are serialized to the {columns, rows} wire format, hashed
+    (SHA-256 of the uncompressed JSON) and stored once per distinct content in
+    query_result_blobs. saved_queries only keeps the hash and row count.
+    All methods take the caller's cursor so writes share its transaction.
+    """
+
+    TABLE = "query_result_blobs"
+    CODEC = "zlib"
+    COMPRESSION_LEVEL = 6
+
+    CREATE_TABLE_SQL = f"""
+        CREATE TABLE {TABLE} (
+            content_hash CHAR(64) NOT NULL PRIMARY KEY,
+            codec VARCHAR(16) NOT NULL,
+            payload VARBINARY(MAX) NOT NULL,
+            row_count INT NOT NULL,
+            raw_size INT NOT NULL,
+            created_at DATETIME2 DEFAULT GETDATE()
+        )
+    """
+
+    @staticmethod
+    def _serialize(results: ResultSet) -> bytes:
+        return JSONUtils.dumps(results.to_wire()).encode("utf-8")
+
+    @classmethod
+    def content_hash(cls, results: ResultSet) -> str:
+        """Hash a result set the way put_many() does, without compressing it."""
+        return hashlib.sha256(cls._serialize(results)).hexdigest()
+
+    @classmethod
+    def encode(cls, results: ResultSet) -> Tuple[str, bytes, int]:
+        """Serialize and compress a result set; returns (content_hash, payload, raw_size)."""
+        raw = cls._serialize(results)
+        content_hash = hashlib.sha256(raw).hexdigest()
+        return content_hash, zlib.compress(raw, cls.COMPRESSION_LEVEL), len(raw)
+
+    @classmethod
+    def decode(cls, payload: bytes, codec: str) -> ResultSet:
+        """Decompress and parse a stored result set."""
+        if codec != cls.CODEC:
+            raise ValueError(f"Unsupported result codec: {codec}")
+        return ResultSet.from_wire(json.loads(zlib.decompress(payload).decode("utf-8")))
+
+    @classmethod
+    def put_many(cls, cursor, result_sets: Iterable[Optional[ResultSet]]) -> List[Optional[str]]:
+        """Store several result sets in one array-bound round trip; returns their hashes (None for None)."""
+        hashes: List[Optional[str]] = []
+        params: Dict[str, tuple] = {}
+        for results in result_sets:
+            if results is None:
+                hashes.append(None)
+                continue
+            content_hash, payload, raw_size = cls.encode(results)
+            hashes.append(content_hash)
+            params.setdefault(
+                content_hash,
+                (content_hash, cls.CODEC, payload, len(results), raw_size, content_hash)
+            )
+        if params:
+            cursor.fast_executemany = True
+            cursor.executemany(f"""
+                INSERT INTO {cls.TABLE} (content_hash, codec, payload, row_count, raw_size)
+                SELECT ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM {cls.TABLE} WHERE content_hash = ?)
+            """, list(params.values()))
+            logger.info(f"Stored {len(params)} results in one batch")
+        return hashes
+
+    @classmethod
+    def delete_orphans(cls, cursor, content_hashes: Optional[Iterable[str]] = None) -> int:
+        """Delete blobs no saved query points to (optionally only among the given hashes)."""
+        sql = f"""
+            DELETE b FROM {cls.TABLE} b
+            WHERE NOT EXISTS (SELECT 1 FROM saved_queries q WHERE q.result_hash = b.content_hash)
+        """
+        params: tuple = ()
+        if content_hashes is not None:
+            hashes = sorted({h for h in content_hashes if h})
+            if not hashes:
+                return 0
+            # One statement for any number of hashes (no parameter limit)
+            sql += " AND b.content_hash IN (SELECT value FROM OPENJSON(?))"
+            params = (json.dumps(hashes),)
+        cursor.execute(sql, params)
+        return cursor.rowcount
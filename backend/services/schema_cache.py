@@ -0,0 +1,236 @@
+"""
+Schema caching for database connections.
+Keeps introspected schemas in memory and refreshes them when the database changes.
+"""
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple, List
+
+import logging
+
+from backend.models.models import DatabaseSchema, TableInfo
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _SchemaEntry:
+    """Cached schema for one DSN plus its change fingerprint.
+    complete is False while only individually requested tables have been loaded;
+    absent then holds requested names that turned out not to exist.
+    """
+
+    def __init__(self, tables: Dict[str, TableInfo], fingerprint: Optional[Tuple], version: int,
+                 complete: bool = True):
+        self.tables = tables
+        self.fingerprint = fingerprint
+        self.version = version
+        self.complete = complete
+        self.absent: frozenset = frozenset()
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+        self.refreshing = False
+
+
+class SchemaCache:
+    """Versioned, per-DSN schema cache with fingerprint-based change detection.
+
+    Reads are served from memory. Once an entry is older than check_interval,
+    the next read still returns the cached schema but starts a background
+    check of the change fingerprint, reloading the schema only if it moved.
+    """
+
+    def __init__(self, check_interval: float = Config.SCHEMA_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries: Dict[str, _SchemaEntry] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+
+    @staticmethod
+    def cache_key(db_manager) -> str:
+        """Cache key for a database manager (sanitized DSN, no password)."""
+        return db_manager.connection_string
+
+    def get_schema(self, db_manager) -> DatabaseSchema:
+        """Get the cached schema, loading it on first use."""
+        key = self.cache_key(db_manager)
+        entry = self._entries.get(key)
+        if entry is None or not entry.complete:
+            entry = self._load(db_manager)
+        elif time.monotonic() - entry.checked_at > self.check_interval:
+            self.refresh_async(db_manager)
+        return DatabaseSchema(tables=dict(entry.tables))
+
+    def get_tables(self, db_manager, table_names: List[str]) -> DatabaseSchema:
+        """Get the schema for specific tables, introspecting only those not cached yet.
+
+        Tables that are missing from a complete cache entry do not exist and are
+        simply left out; nothing else triggers a database round trip. Names
+        looked up once and not found are remembered until the schema changes.
+        """
+        key = self.cache_key(db_manager)
+        entry = self._entries.get(key)
+
+        if entry is not None and time.monotonic() - entry.checked_at > self.check_interval:
+            self.refresh_async(db_manager)
+
+        missing = [
+            name for name in table_names
+            if entry is None or (name not in entry.tables and name not in entry.absent)
+        ]
+        if missing and (entry is None or not entry.complete):
+            entry = self._merge_tables(db_manager, missing)
+
+        return DatabaseSchema(tables={
+            name: entry.tables[name] for name in table_names if name in entry.tables
+        })
+
+    def is_complete(self, db_manager) -> bool:
+        """True if the full schema (not only requested tables) is cached."""
+        entry = self._entries.get(self.cache_key(db_manager))
+        return entry is not None and entry.complete
+
+    def load_async(self, db_manager) -> None:
+        """Load the full schema on a background thread unless it is cached or already loading."""
+        key = self.cache_key(db_manager)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+            entry = self._entries.get(key)
+            if (entry is not None and entry.complete) or load_lock.locked():
+                return
+
+        def _run():
+            try:
+                self._load(db_manager)
+            except Exception as e:
+                logger.error(f"Background schema load failed: {e}")
+
+        threading.Thread(target=_run, name="schema-cache-load", daemon=True).start()
+
+    def get_version(self, db_manager) -> Optional[int]:
+        """Version of the cached schema (changes every time it is reloaded)."""
+        entry = self._entries.get(self.cache_key(db_manager))
+        return entry.version if entry else None
+
+    def refresh(self, db_manager, force: bool = False) -> bool:
+        """Reload the schema if its fingerprint changed (or always, if force).
+
+        Returns True if the schema was reloaded.
+        """
+        key = self.cache_key(db_manager)
+        entry = self._entries.get(key)
+        if entry is None or force:
+            self._load(db_manager, force=force)
+            return True
+
+        fingerprint = db_manager.get_schema_fingerprint()
+        if fingerprint == entry.fingerprint:
+            entry.checked_at = time.monotonic()
+            return False
+
+        logger.info("Database schema changed, reloading schema cache")
+        if entry.complete:
+            self._load(db_manager, force=True)
+        else:
+            # Only reload the tables that were actually asked for
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            self._merge_tables(db_manager, list(entry.tables))
+        return True
+
+    def refresh_async(self, db_manager) -> None:
+        """Run refresh() on a background thread unless one is already running."""
+        key = self.cache_key(db_manager)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.refreshing:
+                    return
+                entry.refreshing = True
+
+        def _run():
+            try:
+                self.refresh(db_manager)
+            except Exception as e:
+                logger.error(f"Background schema refresh failed: {e}")
+            finally:
+                current = self._entries.get(key)
+                if current is not None:
+                    current.refreshing = False
+                if entry is not None:
+                    entry.refreshing = False
+
+        threading.Thread(target=_run, name="schema-cache-refresh", daemon=True).start()
+
+    def invalidate(self, db_manager=None) -> None:
+        """Drop the cached schema for one connection, or for all connections."""
+        with self._lock:
+            if db_manager is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.cache_key(db_manager), None)
+        logger.info("Schema cache invalidated")
+
+    def get_status(self, db_manager) -> Dict[str, Any]:
+        """Describe the cache entry for a connection."""
+        entry = self._entries.get(self.cache_key(db_manager))
+        if entry is None:
+            return {"cached": False}
+        return {
+            "cached": True,
+            "version": entry.version,
+            "table_count": len(entry.tables),
+            "complete": entry.complete,
+            "loaded_at": entry.loaded_at,
+            "seconds_since_check": round(time.monotonic() - entry.checked_at, 1),
+            "refreshing": entry.refreshing
+        }
+
+    def _load(self, db_manager, force: bool = False) -> _SchemaEntry:
+        """Introspect the database and store the result (one loader per DSN at a time)."""
+        key = self.cache_key(db_manager)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            entry = self._entries.get(key)
+            if entry is not None and entry.complete and not force:
+                return entry
+
+            fingerprint = db_manager.get_schema_fingerprint()
+            schema = db_manager.get_database_schema()
+            with self._lock:
+                self._version += 1
+                entry = _SchemaEntry(schema.tables, fingerprint, self._version)
+                self._entries[key] = entry
+            logger.info(f"Schema cache loaded {len(schema.tables)} tables (version {entry.version})")
+            return entry
+
+    def _merge_tables(self, db_manager, table_names: List[str]) -> _SchemaEntry:
+        """Introspect a batch of tables and merge them into the (possibly new) entry."""
+        key = self.cache_key(db_manager)
+        fingerprint = None
+        if self._entries.get(key) is None:
+            fingerprint = db_manager.get_schema_fingerprint()
+        schema = db_manager.get_tables_schema(table_names)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._version += 1
+                entry = _SchemaEntry(dict(schema.tables), fingerprint, self._version, complete=False)
+                self._entries[key] = entry
+            else:
+                # Swap in a new dict so concurrent readers never see it mid-update
+                entry.tables = {**entry.tables, **schema.tables}
+            # A fingerprint change replaces the entry, which forgets these
+            entry.absent = entry.absent | {name for name in table_names if name not in schema.tables}
+        logger.info(f"Schema cache merged {len(schema.tables)} tables (version {entry.version})")
+        return entry
+
+
+# Global schema cache shared by all routes and services
+schema_cache = SchemaCache()
@@ -0,0 +1,170 @@
+"""
+Schema migrations for the application's own tables.
+Brings saved_queries and its side tables up to date once per database, tracked in niq_schema_version.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import logging
+
+from backend.services.result_store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "niq_schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema version: statements run in order, in one transaction."""
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+
+
+# Statements are idempotent, so databases set up before versioning migrate cleanly
+MIGRATIONS: List[Migration] = [
+    Migration(1, "saved_queries and result blobs", (
+        """
+        IF OBJECT_ID('saved_queries', 'U') IS NULL
+            CREATE TABLE saved_queries (
+                id INT IDENTITY(1,1) PRIMARY KEY,
+                question NVARCHAR(MAX) NOT NULL,
+                sql_query NVARCHAR(MAX) NOT NULL,
+                tables_used NVARCHAR(MAX),
+                created_at DATETIME2 DEFAULT GETDATE(),
+                is_successful BIT DEFAULT 1,
+                error_message NVARCHAR(MAX),
+                query_results NVARCHAR(MAX),
+                result_message NVARCHAR(MAX),
+                result_hash CHAR(64),
+                row_count INT
+            )
+        """,
+        "IF COL_LENGTH('saved_queries', 'query_results') IS NULL ALTER TABLE saved_queries ADD query_results NVARCHAR(MAX)",
+        "IF COL_LENGTH('saved_queries', 'result_message') IS NULL ALTER TABLE saved_queries ADD result_message NVARCHAR(MAX)",
+        "IF COL_LENGTH('saved_queries', 'result_hash') IS NULL ALTER TABLE saved_queries ADD result_hash CHAR(64)",
+        "IF COL_LENGTH('saved_queries', 'row_count') IS NULL ALTER TABLE saved_queries ADD row_count INT",
+        f"IF OBJECT_ID('{ResultStore.TABLE}', 'U') IS NULL {ResultStore.CREATE_TABLE_SQL}",
+    )),
+    Migration(2, "query summaries", (
+        """
+        IF OBJECT_ID('query_summaries', 'U') IS NULL
+            CREATE TABLE query_summaries (
+                sql_hash CHAR(64) NOT NULL,
+                result_hash CHAR(64) NOT NULL,
+                summary NVARCHAR(MAX) NOT NULL,
+                analysis NVARCHAR(MAX) NOT NULL,
+                created_at DATETIME2 DEFAULT GETDATE(),
+                PRIMARY KEY (sql_hash, result_hash)
+            )
+        """,
+    )),
+    Migration(3, "history indexes", (
+        # Keyset pagination of the history list
+        """
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_saved_queries_created_at_id' AND object_id = OBJECT_ID('saved_queries'))
+            CREATE INDEX IX_saved_queries_created_at_id
+            ON saved_queries (created_at DESC, id DESC)
+            INCLUDE (is_successful, row_count, result_hash)
+        """,
+        # Recent successful queries that seed the SQL cache
+        """
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_saved_queries_successful' AND object_id = OBJECT_ID('saved_queries'))
+            CREATE INDEX IX_saved_queries_successful
+            ON saved_queries (created_at DESC, id DESC)
+            WHERE is_successful = 1
+        """,
+        # Orphaned result blob checks after deletes
+        """
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_saved_queries_result_hash' AND object_id = OBJECT_ID('saved_queries'))
+            CREATE INDEX IX_saved_queries_result_hash
+            ON saved_queries (result_hash)
+            WHERE result_hash IS NOT NULL
+        """,
+    )),
+    Migration(4, "execution status", (
+        # success, error, cancelled or timeout; NULL for rows saved before it existed
+        "IF COL_LENGTH('saved_queries', 'status') IS NULL ALTER TABLE saved_queries ADD status VARCHAR(16) NULL",
+    )),
+    Migration(5, "partial results", (
+        # 1 when row_count is a lower bound (result cut at a limit, or only its first page read)
+        "IF COL_LENGTH('saved_queries', 'is_partial') IS NULL ALTER TABLE saved_queries ADD is_partial BIT NOT NULL DEFAULT 0",
+    )),
+]
+
+
+class SchemaMigrator:
+    """Applies pending migrations once per connection and remembers the outcome.
+
+    The applied version is kept in niq_schema_version. After the first
+    successful run for a connection, ensure() answers from memory, so saving
+    or reading history never checks the catalog again.
+    """
+
+    def __init__(self, migrations: List[Migration] = MIGRATIONS):
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        self.latest = self.migrations[-1].version if self.migrations else 0
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, db_manager) -> bool:
+        """Bring db_manager's database to the latest version (once per connection); True if it is."""
+        key = db_manager.connection_string
+        if self._versions.get(key) == self.latest:
+            return True
+        # One migration run at a time; others wait for it and then see the result
+        with self._lock:
+            if self._versions.get(key) == self.latest:
+                return True
+            try:
+                self._versions[key] = self._migrate(db_manager)
+                return True
+            except Exception as e:
+                logger.error(f"Schema migration failed: {e}")
+                return False
+
+    def _migrate(self, db_manager) -> int:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                IF OBJECT_ID('{VERSION_TABLE}', 'U') IS NULL
+                    CREATE TABLE {VERSION_TABLE} (
+                        version INT NOT NULL PRIMARY KEY,
+                        description NVARCHAR(200) NOT NULL,
+                        applied_at DATETIME2 DEFAULT GETDATE()
+                    );
+                SELECT ISNULL(MAX(version), 0) FROM {VERSION_TABLE};
+            """)
+            # Skip the CREATE TABLE's row count to reach the SELECT
+            while cursor.description is None and cursor.nextset():
+                pass
+            version = cursor.fetchone()[0]
+            conn.commit()
+
+            for migration in self.migrations:
+                if migration.version <= version:
+                    continue
+                try:
+                    for statement in migration.statements:
+                        cursor.execute(statement)
+                    cursor.execute(
+                        f"INSERT INTO {VERSION_TABLE} (version, description) VALUES (?, ?)",
+                        (migration.version, migration.description)
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                version = migration.version
+                logger.info(f"Applied schema migration {version}: {migration.description}")
+            return version
+
+    def get_version(self, db_manager) -> int:
+        """Version last applied or found for db_manager's connection in this process (0 if unknown)."""
+        return self._versions.get(db_manager.connection_string, 0)
+
+
+# Global migrator shared by all database managers
+schema_migrator = SchemaMigrator()
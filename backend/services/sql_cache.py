@@ -0,0 +1,141 @@
+"""
+Cache of generated SQL for natural language questions.
+Lets repeated (or trivially reworded) questions skip the AI round trip.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import logging
+
+from backend.models.models import TableInfo
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_APOSTROPHES = re.compile(r"['’‘`]")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for fuzzy lookup.
+
+    Case, Turkish dotted/dotless i, diacritics, punctuation and whitespace
+    differences are folded away.
+    """
+    text = question.replace("İ", "i").replace("I", "ı").lower().replace("ı", "i")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    # Turkish suffixes are split off with an apostrophe ("İstanbul'daki")
+    text = _APOSTROPHES.sub("", text)
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def schema_hash(tables: Dict[str, TableInfo]) -> str:
+    """Hash the parts of a schema a generated query depends on."""
+    shape = []
+    for name in sorted(tables):
+        table = tables[name]
+        types = {column.name: column.data_type for column in table.column_details}
+        shape.append([name, table.schema, [[column, types.get(column)] for column in table.columns]])
+    raw = json.dumps(shape, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class SQLCache:
+    """LRU + TTL cache of question -> SQL, scoped by a hash of the relevant schema.
+
+    Each entry is reachable by its exact question and by its normalized form;
+    both keys include the schema hash, so a schema change misses naturally.
+    max_entries bounds keys, so one question takes up to two slots.
+    """
+
+    def __init__(self, max_entries: int = Config.SQL_CACHE_MAX_ENTRIES,
+                 ttl: float = Config.SQL_CACHE_TTL):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {"exact": 0, "normalized": 0}
+        self._misses = 0
+
+    @staticmethod
+    def _keys(question: str, digest: str) -> List[Tuple[str, str, str]]:
+        """Lookup keys in priority order: exact, then normalized."""
+        return [
+            ("exact", digest, question.strip()),
+            ("normalized", digest, normalize_question(question)),
+        ]
+
+    def get(self, question: str, digest: str) -> Optional[str]:
+        """Look up cached SQL for a question against a schema hash."""
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys(question, digest):
+                item = self._entries.get(key)
+                if item is None:
+                    continue
+                sql_query, stored_at = item
+                if now - stored_at > self.ttl:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                self._hits[key[0]] += 1
+                return sql_query
+            self._misses += 1
+        return None
+
+    def put(self, question: str, digest: str, sql_query: str) -> None:
+        """Store SQL for a question under both of its keys."""
+        stored_at = time.monotonic()
+        with self._lock:
+            for key in self._keys(question, digest):
+                self._entries[key] = (sql_query, stored_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, question: str, digest: str) -> None:
+        """Drop the SQL stored for a question, e.g. after it failed validation or execution."""
+        with self._lock:
+            for key in self._keys(question, digest):
+                self._entries.pop(key, None)
+
+    def seed(self, entries: List[Tuple[str, str, str]]) -> int:
+        """Add known (question, schema hash, SQL) entries without promoting them over fresher ones."""
+        added = 0
+        with self._lock:
+            for question, digest, sql_query in entries:
+                for key in self._keys(question, digest):
+                    if key in self._entries or len(self._entries) >= self.max_entries:
+                        continue
+                    self._entries[key] = (sql_query, time.monotonic())
+                    self._entries.move_to_end(key, last=False)
+                    added += 1
+        return added
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": dict(self._hits),
+                "misses": self._misses,
+            }
+
+
+# Global cache shared by all AI service instances
+sql_cache = SQLCache()
@@ -0,0 +1,189 @@
+"""
+Offline SQL generation from saved queries.
+Turns successful question/SQL pairs into templates whose literals are re-filled for new questions.
+"""
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import logging
+
+from backend.config.config import Config
+from backend.services.sql_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Literals a question can vary by: double-quoted text and numbers
+_LITERAL = re.compile(r"[\"“”]([^\"“”]+)[\"“”]|(?<![\w.])(\d+(?:\.\d+)?)(?![\w]|\.\d)")
+
+NUMBER = "__sayi__"
+STRING = "__metin__"
+
+
+@dataclass
+class SQLTemplate:
+    """SQL learned from one question, with slots for the question's literals."""
+    structure: str
+    kinds: Tuple[str, ...]
+    values: Tuple[str, ...]
+    sql: str
+    # SQL with \x00<i>\x00 markers for literal i, or None if the literals could not be located
+    pattern: Optional[str]
+
+    def render(self, kinds: Tuple[str, ...], values: Tuple[str, ...]) -> Optional[str]:
+        """SQL for a question with the given literals, or None if they cannot be filled in."""
+        if kinds != self.kinds:
+            return None
+        if values == self.values:
+            return self.sql
+        if self.pattern is None:
+            return None
+        sql = self.pattern
+        for i, (kind, value) in enumerate(zip(kinds, values)):
+            replacement = value if kind == NUMBER else value.replace("'", "''")
+            sql = sql.replace(f"\x00{i}\x00", replacement)
+        return sql
+
+
+class SQLTemplateEngine:
+    """Answers questions from templates learned from earlier successful queries.
+
+    A question's structure is its normalized text with numbers and quoted
+    text masked, so "2023 yılında kaç sipariş var" and "2024 yılında kaç
+    sipariş var" share a template whose SQL gets the new year. Templates are
+    scoped by the same schema hash as the SQL cache. Exact structure
+    matches are reliable; near matches (word overlap of at least
+    min_score) are only meant for when no model is reachable.
+    """
+
+    def __init__(self, max_templates: int = Config.SQL_CACHE_MAX_ENTRIES,
+                 min_score: float = Config.AI_TEMPLATE_MIN_SCORE):
+        self.max_templates = max(1, max_templates)
+        self.min_score = min_score
+        self._templates: "OrderedDict[Tuple[str, str], SQLTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {"exact": 0, "similar": 0}
+        self._misses = 0
+
+    @staticmethod
+    def _parse(question: str) -> Tuple[str, Tuple[str, ...], Tuple[str, ...]]:
+        """Split a question into (structure, literal kinds, literal values)."""
+        kinds, values = [], []
+
+        def _mask(match: "re.Match") -> str:
+            if match.group(1) is not None:
+                kinds.append(STRING)
+                values.append(match.group(1))
+                return f" {STRING} "
+            kinds.append(NUMBER)
+            values.append(match.group(2))
+            return f" {NUMBER} "
+
+        masked = _LITERAL.sub(_mask, question)
+        return normalize_question(masked), tuple(kinds), tuple(values)
+
+    @staticmethod
+    def _compile(sql_query: str, kinds: Tuple[str, ...], values: Tuple[str, ...]) -> Optional[str]:
+        """Mark where each question literal appears in the SQL; None unless each appears exactly once."""
+        pattern = sql_query
+        for i, (kind, value) in enumerate(zip(kinds, values)):
+            if kind == NUMBER:
+                regex = re.compile(r"(?<![\w.])" + re.escape(value) + r"(?![\w]|\.\d)")
+            else:
+                # Inside a string literal, possibly as part of a LIKE pattern
+                regex = re.compile(r"(?<=['%])" + re.escape(value.replace("'", "''")) + r"(?=['%])")
+            if len(regex.findall(pattern)) != 1:
+                return None
+            pattern = regex.sub(f"\x00{i}\x00", pattern)
+        return pattern
+
+    def add(self, question: str, digest: str, sql_query: str) -> None:
+        """Learn (or refresh) the template for a successful question."""
+        template = self._build(question, sql_query)
+        key = (digest, template.structure)
+        with self._lock:
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+
+    def seed(self, entries: List[Tuple[str, str, str]]) -> int:
+        """Learn (question, schema hash, SQL) entries without replacing fresher templates."""
+        added = 0
+        with self._lock:
+            for question, digest, sql_query in entries:
+                template = self._build(question, sql_query)
+                key = (digest, template.structure)
+                if key in self._templates or len(self._templates) >= self.max_templates:
+                    continue
+                self._templates[key] = template
+                self._templates.move_to_end(key, last=False)
+                added += 1
+        return added
+
+    def _build(self, question: str, sql_query: str) -> SQLTemplate:
+        structure, kinds, values = self._parse(question)
+        return SQLTemplate(
+            structure=structure,
+            kinds=kinds,
+            values=values,
+            sql=sql_query,
+            pattern=self._compile(sql_query, kinds, values)
+        )
+
+    def generate(self, question: str, digest: str, exact_only: bool = True) -> Optional[str]:
+        """SQL for a question from a learned template, or None.
+
+        With exact_only=False the closest template with the same literal
+        kinds is used when no template has exactly the same structure.
+        """
+        structure, kinds, values = self._parse(question)
+        with self._lock:
+            template = self._templates.get((digest, structure))
+            if template is not None:
+                sql_query = template.render(kinds, values)
+                if sql_query:
+                    self._templates.move_to_end((digest, structure))
+                    self._hits["exact"] += 1
+                    return sql_query
+
+            if not exact_only:
+                words = set(structure.split())
+                best: Tuple[float, Optional[str]] = (0.0, None)
+                for (template_digest, _), template in self._templates.items():
+                    if template_digest != digest or template.kinds != kinds:
+                        continue
+                    template_words = set(template.structure.split())
+                    score = len(words & template_words) / len(words | template_words) if words else 0.0
+                    if score >= self.min_score and score > best[0]:
+                        sql_query = template.render(kinds, values)
+                        if sql_query:
+                            best = (score, sql_query)
+                if best[1]:
+                    logger.info(f"Template match with word overlap {best[0]:.2f}")
+                    self._hits["similar"] += 1
+                    return best[1]
+
+            self._misses += 1
+        return None
+
+    def clear(self) -> None:
+        """Forget every template."""
+        with self._lock:
+            self._templates.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "templates": len(self._templates),
+                "max_templates": self.max_templates,
+                "hits": dict(self._hits),
+                "misses": self._misses,
+            }
+
+
+# Global template engine shared by all AI service instances
+sql_templates = SQLTemplateEngine()
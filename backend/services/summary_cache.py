@@ -0,0 +1,83 @@
+"""
+Cache of AI summaries for SQL queries and their results.
+A summary depends only on the SQL and the result content, so it is generated once per pair.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import logging
+
+from backend.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def sql_hash(sql_query: str) -> str:
+    """Hash a SQL query, ignoring whitespace differences."""
+    normalized = _WHITESPACE.sub(" ", sql_query).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """LRU cache of {summary, analysis} keyed by (SQL hash, result fingerprint).
+
+    The fingerprint is the result store content hash of the results the
+    summary was written from, or "" for summaries of the SQL alone. Entries
+    never go stale: different results mean a different key.
+    """
+
+    def __init__(self, max_entries: int = Config.SUMMARY_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _key(sql_query: str, fingerprint: Optional[str]) -> Tuple[str, str]:
+        return sql_hash(sql_query), fingerprint or ""
+
+    def get(self, sql_query: str, fingerprint: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Look up the summary of a query (and of its results, if a fingerprint is given)."""
+        key = self._key(sql_query, fingerprint)
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return dict(summary)
+
+    def put(self, sql_query: str, fingerprint: Optional[str], summary: Dict[str, str]) -> None:
+        """Store a summary."""
+        key = self._key(sql_query, fingerprint)
+        with self._lock:
+            self._entries[key] = {"summary": summary.get("summary", ""), "analysis": summary.get("analysis", "")}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached summary."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+# Global cache shared by all AI service instances
+summary_cache = SummaryCache()
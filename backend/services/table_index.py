@@ -0,0 +1,217 @@
+"""
+Local table retrieval index.
+Suggests the tables a question is about with BM25 over table and column names, without calling the AI.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import logging
+
+from backend.models.models import TableInfo
+from backend.config.config import Config
+from backend.services.schema_cache import schema_cache
+from backend.services.sql_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER_PARTS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Question words that never identify a table
+_STOPWORDS = frozenset("""
+ve ile veya bir bu su o icin gore kac kadar nedir nelerdir olan olarak en mi mu da de ki hangi hangisi
+her tum butun gibi daha cok az ne nasil neden listele goster getir ver bul toplam sayisi adet
+the a an of by for per in on to and or with what which how many much show list get all total count
+""".split())
+
+
+@lru_cache(maxsize=16384)
+def identifier_terms(identifier: str) -> Tuple[str, ...]:
+    """Split a CamelCase / snake_case identifier into normalized words."""
+    terms = []
+    for chunk in re.split(r"[_\W]+", identifier):
+        for part in _IDENTIFIER_PARTS.findall(chunk) or [chunk]:
+            term = normalize_question(part)
+            if term:
+                terms.append(term)
+    return tuple(terms)
+
+
+class _TableDocument:
+    """Bag of index terms for one table."""
+
+    # Words of the table name count more than words of its columns
+    NAME_WEIGHT = 3
+
+    def __init__(self, table: TableInfo):
+        self.signature = self.signature_of(table)
+        terms: Counter = Counter()
+        for term in identifier_terms(table.name):
+            terms[term] += self.NAME_WEIGHT
+        if table.schema != "dbo":
+            terms.update(identifier_terms(table.schema))
+        for column in table.columns:
+            terms.update(identifier_terms(column))
+        for fk in table.foreign_keys:
+            terms.update(identifier_terms(fk.referenced_table))
+        self.terms = terms
+        self.length = sum(terms.values())
+
+    @staticmethod
+    def signature_of(table: TableInfo) -> tuple:
+        """What the document depends on; unchanged signature means no re-indexing."""
+        return (
+            table.name,
+            table.schema,
+            tuple(table.columns),
+            tuple(fk.referenced_table for fk in table.foreign_keys)
+        )
+
+
+class TableIndex:
+    """BM25 index over the tables of one database.
+
+    update() re-tokenizes only tables whose columns or keys changed. Query
+    words also match index words they extend or are extended by (Turkish
+    suffixes: "müşterilerin" matches "Musteri"), at a lower weight.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    PREFIX_WEIGHT = 0.7
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._docs: Dict[str, _TableDocument] = {}
+        self._df: Counter = Counter()
+        self._avgdl = 0.0
+        self._expansions: Dict[str, List[Tuple[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, tables: Dict[str, TableInfo], version: Optional[int]) -> int:
+        """Bring the index in line with a schema; returns the number of re-indexed tables."""
+        with self._lock:
+            docs = dict(self._docs)
+            df = Counter(self._df)
+            changed = 0
+
+            for name in [name for name in docs if name not in tables]:
+                df.subtract(docs.pop(name).terms.keys())
+                changed += 1
+
+            for name, table in tables.items():
+                current = docs.get(name)
+                if current is not None and current.signature == _TableDocument.signature_of(table):
+                    continue
+                if current is not None:
+                    df.subtract(current.terms.keys())
+                doc = _TableDocument(table)
+                df.update(doc.terms.keys())
+                docs[name] = doc
+                changed += 1
+
+            self._docs = docs
+            self._df = +df
+            self._avgdl = sum(doc.length for doc in docs.values()) / len(docs) if docs else 0.0
+            self._expansions = {}
+            self.version = version
+
+        if changed:
+            logger.info(f"Table index updated: {changed} tables re-indexed, {len(self._docs)} total")
+        return changed
+
+    def search(self, question: str, k: int = Config.TABLE_SUGGEST_TOP_K) -> List[Tuple[str, float]]:
+        """Top-k (table, score) pairs for a question, best first."""
+        with self._lock:
+            docs, df, avgdl = self._docs, self._df, self._avgdl
+        if not docs:
+            return []
+
+        query_terms = [
+            term for term in normalize_question(question).split()
+            if len(term) >= 2 and term not in _STOPWORDS
+        ]
+        n_docs = len(docs)
+        weights: Dict[str, float] = {}
+        for term in query_terms:
+            for index_term, weight in self._expand(term, df):
+                weights[index_term] = max(weights.get(index_term, 0.0), weight)
+
+        scores: List[Tuple[str, float]] = []
+        for name, doc in docs.items():
+            score = 0.0
+            for term, weight in weights.items():
+                tf = doc.terms.get(term)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf + self.K1 * (1 - self.B + self.B * doc.length / avgdl)
+                score += weight * idf * tf * (self.K1 + 1) / norm
+            if score > 0:
+                scores.append((name, round(score, 4)))
+
+        scores.sort(key=lambda item: -item[1])
+        return scores[:k]
+
+    def _expand(self, term: str, df: Counter) -> List[Tuple[str, float]]:
+        """Index words a query word matches, with their weights (memoized per index version)."""
+        cached = self._expansions.get(term)
+        if cached is not None:
+            return cached
+        matches = [(term, 1.0)] if term in df else []
+        if len(term) >= 3:
+            for index_term in df:
+                if index_term == term or len(index_term) < 3:
+                    continue
+                if term.startswith(index_term) or (len(term) >= 4 and index_term.startswith(term)):
+                    matches.append((index_term, self.PREFIX_WEIGHT))
+        self._expansions[term] = matches
+        return matches
+
+
+# Index version while it is built from the table catalog (schema cache versions start at 1)
+CATALOG_VERSION = 0
+
+
+class TableSuggester:
+    """Per-connection table indexes kept in step with the schema cache.
+
+    Until the schema cache holds the full schema, the index is built from
+    the lighter table catalog and the full schema loads in the background,
+    so the first question never waits for a full introspection.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, TableIndex] = {}
+        self._lock = threading.Lock()
+
+    def suggest(self, db_manager, question: str, k: int = Config.TABLE_SUGGEST_TOP_K) -> List[Tuple[str, float]]:
+        """Suggest the top-k tables for a question on a connection."""
+        key = schema_cache.cache_key(db_manager)
+        with self._lock:
+            index = self._indexes.setdefault(key, TableIndex())
+
+        if schema_cache.is_complete(db_manager):
+            version = schema_cache.get_version(db_manager)
+            if index.version != version:
+                index.update(schema_cache.get_schema(db_manager).tables, version)
+        else:
+            if index.version is None:
+                index.update(db_manager.get_table_catalog(), CATALOG_VERSION)
+            schema_cache.load_async(db_manager)
+        return index.search(question, k)
+
+    def invalidate(self, db_manager=None) -> None:
+        """Drop the index for one connection, or for all connections."""
+        with self._lock:
+            if db_manager is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(schema_cache.cache_key(db_manager), None)
+
+
+# Global table suggester shared by all routes
+table_suggester = TableSuggester()
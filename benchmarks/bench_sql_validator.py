@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: token-based SQLValidator vs. the previous substring scan.
+
+Run from the repository root:
+    python benchmarks/bench_sql_validator.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.sql_lexer import tokenize  # noqa: E402
+from backend.core.utils import SQLValidator  # noqa: E402
+
+LEGACY_DANGEROUS_KEYWORDS = [
+    'DROP', 'TRUNCATE', 'ALTER', 'CREATE', 'EXEC', 'EXECUTE',
+    'SP_', 'XP_', 'SHUTDOWN', 'BACKUP', 'RESTORE'
+]
+
+
+def legacy_validate(sql_query: str) -> bool:
+    """The validator before the tokenizer: upper-case, then one substring scan per keyword."""
+    if not sql_query or not sql_query.strip():
+        return False
+    sql_upper = sql_query.upper().strip()
+    for keyword in LEGACY_DANGEROUS_KEYWORDS:
+        if keyword in sql_upper:
+            return False
+    if not any(sql_upper.startswith(s) for s in ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH']):
+        return False
+    return sql_upper.count('(') == sql_upper.count(')')
+
+
+SHORT = "SELECT TOP 10 Sehir, SUM(Tutar) AS Toplam FROM SatisSiparisleri GROUP BY Sehir ORDER BY Toplam DESC"
+
+MEDIUM = """
+WITH Aylik AS (
+    SELECT YEAR(s.SiparisTarihi) AS Yil, MONTH(s.SiparisTarihi) AS Ay,
+           m.Sehir, SUM(s.Tutar) AS Toplam, COUNT(*) AS Adet
+    FROM SatisSiparisleri s
+    JOIN Musteriler m ON m.MusteriId = s.MusteriId
+    WHERE s.SiparisTarihi >= '2023-01-01' AND m.Sehir <> N'Bilinmiyor'
+    GROUP BY YEAR(s.SiparisTarihi), MONTH(s.SiparisTarihi), m.Sehir
+)
+SELECT Yil, Ay, Sehir, Toplam, Adet,
+       Toplam * 1.0 / NULLIF(SUM(Toplam) OVER (PARTITION BY Yil, Ay), 0) AS Pay
+FROM Aylik
+ORDER BY Yil, Ay, Toplam DESC
+"""
+
+LARGE = "SELECT " + ",\n".join(
+    f"CASE WHEN c{i} > {i} THEN 'yüksek' ELSE 'düşük' END AS k{i} -- sütun {i}" for i in range(400)
+) + "\nFROM Olcumler WHERE Tarih >= '2024-01-01'"
+
+# Legitimate queries the substring scan rejected
+FALSE_POSITIVES = [
+    "SELECT CreatedDate, LastExecutionTime FROM Jobs",
+    "SELECT * FROM Siparisler WHERE Aciklama = 'drop shipping'",
+    "SELECT KullaniciId, CreateUser FROM Loglar",
+    "-- alter later\nSELECT 1",
+]
+
+
+def bench(name: str, sql: str, number: int) -> None:
+    legacy = timeit.timeit(lambda: legacy_validate(sql), number=number) / number * 1e6
+
+    def cold():
+        tokenize.cache_clear()
+        SQLValidator._verdict.cache_clear()
+        SQLValidator.validate_sql_query(sql)
+
+    cold_time = timeit.timeit(cold, number=number) / number * 1e6
+    SQLValidator.validate_sql_query(sql)
+    warm = timeit.timeit(lambda: SQLValidator.validate_sql_query(sql), number=number) / number * 1e6
+    print(f"{name:<8} {len(sql):>7} {legacy:>12.1f} {cold_time:>12.1f} {warm:>12.1f}")
+
+
+def main() -> None:
+    print(f"{'query':<8} {'chars':>7} {'legacy µs':>12} {'lexer µs':>12} {'cached µs':>12}")
+    bench("short", SHORT, 20000)
+    bench("medium", MEDIUM, 5000)
+    bench("large", LARGE, 200)
+
+    print()
+    print("False positives (legacy -> tokenizer):")
+    for sql in FALSE_POSITIVES:
+        print(f"  {legacy_validate(sql)!s:<5} -> {SQLValidator.validate_sql_query(sql)!s:<5}  {sql.splitlines()[-1][:60]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,9 +17,28 @@ a = Analysis(
         'backend.config.config',
         'backend.models.models',
         'backend.services.database',
+        'backend.services.connection_pool',
+        'backend.services.schema_cache',
+        'backend.services.result_cursors',
+        'backend.services.result_store',
+        'backend.services.schema_migrations',
+        'backend.services.result_profiler',
+        'backend.services.history_writer',
+        'backend.services.query_journal',
+        'backend.services.metrics',
+        'backend.services.query_control',
+        'backend.services.sql_cache',
+        'backend.services.summary_cache',
+        'backend.services.ai_health',
+        'backend.services.ai_client',
+        'backend.services.ai_providers',
+        'backend.services.sql_templates',
+        'backend.services.prompt_builder',
+        'backend.services.table_index',
         'backend.services.ai_service',
         'backend.routes.routes',
         'backend.core.utils',
+        'backend.core.sql_lexer',
         
         # Database & API
         'pyodbc',
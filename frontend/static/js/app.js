@@ -52,6 +52,7 @@ class NIQApp {
             // Query elements
             questionTextarea: document.getElementById('question'),
             sendQueryBtn: document.getElementById('send-query-btn'),
+            cancelQueryBtn: document.getElementById('cancel-query-btn'),
             clearBtn: document.getElementById('clear-btn'),
             
             // Results elements
@@ -102,7 +103,9 @@ class NIQApp {
             isLoading: false,
             currentChart: null,
             selectedChartType: null,
-            selectedQueryId: null
+            selectedQueryId: null,
+            resultPage: null,
+            runningExecutionId: null
         };
     }
 
@@ -479,6 +482,9 @@ class NIQApp {
         if (this.elements.sendQueryBtn) {
             this.elements.sendQueryBtn.addEventListener('click', () => this.sendQuery());
         }
+        if (this.elements.cancelQueryBtn) {
+            this.elements.cancelQueryBtn.addEventListener('click', () => this.cancelQuery());
+        }
         if (this.elements.clearBtn) {
             this.elements.clearBtn.addEventListener('click', () => this.clearResults());
         }
@@ -773,11 +779,6 @@ class NIQApp {
             return;
         }
 
-        if (selectedTables.length === 0) {
-            this.showStatus('Lütfen en az bir tablo seçin', 'error');
-            return;
-        }
-
         // Scroll to results section
         this.scrollToSection('results-section');
         
@@ -785,11 +786,47 @@ class NIQApp {
         this.showStatus('Sorgu işleniyor...', 'info');
 
         try {
-            const response = await this.apiCall('/query', 'POST', {
+            // Show the SQL as the model writes it; the final SQL is cached
+            // server-side, so the /query call below does not generate it again
+            const generated = await this.streamGeneratedSQL(question, selectedTables);
+            if (generated.error) {
+                this.displayErrorResult(generated.error, generated.sql);
+                this.saveQueryToHistory(question, false, generated.sql);
+                this.showStatus(`Sorgu hatası: ${generated.error}`, 'error');
+                return;
+            }
+            if (selectedTables.length === 0 && generated.tables) {
+                this.showStatus(`Otomatik seçilen tablolar: ${generated.tables.join(', ')}`, 'info');
+            }
+
+            // SELECT results arrive as NDJSON and are rendered as they stream in;
+            // anything else comes back as a regular JSON response.
+            // The execution id lets the cancel button stop the query while it runs.
+            let streamed = null;
+            const executionId = this.newExecutionId();
+            this.setRunningQuery(executionId);
+            const response = await this.apiStream('/query', {
                 question: question,
-                tables: selectedTables
+                tables: generated.tables || selectedTables,
+                stream: true,
+                execution_id: executionId
+            }, event => {
+                streamed = this.handleQueryStreamEvent(event, streamed);
             });
 
+            if (!response) {
+                const success = !!streamed && !streamed.error;
+                this.saveQueryToHistory(question, success, streamed ? streamed.sql : null);
+                if (success) {
+                    this.showStatus('Sorgu başarıyla çalıştırıldı', 'success');
+                    this.updateDashboardStats();
+                    if (streamed.historyTicket) this.showAnalysisButton(streamed.historyTicket);
+                } else {
+                    this.showStatus(`Sorgu hatası: ${streamed ? streamed.error : 'Sonuç alınamadı'}`, 'error');
+                }
+                return;
+            }
+
             this.displayResults(response);
             
             // Save to localStorage for dashboard stats
@@ -805,18 +842,133 @@ class NIQApp {
         } catch (error) {
             this.showStatus(`Sorgu hatası: ${error.message}`, 'error');
         } finally {
+            this.setRunningQuery(null);
             this.setLoading(false);
         }
     }
 
+    /**
+     * Client-side id for a query run, sent as execution_id
+     */
+    newExecutionId() {
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    }
+
+    /**
+     * Remember the running query and show the cancel button while it runs
+     */
+    setRunningQuery(executionId) {
+        this.state.runningExecutionId = executionId;
+        if (this.elements.cancelQueryBtn) {
+            this.elements.cancelQueryBtn.style.display = executionId ? '' : 'none';
+            this.elements.cancelQueryBtn.disabled = false;
+        }
+    }
+
+    /**
+     * Ask the server to cancel the running query
+     */
+    async cancelQuery() {
+        const executionId = this.state.runningExecutionId;
+        if (!executionId) return;
+        this.elements.cancelQueryBtn.disabled = true;
+        try {
+            await this.apiCall(`/query/${encodeURIComponent(executionId)}/cancel`, 'POST');
+            this.showStatus('Sorgu iptal ediliyor...', 'info');
+        } catch (error) {
+            this.elements.cancelQueryBtn.disabled = false;
+            this.showStatus(`İptal edilemedi: ${error.message}`, 'error');
+        }
+    }
+
+    /**
+     * Stream SQL generation into a preview; resolves to { sql, error, tables }
+     */
+    async streamGeneratedSQL(question, tables) {
+        this.elements.resultsDiv.innerHTML = `
+            <div class="result-section">
+                <h3>SQL oluşturuluyor...</h3>
+                <div class="sql-query">
+                    <strong>SQL:</strong>
+                    <pre id="sql-preview"></pre>
+                </div>
+            </div>
+        `;
+        const preview = document.getElementById('sql-preview');
+        let sql = '';
+        let error = null;
+        let usedTables = null;
+
+        await this.apiSSE('/query/sql/stream', { question: question, tables: tables }, (event, data) => {
+            if (event === 'sql') {
+                sql += data.delta;
+                if (preview) preview.textContent = sql;
+            } else if (event === 'done') {
+                sql = data.sql_query;
+                usedTables = data.tables;
+                if (preview) preview.textContent = sql;
+                if (!data.valid) error = 'Oluşturulan SQL geçersiz veya tehlikeli işlemler içeriyor';
+            } else if (event === 'error') {
+                error = data.error;
+            }
+        });
+
+        return { sql: sql || null, error: error, tables: usedTables };
+    }
+
+    /**
+     * Offer an AI analysis of a finished query's results
+     */
+    showAnalysisButton(historyTicket) {
+        const section = this.elements.resultsDiv.querySelector('.result-section');
+        if (!section) return;
+        section.insertAdjacentHTML('beforeend', `
+            <div class="results-analysis" id="results-analysis">
+                <button class="btn btn-secondary" onclick="window.app.streamResultAnalysis('${historyTicket}')">Sonuçları Yorumla</button>
+            </div>
+        `);
+    }
+
+    /**
+     * Stream the summary and analysis of a saved query's results
+     * (identified by the history ticket of the run; the server resolves it to the query ID)
+     */
+    async streamResultAnalysis(historyTicket) {
+        const container = document.getElementById('results-analysis');
+        if (!container) return;
+        container.innerHTML = `
+            <p><strong>Özet:</strong> <span id="analysis-summary"></span></p>
+            <p><strong>Analiz:</strong> <span id="analysis-text"></span></p>
+        `;
+        const targets = {
+            summary: document.getElementById('analysis-summary'),
+            analysis: document.getElementById('analysis-text')
+        };
+
+        try {
+            await this.apiSSE('/summary/stream', { history_ticket: historyTicket }, (event, data) => {
+                if (targets[event]) {
+                    targets[event].textContent += data.delta;
+                } else if (event === 'done') {
+                    targets.summary.textContent = data.summary;
+                    targets.analysis.textContent = data.analysis;
+                } else if (event === 'error') {
+                    container.innerHTML = `<p class="error-result">Analiz hatası: ${this.escapeHtml(data.error)}</p>`;
+                }
+            });
+        } catch (error) {
+            container.innerHTML = `<p class="error-result">Analiz hatası: ${this.escapeHtml(error.message)}</p>`;
+        }
+    }
+
     /**
      * Display query results
      */
     displayResults(response) {
         if (response.success) {
             if (response.results) {
-                // SELECT query results
-                this.displayTableResults(response.results, response.sql);
+                // SELECT query results (first page)
+                this.displayTableResults(response.results, response.sql, response);
             } else if (response.message) {
                 // Non-SELECT query results
                 this.displayMessageResult(response.message, response.sql);
@@ -830,8 +982,16 @@ class NIQApp {
     /**
      * Display table results
      */
-    displayTableResults(results, sql) {
-        if (results.length === 0) {
+    displayTableResults(results, sql, page = {}) {
+        results = this.normalizeResults(results);
+        this.state.resultPage = {
+            headers: results.columns,
+            rowCount: results.rows.length,
+            nextPageToken: page.next_page_token || null,
+            truncated: !!page.truncated
+        };
+
+        if (results.rows.length === 0) {
             this.elements.resultsDiv.innerHTML = `
                 <div class="result-section">
                     <h3>Sorgu Sonuçları</h3>
@@ -847,14 +1007,12 @@ class NIQApp {
             return;
         }
 
-        const headers = Object.keys(results[0]);
-        const tableRows = results.map(row => 
-            `<tr>${headers.map(header => `<td>${this.escapeHtml(row[header])}</td>`).join('')}</tr>`
-        ).join('');
+        const headers = this.state.resultPage.headers;
+        const tableRows = this.renderResultRows(results.rows);
 
         this.elements.resultsDiv.innerHTML = `
             <div class="result-section">
-                <h3>Sorgu Sonuçları (${results.length} satır)</h3>
+                <h3 id="results-title">${this.getResultsTitle()}</h3>
                 <div class="sql-query">
                     <strong>SQL:</strong>
                     <pre>${sql}</pre>
@@ -864,15 +1022,155 @@ class NIQApp {
                         <thead>
                             <tr>${headers.map(header => `<th>${this.escapeHtml(header)}</th>`).join('')}</tr>
                         </thead>
-                        <tbody>
+                        <tbody id="results-tbody">
                             ${tableRows}
                         </tbody>
                     </table>
                 </div>
+                <div class="results-pager" id="results-pager">${this.getResultsPagerHTML()}</div>
             </div>
         `;
     }
 
+    /**
+     * Apply one NDJSON event from a streamed query; returns the updated stream state
+     */
+    handleQueryStreamEvent(event, streamed) {
+        if (event.type === 'meta') {
+            this.state.resultPage = {
+                headers: event.columns,
+                rowCount: 0,
+                nextPageToken: null,
+                truncated: false
+            };
+            this.elements.resultsDiv.innerHTML = `
+                <div class="result-section">
+                    <h3 id="results-title">Sorgu Sonuçları (yükleniyor...)</h3>
+                    <div class="sql-query">
+                        <strong>SQL:</strong>
+                        <pre>${event.sql}</pre>
+                    </div>
+                    <div class="table-container">
+                        <table class="results-table">
+                            <thead>
+                                <tr>${event.columns.map(header => `<th>${this.escapeHtml(header)}</th>`).join('')}</tr>
+                            </thead>
+                            <tbody id="results-tbody"></tbody>
+                        </table>
+                    </div>
+                    <div class="results-pager" id="results-pager"></div>
+                </div>
+            `;
+            return { sql: event.sql, error: null };
+        }
+
+        if (event.type === 'rows') {
+            const page = this.state.resultPage;
+            const tbody = document.getElementById('results-tbody');
+            if (tbody) {
+                tbody.insertAdjacentHTML('beforeend', this.renderResultRows(event.rows));
+            }
+            page.rowCount += event.rows.length;
+            const title = document.getElementById('results-title');
+            if (title) title.textContent = `Sorgu Sonuçları (${page.rowCount} satır, yükleniyor...)`;
+            return streamed;
+        }
+
+        if (event.type === 'end') {
+            const page = this.state.resultPage;
+            page.truncated = !!event.truncated;
+            if (page.rowCount === 0) {
+                this.displayTableResults({ columns: page.headers, rows: [] }, streamed.sql, {});
+            } else {
+                const title = document.getElementById('results-title');
+                if (title) title.textContent = this.getResultsTitle();
+            }
+            return { ...streamed, historyTicket: event.history_ticket };
+        }
+
+        if (event.type === 'error') {
+            this.displayErrorResult(event.error, event.sql);
+            return { sql: event.sql, error: event.error };
+        }
+
+        return streamed;
+    }
+
+    /**
+     * Render result rows as table HTML
+     */
+    renderResultRows(rows) {
+        return rows.map(row => 
+            `<tr>${row.map(value => `<td>${this.escapeHtml(value)}</td>`).join('')}</tr>`
+        ).join('');
+    }
+
+    /**
+     * Convert query results to the columnar { columns, rows } shape.
+     * Older saved queries still store a list of row objects.
+     */
+    normalizeResults(results) {
+        if (!results) return { columns: [], rows: [] };
+        if (!Array.isArray(results)) return results;
+        const columns = results.length > 0 ? Object.keys(results[0]) : [];
+        return {
+            columns: columns,
+            rows: results.map(record => columns.map(column => record[column]))
+        };
+    }
+
+    /**
+     * Title for the results table, including paging state
+     */
+    getResultsTitle() {
+        const page = this.state.resultPage;
+        if (page.nextPageToken) {
+            return `Sorgu Sonuçları (ilk ${page.rowCount} satır gösteriliyor)`;
+        }
+        if (page.truncated) {
+            return `Sorgu Sonuçları (${page.rowCount} satır, satır limiti aşıldı)`;
+        }
+        return `Sorgu Sonuçları (${page.rowCount} satır)`;
+    }
+
+    /**
+     * "Load more" button for paged results
+     */
+    getResultsPagerHTML() {
+        if (!this.state.resultPage.nextPageToken) return '';
+        return `<button class="btn btn-sm btn-secondary" onclick="app.loadMoreResults()">Daha Fazla Yükle</button>`;
+    }
+
+    /**
+     * Fetch the next page of the current result and append its rows
+     */
+    async loadMoreResults() {
+        const page = this.state.resultPage;
+        if (!page || !page.nextPageToken) return;
+
+        try {
+            const response = await this.apiCall(`/query/page/${page.nextPageToken}`, 'GET');
+            const tbody = document.getElementById('results-tbody');
+            if (tbody) {
+                tbody.insertAdjacentHTML('beforeend', this.renderResultRows(response.results.rows));
+            }
+
+            page.rowCount += response.results.rows.length;
+            page.nextPageToken = response.next_page_token || null;
+            page.truncated = !!response.truncated;
+
+            const title = document.getElementById('results-title');
+            if (title) title.textContent = this.getResultsTitle();
+            const pager = document.getElementById('results-pager');
+            if (pager) pager.innerHTML = this.getResultsPagerHTML();
+        } catch (error) {
+            page.nextPageToken = null;
+            const pager = document.getElementById('results-pager');
+            if (pager) pager.innerHTML = '';
+            this.showStatus(`Sonraki sayfa alınamadı: ${error.message}`, 'error');
+        }
+    }
+
     /**
      * Display message result
      */
@@ -930,11 +1228,11 @@ class NIQApp {
      * Update query button state based on form validity
      */
     updateQueryButtonState() {
+        // Tables are optional: the server picks them when none are selected
         const hasQuestion = this.elements.questionTextarea.value.trim().length > 0;
-        const hasTables = this.state.selectedTables.length > 0;
         const isConnected = this.state.isConnected;
         
-        this.elements.sendQueryBtn.disabled = !(hasQuestion && hasTables && isConnected);
+        this.elements.sendQueryBtn.disabled = !(hasQuestion && isConnected);
     }
 
     /**
@@ -951,10 +1249,9 @@ class NIQApp {
      */
     canSendQuery() {
         const hasQuestion = this.elements.questionTextarea.value.trim().length > 0;
-        const hasTables = this.state.selectedTables.length > 0;
         const isConnected = this.state.isConnected;
         
-        return hasQuestion && hasTables && isConnected;
+        return hasQuestion && isConnected;
     }
 
     /**
@@ -999,6 +1296,98 @@ class NIQApp {
         return result;
     }
 
+    /**
+     * Make API call that may answer with an NDJSON stream.
+     * Each streamed line is passed to onEvent and null is returned;
+     * a regular JSON response is returned as-is.
+     */
+    async apiStream(endpoint, data, onEvent) {
+        const response = await fetch(`${this.apiBaseUrl}${endpoint}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/x-ndjson, application/json'
+            },
+            body: JSON.stringify(data)
+        });
+
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('application/x-ndjson') || !response.body) {
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.error || 'API call failed');
+            }
+            return result;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (line) onEvent(JSON.parse(line));
+            }
+        }
+        buffer += decoder.decode();
+        if (buffer.trim()) onEvent(JSON.parse(buffer));
+        return null;
+    }
+
+    /**
+     * POST and read a server-sent event stream; onEvent(event, data) is called per event
+     */
+    async apiSSE(endpoint, data, onEvent) {
+        const response = await fetch(`${this.apiBaseUrl}${endpoint}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify(data)
+        });
+
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('text/event-stream') || !response.body) {
+            const result = await response.json();
+            throw new Error(result.error || 'API call failed');
+        }
+
+        const dispatch = block => {
+            let event = 'message';
+            const dataLines = [];
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+        };
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                if (block.trim()) dispatch(block);
+            }
+        }
+        buffer += decoder.decode();
+        if (buffer.trim()) dispatch(buffer);
+    }
+
     /**
      * Escape HTML to prevent XSS
      */
@@ -1180,7 +1569,8 @@ class NIQApp {
      */
     createSavedQueryHTML(query) {
         const createdDate = new Date(query.created_at).toLocaleString('tr-TR');
-        const statusText = query.is_successful ? 'Başarılı' : 'Hatalı';
+        const statusText = { cancelled: 'İptal Edildi', timeout: 'Zaman Aşımı' }[query.status]
+            || (query.is_successful ? 'Başarılı' : 'Hatalı');
         const statusClass = query.is_successful ? 'success' : 'error';
         
         const tablesHtml = query.tables_used.map(table => 
@@ -1191,21 +1581,85 @@ class NIQApp {
         const formattedSql = this.formatSQL(query.sql_query);
 
         // Generate results HTML
+        const resultsHtml = this.createSavedQueryResultsHTML(query);
+
+        return `
+            <div class="saved-query-item">
+                <div class="saved-query-header">
+                    <div class="saved-query-info">
+                        <div class="saved-query-id">Sorgu #${query.id}</div>
+                        <div class="saved-query-question">
+                            <strong>Soru:</strong> ${this.escapeHtml(query.question)}
+                        </div>
+                        <div class="saved-query-meta">
+                            <span>${createdDate}</span>
+                            <span class="saved-query-status ${statusClass}">${statusText}</span>
+                        </div>
+                        <div class="saved-query-tables">
+                            <strong>Kullanılan Tablolar:</strong> ${tablesHtml}
+                        </div>
+                    </div>
+                </div>
+                
+                <div class="saved-query-sql-section">
+                    <h4>SQL Sorgusu:</h4>
+                    <div class="sql-code-block">
+                        <pre><code>${formattedSql}</code></pre>
+                    </div>
+                </div>
+                
+                <div id="saved-query-results-${query.id}">
+                    ${resultsHtml}
+                </div>
+                
+                <div class="saved-query-actions">
+                    <button class="btn btn-sm btn-secondary" onclick="app.copyQuery(${query.id})">
+                        SQL'i Kopyala
+                    </button>
+                    <button class="btn btn-sm btn-primary" onclick="app.reRunQuery(${query.id})">
+                        Tekrar Çalıştır
+                    </button>
+                    <button class="btn btn-sm btn-danger" onclick="app.deleteQuery(${query.id})">
+                        Sil
+                    </button>
+                </div>
+            </div>
+        `;
+    }
+
+    /**
+     * Row count label of a saved query; large results keep only a preview of their first rows
+     */
+    savedRowCountText(query, savedRows = null) {
+        const total = query.row_count ?? savedRows;
+        const text = `${total}${query.is_partial ? '+' : ''} satır`;
+        if (savedRows != null && (savedRows < total || query.is_partial)) {
+            return `${text}, önizleme: ilk ${savedRows} satır kaydedildi`;
+        }
+        return text;
+    }
+
+    /**
+     * Create HTML for the results part of a saved query
+     */
+    createSavedQueryResultsHTML(query) {
         let resultsHtml = '';
-        if (query.is_successful && query.query_results && query.query_results.length > 0) {
+        const savedResults = query.query_results ? this.normalizeResults(query.query_results) : null;
+        if (query.is_successful && savedResults && savedResults.rows.length > 0) {
             // SELECT query with results
-            const headers = Object.keys(query.query_results[0]);
-            const tableRows = query.query_results.slice.map(row => 
-                `<tr>${headers.map(header => `<td>${this.escapeHtml(String(row[header] || ''))}</td>`).join('')}</tr>`
+            const headers = savedResults.columns;
+            const savedRows = savedResults.rows.length;
+            const tableRows = savedResults.rows.slice(0, 10).map(row => 
+                `<tr>${row.map(value => `<td>${this.escapeHtml(String(value ?? ''))}</td>`).join('')}</tr>`
             ).join('');
             
-            const moreRowsText = query.query_results.length > 10 
-                ? `<p class="more-results-info">... ve ${query.query_results.length - 10} satır daha (Toplam: ${query.query_results.length} satır)</p>` 
+            const moreRowsText = savedRows > 10 
+                ? `<p class="more-results-info">... ve ${savedRows - 10} satır daha (Toplam: ${this.savedRowCountText(query, savedRows)})</p>` 
                 : '';
 
             resultsHtml = `
                 <div class="saved-query-results">
-                    <h4>Sorgu Sonuçları (${query.query_results.length} satır):</h4>
+                    <h4>Sorgu Sonuçları (${this.savedRowCountText(query, savedRows)}):</h4>
                     <div class="table-container">
                         <table class="results-table">
                             <thead>
@@ -1219,6 +1673,17 @@ class NIQApp {
                     ${moreRowsText}
                 </div>
             `;
+        } else if (query.is_successful && query.has_results && !savedResults && query.row_count !== 0) {
+            // Listed without results; they are loaded on demand
+            const rowCountText = query.row_count != null ? ` (${this.savedRowCountText(query)})` : '';
+            resultsHtml = `
+                <div class="saved-query-results">
+                    <h4>Sorgu Sonuçları${rowCountText}:</h4>
+                    <button class="btn btn-sm btn-secondary" onclick="app.loadSavedQueryResults(${query.id})">
+                        Sonuçları Göster
+                    </button>
+                </div>
+            `;
         } else if (query.is_successful && query.result_message) {
             // Non-SELECT query with message
             resultsHtml = `
@@ -1227,7 +1692,7 @@ class NIQApp {
                     <p>${this.escapeHtml(query.result_message)}</p>
                 </div>
             `;
-        } else if (query.is_successful && query.query_results && query.query_results.length === 0) {
+        } else if (query.is_successful && (savedResults ? savedResults.rows.length === 0 : query.row_count === 0)) {
             // SELECT query with no results
             resultsHtml = `
                 <div class="saved-query-no-results">
@@ -1245,46 +1710,26 @@ class NIQApp {
             `;
         }
 
-        return `
-            <div class="saved-query-item">
-                <div class="saved-query-header">
-                    <div class="saved-query-info">
-                        <div class="saved-query-id">Sorgu #${query.id}</div>
-                        <div class="saved-query-question">
-                            <strong>Soru:</strong> ${this.escapeHtml(query.question)}
-                        </div>
-                        <div class="saved-query-meta">
-                            <span>${createdDate}</span>
-                            <span class="saved-query-status ${statusClass}">${statusText}</span>
-                        </div>
-                        <div class="saved-query-tables">
-                            <strong>Kullanılan Tablolar:</strong> ${tablesHtml}
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="saved-query-sql-section">
-                    <h4>SQL Sorgusu:</h4>
-                    <div class="sql-code-block">
-                        <pre><code>${formattedSql}</code></pre>
-                    </div>
-                </div>
-                
-                ${resultsHtml}
-                
-                <div class="saved-query-actions">
-                    <button class="btn btn-sm btn-secondary" onclick="app.copyQuery(${query.id})">
-                        SQL'i Kopyala
-                    </button>
-                    <button class="btn btn-sm btn-primary" onclick="app.reRunQuery(${query.id})">
-                        Tekrar Çalıştır
-                    </button>
-                    <button class="btn btn-sm btn-danger" onclick="app.deleteQuery(${query.id})">
-                        Sil
-                    </button>
-                </div>
-            </div>
-        `;
+        return resultsHtml;
+    }
+
+    /**
+     * Load the stored results of a saved query into its history entry
+     */
+    async loadSavedQueryResults(queryId) {
+        const container = document.getElementById(`saved-query-results-${queryId}`);
+        if (!container) return;
+
+        try {
+            const response = await this.apiCall(`/queries/${queryId}`, 'GET');
+            if (response.success) {
+                container.innerHTML = this.createSavedQueryResultsHTML(response.data);
+            } else {
+                this.showStatus(`Sonuçlar alınırken hata: ${response.error}`, 'error');
+            }
+        } catch (error) {
+            this.showStatus(`Sonuçlar alınırken hata: ${error.message}`, 'error');
+        }
     }
 
     /**
@@ -1347,7 +1792,8 @@ class NIQApp {
                 
                 response.data.forEach((query, index) => {
                     const createdDate = new Date(query.created_at).toLocaleString('tr-TR');
-                    const status = query.is_successful ? 'BAŞARILI' : 'HATALI';
+                    const status = { cancelled: 'İPTAL EDİLDİ', timeout: 'ZAMAN AŞIMI' }[query.status]
+                        || (query.is_successful ? 'BAŞARILI' : 'HATALI');
                     
                     fileContent += `## Sorgu #${query.id} - ${status}\n`;
                     fileContent += `**Tarih:** ${createdDate}\n`;
@@ -1391,15 +1837,10 @@ class NIQApp {
         }
 
         try {
-            // Get all queries first
-            const response = await this.apiCall('/queries', 'GET');
+            // One set-based delete on the server
+            const response = await this.apiCall('/queries', 'DELETE', { all: true });
             
-            if (response.success && response.data.length > 0) {
-                // Delete each query
-                for (const query of response.data) {
-                    await this.apiCall(`/queries/${query.id}`, 'DELETE');
-                }
-                
+            if (response.success && response.data.deleted > 0) {
                 this.showStatus('Tüm sorgular başarıyla silindi', 'success');
                 await this.loadSavedQueries(); // Refresh the list
             } else {
@@ -1423,7 +1864,8 @@ class NIQApp {
         }
 
         try {
-            const response = await this.apiCall('/queries', 'GET');
+            // Summary listing: ids, questions and row counts only
+            const response = await this.apiCall('/queries?view=summary&limit=100', 'GET');
             
             if (response.success) {
                 this.populateQuerySelector(response.data);
@@ -1441,8 +1883,8 @@ class NIQApp {
         
         this.elements.querySelector.innerHTML = '<option value="">Sorgu seçin...</option>';
         
-        // Only show queries with results
-        const queriesWithResults = queries.filter(q => q.query_results && q.query_results.length > 0);
+        // Only show queries with results (the list carries row counts, not the rows)
+        const queriesWithResults = queries.filter(q => q.has_results && (q.row_count == null || q.row_count > 0));
         
         if (queriesWithResults.length === 0) {
             this.elements.querySelector.innerHTML = '<option value="">Grafik oluşturulabilecek sorgu yok</option>';
@@ -1508,9 +1950,9 @@ class NIQApp {
      * Render chart with query data
      */
     renderChart(query) {
-        const results = query.query_results;
+        const results = this.normalizeResults(query.query_results);
         
-        if (!results || results.length === 0) {
+        if (results.rows.length === 0) {
             this.displayChartError('Sorgu sonucu boş');
             return;
         }
@@ -1579,7 +2021,7 @@ class NIQApp {
                 this.highlightRecommendedChart(null);
                 return;
             }
-            const results = response.data.query_results;
+            const results = this.normalizeResults(response.data.query_results);
             const chartData = this.analyzeDataForChart(results);
             if (!chartData) {
                 this.highlightRecommendedChart(null);
@@ -1596,31 +2038,30 @@ class NIQApp {
      * Analyze data to determine best chart representation
      */
     analyzeDataForChart(results) {
-        if (results.length === 0) return null;
-
-        const keys = Object.keys(results[0]);
+        const { columns, rows } = results;
+        if (rows.length === 0) return null;
         
-        if (keys.length < 2) return null;
+        if (columns.length < 2) return null;
 
-        // Try to find label and value columns
-        let labelKey = null;
-        let valueKey = null;
+        // Try to find label and value columns (by index into each row)
+        let labelIndex = null;
+        let valueIndex = null;
 
         // Look for numeric columns
-        const numericKeys = keys.filter(key => {
-            const value = results[0][key];
+        const numericIndexes = columns.map((_, index) => index).filter(index => {
+            const value = rows[0][index];
             return typeof value === 'number' || !isNaN(parseFloat(value));
         });
 
         // Look for string/text columns for labels
-        const textKeys = keys.filter(key => !numericKeys.includes(key));
+        const textIndexes = columns.map((_, index) => index).filter(index => !numericIndexes.includes(index));
 
-        if (numericKeys.length === 0) {
+        if (numericIndexes.length === 0) {
             // No numeric data, try to count occurrences
-            labelKey = keys[0];
+            labelIndex = 0;
             const counts = {};
-            results.forEach(row => {
-                const label = String(row[labelKey]);
+            rows.forEach(row => {
+                const label = String(row[labelIndex]);
                 counts[label] = (counts[label] || 0) + 1;
             });
             
@@ -1634,11 +2075,13 @@ class NIQApp {
         }
 
         // Use first text column as label, first numeric as value
-        labelKey = textKeys.length > 0 ? textKeys[0] : keys[0];
-        valueKey = numericKeys[0];
+        labelIndex = textIndexes.length > 0 ? textIndexes[0] : 0;
+        valueIndex = numericIndexes[0];
+        const labelKey = columns[labelIndex];
+        const valueKey = columns[valueIndex];
 
-        const labels = results.map(row => String(row[labelKey]));
-        const data = results.map(row => parseFloat(row[valueKey]) || 0);
+        const labels = rows.map(row => String(row[labelIndex]));
+        const data = rows.map(row => parseFloat(row[valueIndex]) || 0);
 
         // Heuristic recommendation
         const distinctLabelCount = new Set(labels).size;
@@ -0,0 +1,50 @@
+"""
+Tests for the AI circuit breaker: only outages may open it.
+"""
+import asyncio
+
+import openai
+import pytest
+
+from backend.services.ai_client import AIDeadlineExceeded
+from backend.services.ai_health import AIHealthTracker
+
+
+def _api_error(error_class):
+    # The breaker only looks at the error type, so no HTTP request/response is needed
+    return error_class.__new__(error_class)
+
+
+@pytest.mark.parametrize("error", [
+    _api_error(openai.APIConnectionError),
+    _api_error(openai.APITimeoutError),
+    _api_error(openai.RateLimitError),
+    _api_error(openai.InternalServerError),
+    asyncio.TimeoutError(),
+    AIDeadlineExceeded("AI call deadline exceeded"),
+])
+def test_outages_open_the_breaker(error):
+    tracker = AIHealthTracker(failure_threshold=2, reset_timeout=60)
+
+    tracker.record_failure(error)
+    tracker.record_failure(error)
+
+    assert tracker.is_open
+    assert tracker.get_status()["total_failures"] == 2
+
+
+@pytest.mark.parametrize("error", [
+    _api_error(openai.BadRequestError),
+    _api_error(openai.AuthenticationError),
+])
+def test_rejected_requests_do_not_open_the_breaker(error):
+    tracker = AIHealthTracker(failure_threshold=2, reset_timeout=60)
+
+    tracker.record_failure(asyncio.TimeoutError())
+    tracker.record_failure(error)
+    tracker.record_failure(error)
+
+    assert not tracker.is_open
+    status = tracker.get_status()
+    assert status["consecutive_failures"] == 0
+    assert status["total_failures"] == 1
@@ -0,0 +1,54 @@
+"""
+Tests for the generated-SQL cache: only SQL that passed validation may be served from it.
+"""
+import pytest
+
+from backend.core.utils import SQLValidator
+from backend.models.models import DatabaseSchema, QueryRequest, TableInfo
+from backend.services import ai_service as ai_service_module
+from backend.services.ai_service import AIService
+from backend.services.sql_cache import SQLCache
+
+REJECTED_SQL = "SELECT * FROM Musteriler; DROP TABLE Musteriler"
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = SQLCache()
+    monkeypatch.setattr(ai_service_module, "sql_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def schema():
+    return DatabaseSchema(tables={"Musteriler": TableInfo(name="Musteriler", columns=["Id", "Ad"])})
+
+
+def test_rejected_sql_is_not_served_from_cache(cache, schema, monkeypatch):
+    service = AIService("offline")
+    calls = []
+
+    async def call_model(prompt):
+        calls.append(prompt)
+        return REJECTED_SQL
+
+    monkeypatch.setattr(service, "_call_openai_api", call_model)
+    request = QueryRequest(question="Müşterileri listele", tables=["Musteriler"])
+
+    sql_query = service.convert_natural_to_sql(request, schema)
+    assert not SQLValidator.validate_sql_query(sql_query)
+
+    # The rejected statement was not cached, so the model is asked again
+    assert cache.get(request.question, AIService.get_schema_hash(request.tables, schema)) is None
+    assert service.convert_natural_to_sql(request, schema) == REJECTED_SQL
+    assert len(calls) == 2
+
+
+def test_discard_drops_exact_and_normalized_entries(cache):
+    cache.put("Müşterileri listele", "digest", "SELECT * FROM Musteriler")
+
+    cache.discard("Müşterileri listele", "digest")
+
+    assert cache.get("Müşterileri listele", "digest") is None
+    assert cache.get("müşterileri listele?", "digest") is None
+    assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,77 @@
+"""
+Tests for SQLValidator, the safety check applied to generated SQL before it runs.
+"""
+import pytest
+
+from backend.core.utils import SQLValidator
+
+
+@pytest.mark.parametrize("sql", [
+    "",
+    "   ",
+    # Only read and DML statements may start a query
+    "DROP TABLE Musteriler",
+    "sp_who",
+    "xp_cmdshell 'dir'",
+    # Dangerous statements after a valid one
+    "SELECT 1; DROP TABLE Musteriler",
+    "SELECT 1;drop table Musteriler",
+    "SELECT 1; EXEC('DROP TABLE Musteriler')",
+    "SELECT 1; EXEC(@sql)",
+    "SELECT 1; EXECUTE sp_who",
+    "SELECT * FROM T; TRUNCATE TABLE T",
+    # System procedures called by name at the start of a statement
+    "SELECT 1; sp_configure 'show advanced options', 1",
+    "SELECT 1;\n  xp_cmdshell 'dir'",
+    "SELECT 1; [xp_cmdshell] 'dir'",
+    'SELECT 1; "sp_who"',
+    # Malformed input
+    "SELECT 'abc FROM T",
+    "SELECT N'abc",
+    "SELECT [Ad FROM T",
+    "SELECT 1 /* outer /* inner */ still open",
+    "SELECT 1 /* never closed",
+    "```sql\nSELECT 1\n```",
+    "SELECT 1\n```",
+    "SELECT COUNT(* FROM T",
+    "SELECT 1) FROM (T",
+    "SELECT 1 ? 2",
+])
+def test_rejects(sql):
+    assert SQLValidator.validate_sql_query(sql) is False
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT TOP 10 Sehir, SUM(Tutar) AS Toplam FROM Satislar GROUP BY Sehir",
+    # Keywords inside identifiers, strings and comments
+    "SELECT CreatedDate, LastExecutionTime FROM Jobs",
+    "SELECT KullaniciId, CreateUser FROM Loglar",
+    "SELECT * FROM Siparisler WHERE Aciklama = 'drop shipping'",
+    "SELECT * FROM Siparisler WHERE Aciklama = N'it''s; DROP TABLE x'",
+    "SELECT [Drop Date], \"Exec Count\" FROM Raporlar",
+    "-- alter later\nSELECT 1",
+    "/* DROP */ SELECT 1",
+    "SELECT 1 /* outer /* inner */ closed */",
+    # System procedure prefixes away from a statement start
+    "SELECT sp_name, xp_flag FROM Ayarlar",
+    # Money literals and $-prefixed names
+    "SELECT $1.00 AS Fiyat, Tutar * $0.5 FROM Satislar",
+    "SELECT $IDENTITY FROM Siparisler",
+    "WITH Kaynak AS (SELECT Id, Ad FROM Yeni) "
+    "MERGE INTO Hedef AS h USING Kaynak AS k ON h.Id = k.Id "
+    "WHEN MATCHED THEN UPDATE SET h.Ad = k.Ad "
+    "OUTPUT $action, inserted.Id;",
+    "WITH c AS (SELECT 1 AS n) SELECT n FROM c",
+    "UPDATE Stok SET Adet = Adet - 1 WHERE UrunId = @id",
+    "SELECT 1; SELECT 2",
+])
+def test_accepts(sql):
+    assert SQLValidator.validate_sql_query(sql) is True
+
+
+def test_cached_verdict_matches_first_result():
+    sql = "SELECT 1; DROP TABLE Musteriler"
+    assert SQLValidator.validate_sql_query(sql) is False
+    assert SQLValidator.validate_sql_query(sql) is False
+    assert SQLValidator.validate_sql_query("SELECT 1") is True
+    assert SQLValidator.validate_sql_query("SELECT 1") is True